@@ -1,12 +1,19 @@
+import gzip
+import json
 import logging
+import os
+import time
 # import sqlite3
 # import pandas as pd
+from flask import Response, abort, request
+from flask_compress import Compress
 from dash import dcc, html, dash_table
-from dash.dependencies import Input, Output
-from dash import Dash
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash import Dash, no_update
 import dash_bootstrap_components as dbc
-import utils.insert_data as insert_data
 import utils.get_calls as get_calls
+import utils.schema as schema
+from utils.cache import VersionedCache
 
 def setup_logger(name):
     """Set up a logger for a given module."""
@@ -26,6 +33,71 @@ def setup_logger(name):
 
 app = Dash(__name__, external_stylesheets=[dbc.themes.CYBORG])
 logger = setup_logger(__name__)
+# readers need the current tables even before the first ingest run. Runs once in
+# the gunicorn master (preload_app), BEGIN IMMEDIATE keeps it safe beside ingest
+schema.ensure_schema()
+
+# brotli or gzip for layout, callback and asset responses; /tables pages arrive
+# already gzipped and are passed through untouched
+app.server.config.update(
+    COMPRESS_ALGORITHM=['br', 'gzip'],
+    COMPRESS_MIMETYPES=['text/html', 'text/css', 'text/javascript', 'application/javascript', 'application/json'],
+    COMPRESS_MIN_SIZE=500,
+)
+Compress(app.server)
+
+@app.server.after_request
+def cache_assets(response):
+    """fingerprinted Dash assets never change under the same url, let browsers keep them"""
+    prefix = app.config.requests_pathname_prefix
+    fingerprinted = (request.path.startswith(f"{prefix}{app.config.assets_url_path.strip('/')}/") and 'm' in request.args) \
+        or request.path.startswith(f"{prefix}_dash-component-suites/")
+    if fingerprinted and response.status_code == 200:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+# serialized bytes for each table page, sort and filter a client has asked for
+table_cache = VersionedCache(max_entries=1024)
+
+PAGE_SIZE = 25
+MAX_PAGE_SIZE = 500
+# the page's OFFSET is bound as a signed 64-bit SQLite INTEGER
+MAX_OFFSET = 2**63 - 1
+
+# DataTable id -> (get_calls.TABLES name, accordion item it sits in)
+PAGED_TABLES = {
+    'data-table': ('merged', 'merged'),
+    'news-table': ('news', 'news'),
+    'team-outlook': ('team_rating', 'team-outlook'),
+    'picks-table': ('picks', 'picks'),
+}
+
+CELL_STYLE = {
+    'textAlign': 'left',
+    'maxWidth': '100px',
+    'overflow': 'hidden',
+    'textOverflow': 'ellipsis',
+}
+
+def paged_table(table_id, columns, markdown=False, style_data=None):
+    """DataTable that asks the server for one page at a time, sorted and filtered in SQL"""
+    return dash_table.DataTable(
+        id=table_id,
+        columns=[{"name": i, "id": i, **({"presentation": "markdown"} if markdown else {})} for i in columns],
+        page_current=0,
+        page_size=PAGE_SIZE,
+        page_action='custom',
+        sort_action='custom',
+        sort_mode='multi',
+        sort_by=[],
+        filter_action='custom',
+        filter_query='',
+        style_data=style_data or {
+            'whiteSpace': 'normal',
+            'height': 'auto',
+        },
+        style_cell=CELL_STYLE,
+    )
 
 app.layout = html.Div([
     html.H1("Bovada and ESPN Expert Data"),
@@ -34,95 +106,132 @@ app.layout = html.Div([
         interval=1*60*1000,  # in milliseconds (1 minute)
         n_intervals=0
     ),
-    dcc.Interval(
-        id='data-refresh-component',
-        interval=24*60*60*1000,  # in milliseconds (24 hrs)
-        # interval=1*60*1000,  # in milliseconds (1 minute)
-        n_intervals=0
-    ),
-    dbc.Accordion([
+    # the data version the tables on this page were rendered from
+    dcc.Store(id='data-version'),
+    # where the tables fetch their pages from, read by assets/tables.js
+    dcc.Store(id='table-routes', data={
+        'prefix': app.config.requests_pathname_prefix,
+        'panels': {table_id: item_id for table_id, (name, item_id) in PAGED_TABLES.items()},
+    }),
+    dbc.Accordion(id='panels', children=[
+        dbc.AccordionItem(
+            [
+                paged_table('data-table', get_calls.TABLES['merged'][1])
+            ],
+            title="Merged Data",
+            item_id='merged'
+        ),
         dbc.AccordionItem(
             [
-                html.Div(id='data-table')
+                paged_table('news-table', get_calls.TABLES['news'][1], markdown=True)
             ],
-            title="Merged Data"
+            title="Ai News Data",
+            item_id='news'
         ),
         dbc.AccordionItem(
             [
-                html.Div(id='news-table')
+                paged_table('team-outlook', get_calls.TABLES['team_rating'][1], style_data={
+                    'whiteSpace': 'normal',
+                    'height': 'auto',
+                    'width': 60
+                })
             ],
-            title="Ai News Data"
+            title="Ai News Team Outlook",
+            item_id='team-outlook'
         ),
         dbc.AccordionItem(
             [
-                html.Div(id='team-outlook')
+                paged_table('picks-table', get_calls.TABLES['picks'][1])
             ],
-            title="Ai News Team Outlook"
+            title="Model Picks",
+            item_id='picks'
         )
-    ])
+    ], active_item='merged')
 ])
 
-@app.callback([Output('data-table', 'children'),
-              Output('news-table', 'children'),
-              Output('team-outlook', 'children')],
-              [Input('table-refresh-component', 'n_intervals')])
-def update_table(n):
-    """returns merged, news team rankings and ai news data"""
-
+def current_data_version():
+    """changes whenever an ingest lands or the week rolls over"""
     start, end = get_calls.get_start_end()
-    merged_df = get_calls.get_merged_data()
-    news_df, team_ratings = get_calls.get_transformed_news_data(start, end)
-
-    return [
-        dash_table.DataTable(
-            style_data={
-                'whiteSpace': 'normal',
-                'height': 'auto',
-            },
-            data = merged_df.to_dict('records'), 
-            columns = [{"name": i, "id": i} for i in merged_df.columns],
-            style_cell={
-                'textAlign': 'left',
-                'maxWidth': '100px',
-                'overflow': 'hidden',
-                'textOverflow': 'ellipsis',
-            }
-        ),
-        dash_table.DataTable(
-            style_data={
-                'whiteSpace': 'normal',
-                'height': 'auto',
-            },
-            data=news_df.to_dict('records'),
-            columns=[{"name": i, "id": i, "presentation": "markdown"} for i in news_df.columns],
-            style_cell={
-                'textAlign': 'left',
-                'maxWidth': '100px',
-                'overflow': 'hidden',
-                'textOverflow': 'ellipsis',
-            }
-        ),
-        dash_table.DataTable(
-            style_data={
-                'whiteSpace': 'normal',
-                'height': 'auto',
-                'width': 60
-            },
-            data = team_ratings.to_dict('records'), 
-            columns = [{"name": i, "id": i} for i in team_ratings.columns],
-                        style_cell={
-                'textAlign': 'left',
-                'maxWidth': '100px',
-                'overflow': 'hidden',
-                'textOverflow': 'ellipsis',
-            }
-        )]
-
-@app.callback([Input('data-refresh-component', 'n_intervals')])
-def update_data(n):
+    return f"{get_calls.get_data_version()}:{start.date()}"
+
+@app.callback(Output('data-version', 'data'),
+              [Input('table-refresh-component', 'n_intervals')],
+              [State('data-version', 'data')])
+def probe_data_version(n, client_version):
+    """updates the client's data version, and so its tables, only when it is out of date"""
+    version = current_data_version()
+    return version if version != client_version else no_update
+
+def serialized_page(table_id, page_current, page_size, sort_by, filter_query):
+    """
+    gzipped JSON {"data": records, "page_count": n} for one page, serialized once
+    per data version, and the milliseconds spent serializing it on this call
+    """
+    name = PAGED_TABLES[table_id][0]
     start, end = get_calls.get_start_end()
-    insert_data.insert_betting_expert_data(start, end)
+    # pages only change when an ingest bumps the data version, or the week rolls over
+    key = (name, start.date(), end.date(), page_current, page_size, json.dumps(sort_by), filter_query)
+    serialize_ms = [0.0]
+
+    def compute():
+        started = time.perf_counter()
+        records, page_count = get_calls.get_table_page(name, start, end, page_current, page_size, sort_by, filter_query)
+        queried = time.perf_counter()
+        body = json.dumps({'data': records, 'page_count': page_count}, default=str, separators=(',', ':')).encode()
+        payload = gzip.compress(body, compresslevel=6)
+        serialized = time.perf_counter()
+        logger.info(f"SERIALIZED {table_id} page {page_current}: {len(records)} rows, {len(body)} B json, "
+                    f"{len(payload)} B gzip, query {(queried - started) * 1000:.1f}ms, "
+                    f"serialize {(serialized - queried) * 1000:.1f}ms")
+        serialize_ms[0] = (serialized - queried) * 1000
+        return payload
+
+    payload = table_cache.get_or_compute(get_calls.get_data_version(), key, compute)
+    return payload, serialize_ms[0]
+
+@app.server.route('/tables/<table_id>/<version>')
+def table_payload(table_id, version):
+    """one page of a dashboard table as pre-serialized bytes, the url changes with the data version"""
+    if table_id not in PAGED_TABLES:
+        abort(404)
+    try:
+        page_current = max(0, request.args.get('page', 0, type=int))
+        page_size = min(MAX_PAGE_SIZE, max(1, request.args.get('size', PAGE_SIZE, type=int)))
+        sort_by = json.loads(request.args.get('sort') or '[]')
+    except ValueError:
+        abort(400)
+    # DataTable sends sort_by as a list of {column_id, direction}
+    if not isinstance(sort_by, list) or not all(isinstance(sort, dict) for sort in sort_by):
+        abort(400)
+    if page_current * page_size > MAX_OFFSET:
+        abort(400)
+    started = time.perf_counter()
+    payload, serialize_ms = serialized_page(table_id, page_current, page_size, sort_by, request.args.get('filter', ''))
+    served_ms = (time.perf_counter() - started) * 1000
+
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = Response(payload, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(gzip.decompress(payload), mimetype='application/json')
+    response.headers['Vary'] = 'Accept-Encoding'
+    # a page at a given version never changes, an out of date version gets the current data uncached
+    response.headers['Cache-Control'] = ('public, max-age=31536000, immutable' if version == current_data_version()
+                                         else 'no-cache')
+    response.headers['Server-Timing'] = f"serialize;dur={serialize_ms:.1f}, total;dur={served_ms:.1f}"
+    return response
+
+# clientside: each table fetches its page from /tables while its panel is open
+for table_id in PAGED_TABLES:
+    app.clientside_callback(
+        ClientsideFunction(namespace='tables', function_name='page'),
+        [Output(table_id, 'data'), Output(table_id, 'page_count')],
+        [Input('data-version', 'data'), Input('panels', 'active_item')]
+        + [Input(table_id, prop) for prop in ['page_current', 'page_size', 'sort_by', 'filter_query']],
+        [State(table_id, 'id'), State('table-routes', 'data')]
+    )
 
 if __name__ == '__main__':
-    app.run_server(debug=True)
+    # development only, production runs wsgi:server under gunicorn
+    app.run(debug=os.getenv('DASH_DEBUG') == '1')
     
\ No newline at end of file
@@ -0,0 +1,32 @@
+// Dashboard tables fetch their pages from the /tables route, which serves
+// pre-serialized gzip bytes per data version. Dash runs this in the browser,
+// so an unchanged page can come straight from the HTTP cache.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    tables: {
+        page: function (version, activeItem, pageCurrent, pageSize, sortBy, filterQuery, tableId, routes) {
+            var noUpdate = window.dash_clientside.no_update;
+            var itemId = routes.panels[tableId];
+            var open = activeItem === itemId || (Array.isArray(activeItem) && activeItem.indexOf(itemId) !== -1);
+            // closed panels skip the request, opening one fires this again
+            if (!version || !open) {
+                return [noUpdate, noUpdate];
+            }
+            var params = new URLSearchParams({
+                page: pageCurrent || 0,
+                size: pageSize,
+                sort: JSON.stringify(sortBy || []),
+                filter: filterQuery || ''
+            });
+            var url = routes.prefix + 'tables/' + encodeURIComponent(tableId) + '/'
+                + encodeURIComponent(version) + '?' + params.toString();
+            return fetch(url).then(function (response) {
+                if (!response.ok) {
+                    throw new Error('table page request failed: ' + response.status);
+                }
+                return response.json();
+            }).then(function (payload) {
+                return [payload.data, payload.page_count];
+            });
+        }
+    }
+});
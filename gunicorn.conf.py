@@ -0,0 +1,20 @@
+"""
+gunicorn settings for the dashboard, every value can be overridden from the
+environment. The app is imported once before forking so workers share its
+memory copy-on-write and start without re-importing dash and pandas.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8050')}"
+# each worker keeps its own table cache, threads share it
+workers = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('WEB_THREADS', 4))
+worker_class = 'gthread'
+preload_app = True
+timeout = int(os.getenv('WEB_TIMEOUT', 30))
+keepalive = 5
+# recycle workers now and then so a slow leak can't build up
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 5000))
+max_requests_jitter = 500
+accesslog = os.getenv('WEB_ACCESS_LOG', '-')
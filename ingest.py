@@ -0,0 +1,111 @@
+"""
+Scrapes Bovada, ESPN picks and nfl.com news on a schedule, outside the Dash
+web process. The dashboard only reads what this job writes.
+
+python ingest.py           # run now, then every INGEST_INTERVAL seconds
+python ingest.py --once    # single run, e.g. from cron
+python ingest.py --once --backfill-news 50   # also read 50 pages of older news
+"""
+import argparse
+import fcntl
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+import utils.archive as archive
+import utils.get_calls as get_calls
+import utils.insert_data as insert_data
+import utils.insert_news as insert_news
+import utils.ml as ml
+import utils.schema as schema
+import utils.timing as timing
+
+INGEST_INTERVAL = int(os.getenv('INGEST_INTERVAL', 24*60*60))  # seconds
+LOCK_PATH = os.getenv('INGEST_LOCK', 'ingest.lock')
+
+def setup_logger(name):
+    """Set up a logger for a given module."""
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+
+    # Create file handler which logs even debug messages
+    fh = logging.FileHandler('app.log')
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] - %(message)s')
+    fh.setFormatter(formatter)
+
+    # Add the handler to the logger
+    if not logger.handlers:
+        logger.addHandler(fh)
+
+    return logger
+
+logger = setup_logger(__name__)
+
+@contextmanager
+def single_flight(path=LOCK_PATH):
+    """holds an exclusive lock on path, yields False if another run already holds it"""
+    with open(path, 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def run_once(news_backfill_pages=None):
+    """runs every ingest stage once, returns False if another run was in progress"""
+    with single_flight() as acquired:
+        if not acquired:
+            logger.info("SKIPPED data grab, another ingest run holds the lock")
+            return False
+
+        schema.ensure_schema()
+        timing.reset()
+        start, end = get_calls.get_start_end()
+        # one failing source shouldn't stop the other from updating
+        try:
+            insert_data.insert_betting_expert_data(start, end)
+        except Exception as e:
+            logger.exception(f"betting/expert ingest failed, {e}")
+        try:
+            insert_news.insert_espn_news(start, end, backfill_pages=news_backfill_pages)
+        except Exception as e:
+            logger.exception(f"espn_news ingest failed, {e}")
+        # picks read what the stages above stored, so they are scored last
+        try:
+            with timing.timed('picks.score'):
+                ml.update_picks(start, end)
+        except Exception as e:
+            logger.exception(f"picks scoring failed, {e}")
+        # finished weeks move to Parquet, a no-op until a week comes due
+        try:
+            with timing.timed('archive'):
+                archive.archive()
+        except Exception as e:
+            logger.exception(f"archive failed, {e}")
+        logger.info(f"INGEST stage timings: {timing.report()}")
+        return True
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--once', action='store_true', help="run a single ingest and exit")
+    parser.add_argument('--interval', type=int, default=INGEST_INTERVAL, help="seconds between runs")
+    parser.add_argument('--backfill-news', type=int, metavar='PAGES',
+                        help="with --once, read this many all-news pages without stopping at known titles")
+    args = parser.parse_args()
+
+    if args.once:
+        run_once(news_backfill_pages=args.backfill_news)
+        return
+
+    while True:
+        started = time.monotonic()
+        run_once()
+        time.sleep(max(0, args.interval - (time.monotonic() - started)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Times the dashboard's hot queries on a database holding 1 and then 3
+seasons of scraped rows, before and after utils/archive.py moves the
+finished weeks to Parquet. Also times read_history for an archived week.
+
+run from the repo root: python -m test_scripts.bench_archive [bovada rows per game]
+"""
+import hashlib
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import utils.archive as archive
+import utils.get_calls as get_calls
+import utils.relevance as relevance
+import utils.schema as schema
+
+def fill(path, weeks, lines_per_game):
+    rng = random.Random(0)
+    schema.ensure_schema(path)
+    teams = list(relevance.TEAMS)
+    now = datetime.now()
+    with sqlite3.connect(path) as conn:
+        # the current week is weeks_back 0
+        for weeks_back in range(weeks):
+            day = now - timedelta(weeks=weeks_back)
+            date = day.strftime(schema.ISO_DATE)
+            bovada, merged, news, scores = [], [], [], []
+            for g in range(12):
+                home, away = teams[2 * g], teams[2 * g + 1]
+                game_id = hashlib.md5(f"{date}_{home}_{away}".encode()).hexdigest()
+                for line in range(lines_per_game):
+                    bovada.append((date, '1:00 PM', line, home, away, -150 + line % 7, 130, 280, 'Sunday',
+                                   0.0, game_id, f"{game_id}{line}"))
+                for ingest in range(7):
+                    ingested = (day - timedelta(days=ingest)).replace(microsecond=0)
+                    merged.append((game_id, f"{home} vs {away}", home, 1.0, game_id, '7', None, '1:00 PM', 60.0,
+                                   f"60% of experts chose {home}", ingested.strftime('%m/%d %H:%M'),
+                                   f"{game_id}{ingest}", ingested.strftime(schema.ISO_DATETIME)))
+            for a in range(300):
+                title = f"{date} story {a}"
+                news.append((title, date, f"[link](https://www.nfl.com/news/{a})", None, 'True', '{}', 'llm', 1.0))
+                scores.append((title, rng.choice(teams), rng.randint(-5, 5)))
+            conn.executemany("INSERT INTO bovada_data VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", bovada)
+            conn.executemany("INSERT INTO merged_data VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", merged)
+            conn.executemany("INSERT INTO espn_news VALUES (?, ?, ?, ?, ?, ?, ?, ?)", news)
+            conn.executemany("INSERT INTO article_team_scores VALUES (?, ?, ?)", scores)
+    conn.close()
+
+def best_of(fn, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+def hot_queries():
+    start, end = get_calls.get_start_end()
+    return {
+        'bovada week': best_of(lambda: get_calls.get_bovada_data(start, end)),
+        'merged latest': best_of(lambda: get_calls.get_merged_data()),
+        'news page': best_of(lambda: get_calls.get_table_page('news', start, end, sort_by=[{'column_id': 'Date', 'direction': 'desc'}])),
+        'team rating': best_of(lambda: get_calls.get_table_page('team_rating', start, end)),
+    }
+
+def run(seasons, lines_per_game):
+    with tempfile.TemporaryDirectory() as tmp:
+        schema.DB_PATH = os.path.join(tmp, 'bench.db')
+        archive_dir = os.path.join(tmp, 'archive')
+        fill(schema.DB_PATH, 18 * seasons, lines_per_game)
+        before_mb = os.path.getsize(schema.DB_PATH) / 1e6
+        before = hot_queries()
+
+        started = time.perf_counter()
+        moved = archive.archive(archive_dir=archive_dir, vacuum=True)
+        archive_s = time.perf_counter() - started
+        after_mb = os.path.getsize(schema.DB_PATH) / 1e6
+        after = hot_queries()
+        old_week = datetime.now() - timedelta(weeks=10)
+        history_ms = best_of(lambda: archive.read_history('bovada_data', old_week - timedelta(days=3),
+                                                          old_week + timedelta(days=3), archive_dir), 5)
+
+        rows = sum(sum(counts.values()) for counts in moved.values())
+        print(f"{seasons} season(s): archived {rows} rows in {archive_s:.1f}s, data-log.db {before_mb:.0f}MB -> {after_mb:.1f}MB")
+        for name in before:
+            print(f"  {name:<14} {before[name]:6.2f}ms -> {after[name]:6.2f}ms")
+        print(f"  read_history of an archived bovada week {history_ms:.1f}ms")
+
+if __name__ == '__main__':
+    lines_per_game = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    for seasons in (1, 3):
+        run(seasons, lines_per_game)
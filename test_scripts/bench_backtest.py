@@ -0,0 +1,104 @@
+"""
+Times utils/backtest.py on a synthetic full season (18 weeks x 16 games, with
+odds, expert consensus, news scores and final scores) in a throwaway
+database. Checks that the broadcast grid search grades DEFAULT_WEIGHTS
+the same as calling ml.score week by week.
+
+run from the repo root: python -m test_scripts.bench_backtest [grid steps ...]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import utils.backtest as backtest
+import utils.ml as ml
+import utils.relevance as relevance
+import utils.schema as schema
+
+SEASON_START = pd.Timestamp('2024-09-05')
+
+def seed_season(path, weeks=18, games=16, seed=0):
+    rng = random.Random(seed)
+    schema.ensure_schema(path)
+    teams = list(relevance.TEAMS)
+    bovada, merged, news, scores, results = [], [], [], [], []
+    for week in range(weeks):
+        day = SEASON_START + pd.Timedelta(weeks=week)
+        order = rng.sample(teams, 2 * games)
+        for g in range(games):
+            home, away = order[2 * g], order[2 * g + 1]
+            date = (day + pd.Timedelta(days=3 * (g % 2))).strftime(schema.ISO_DATE)
+            game_id = f"{date}_{home}_{away}"
+            edge = rng.gauss(0, 1)
+            line = int(120 + 150 * abs(edge))
+            home_win, away_win = (-line, line - 20) if edge > 0 else (line - 20, -line)
+            bovada.append((date, '1:00', rng.randint(100, 5000), home, away, home_win, away_win,
+                           abs(home_win - away_win), game_id))
+            merged.append((f"{home} vs {away}", game_id, f"{rng.randint(50, 100)}% of experts chose {home}"))
+            # the favorite wins about two thirds of the time
+            home_won = (edge + rng.gauss(0, 1.2)) > 0
+            results.append((date, home, away, 24 if home_won else 17, 17 if home_won else 24))
+        for a in range(40):
+            title = f"Week {week} story {a}"
+            news.append((title, (day - pd.Timedelta(days=1)).strftime(schema.ISO_DATE)))
+            scores.append((title, rng.choice(teams), rng.randint(-5, 5)))
+    with sqlite3.connect(path) as conn:
+        conn.executemany("""INSERT INTO bovada_data (date, time, bets, home_team, away_team, home_win, away_win,
+                                                     win_differential, game_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", bovada)
+        conn.executemany("INSERT INTO merged_data (matchup, alt_game_id, message) VALUES (?, ?, ?)", merged)
+        conn.executemany("INSERT INTO espn_news (title, date, relevant) VALUES (?, ?, 'True')", news)
+        conn.executemany("INSERT INTO article_team_scores (title, team, rating) VALUES (?, ?, ?)", scores)
+        conn.executemany("""INSERT INTO game_results (date, home_team, away_team, home_points, away_points)
+                            VALUES (?, ?, ?, ?, ?)""", results)
+    conn.close()
+
+def per_week_hit_rate(games, weights):
+    """DEFAULT_WEIGHTS graded the slow way, ml.score once per stored week"""
+    bovada, messages, sentiment = backtest.load_inputs()
+    picks = []
+    for (season, week), week_games in bovada.groupby(['season', 'week']):
+        team_rating = sentiment.loc[(season, week)].rename_axis('Team').reset_index(name='AI News Sentiment Score')
+        merged = pd.DataFrame({'Matchup': week_games['home_team'] + ' vs ' + week_games['away_team'],
+                               'message': week_games['game_id'].map(messages)})
+        picks.append(ml.score(ml.game_features(week_games, team_rating, merged), weights))
+    picks = pd.concat(picks).set_index('game_id').loc[games['game_id']]
+    winners = np.where(games['home_won'], games['home_team'], games['away_team'])
+    return (picks['pick'].to_numpy() == winners).mean()
+
+def run(steps):
+    started = time.perf_counter()
+    games, terms = backtest.load_history()
+    load_s = time.perf_counter() - started
+    home_won = games['home_won'].to_numpy(bool)
+    grid = backtest.weight_grid(steps)
+
+    started = time.perf_counter()
+    slow = per_week_hit_rate(games, ml.DEFAULT_WEIGHTS)
+    per_vector_s = time.perf_counter() - started
+    fast = backtest.evaluate(terms, home_won, ml.weight_vector(ml.DEFAULT_WEIGHTS)[None, :])[0, 0]
+
+    timings = {}
+    for workers in (1, os.cpu_count() or 1, 4):
+        started = time.perf_counter()
+        scores = backtest.search(terms, home_won, grid, workers=workers)
+        timings[workers] = time.perf_counter() - started
+    favorite = (games['favorite_home'] == games['home_won']).mean()
+    print(f"steps {steps}: {len(games)} games, {len(grid)} weight vectors, load {load_s:.2f}s")
+    print("  grid search " + ", ".join(f"{workers} worker(s) {seconds:.2f}s" for workers, seconds in timings.items())
+          + f", week by week ml.score {per_vector_s * 1000:.0f}ms per vector"
+            f" (~{per_vector_s * len(grid) / 3600:.1f}h for the grid)")
+    print(f"  DEFAULT_WEIGHTS hit rate {fast:.3f}, week by week {slow:.3f}, odds favorite {favorite:.3f},"
+          f" best in grid {scores[:, 0].max():.3f}")
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as tmp:
+        schema.DB_PATH = os.path.join(tmp, 'bench.db')
+        seed_season(schema.DB_PATH)
+        for steps in [int(arg) for arg in sys.argv[1:]] or [6, 11]:
+            run(steps)
@@ -0,0 +1,122 @@
+"""
+Runs check_relevance and score_article through the shared LLMExecutor against
+a local stub client with fixed latency and a share of 429 responses, and
+compares that with one call at a time and with a second pass answered from
+the llm_cache table. Then classifies the titles one request per title against
+check_relevance_batch, with a share of batch responses malformed. Nothing
+leaves the machine. The correctness checks live in test_scripts/test_llm.py.
+
+run from the repo root: python -m test_scripts.bench_llm [calls] [--latency 0.2] [--rate-limited 0.1] [--rpm 300] [--malformed 0.1]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+import utils.fetch as fetch
+import utils.insert_news as insert_news
+import utils.llm as llm
+import utils.schema as schema
+
+class StubRateLimit(Exception):
+    status_code = 429
+
+def is_relevant(title):
+    return str(int(title.split()[-1]) % 2 == 0)
+
+class StubClient:
+    """answers chat.completions.create like the OpenAI client, even numbered titles are relevant"""
+
+    def __init__(self, latency, rate_limited, malformed=0.0):
+        self.latency = latency
+        self.rate_limited = rate_limited
+        self.malformed = malformed
+        self.calls = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            if random.random() < self.rate_limited:
+                self.rejected += 1
+                raise StubRateLimit("rate limited")
+        content = messages[-1]['content']
+        if content.startswith('0. '):
+            content = self.answer_batch(content)
+        elif messages[0]['content'].startswith('Reply True or False'):
+            content = is_relevant(content)
+        else:
+            content = f"echo {content}"
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def answer_batch(self, numbered):
+        """some batch responses come back truncated"""
+        titles = [line.split('. ', 1)[1] for line in numbered.split('\n')]
+        content = json.dumps({'results': [{'id': i, 'relevant': is_relevant(title) == 'True'}
+                                          for i, title in enumerate(titles)]})
+        return content[:len(content) // 2] if random.random() < self.malformed else content
+
+def run(executor, titles):
+    started = time.perf_counter()
+    relevance = executor.map(insert_news.check_relevance, titles)
+    scores = executor.map(insert_news.score_article, titles)
+    return time.perf_counter() - started, relevance, scores
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('calls', nargs='?', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--rate-limited', type=float, default=0.1)
+    parser.add_argument('--rpm', type=float, default=llm.LLM_RPM)
+    parser.add_argument('--malformed', type=float, default=0.1)
+    args = parser.parse_args()
+
+    fetch.configure('live')
+    titles = [f"title {i}" for i in range(args.calls)]
+    relevant = [is_relevant(title) for title in titles]
+    scored = [f"echo {title}" for title in titles]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, executor, db in [
+            ('sequential', llm.LLMExecutor(max_workers=1, requests_per_minute=60000, base_delay=0.05), 'sequential.db'),
+            ('executor', llm.LLMExecutor(requests_per_minute=args.rpm, base_delay=0.05), 'executor.db'),
+            ('cached', llm.LLMExecutor(requests_per_minute=args.rpm, base_delay=0.05), 'executor.db'),
+        ]:
+            schema.DB_PATH = os.path.join(tmp, db)
+            schema.ensure_schema()
+            insert_news.llm_cache.reset_stats()
+            stub = StubClient(args.latency, args.rate_limited)
+            insert_news.set_client(stub)
+            insert_news.llm_executor = executor
+            seconds, relevance, scores = run(executor, titles)
+            assert relevance == relevant and scores == scored, f"{name}: results out of input order"
+            print(f"{name:<10} {2 * len(titles)} results in {seconds:6.2f}s, "
+                  f"{stub.calls} calls, {stub.rejected} rate limited, "
+                  f"cache {insert_news.llm_cache.stats()}")
+
+        # relevance alone, per title and batched, on fresh caches
+        for name, batch_size in [('per title', 1), ('batched', insert_news.RELEVANCE_BATCH_SIZE)]:
+            schema.DB_PATH = os.path.join(tmp, f"relevance-{batch_size}.db")
+            schema.ensure_schema()
+            stub = StubClient(args.latency, args.rate_limited, args.malformed)
+            insert_news.set_client(stub)
+            insert_news.llm_executor = executor = llm.LLMExecutor(requests_per_minute=args.rpm, base_delay=0.05)
+            started = time.perf_counter()
+            if batch_size == 1:
+                relevance = executor.map(insert_news.check_relevance, titles)
+            else:
+                batches = [titles[i:i + batch_size] for i in range(0, len(titles), batch_size)]
+                relevance = [answer for batch in executor.map(insert_news.check_relevance_batch, batches)
+                             for answer in batch]
+            seconds = time.perf_counter() - started
+            assert relevance == relevant, f"{name}: wrong or missing answers"
+            print(f"{name:<10} {len(titles)} titles in {seconds:6.2f}s, "
+                  f"{stub.calls} calls, {stub.rejected} rate limited")
@@ -0,0 +1,106 @@
+"""
+Compares the old module-level ml.py script (row-wise apply, three
+MinMaxScaler fits) with ml.score on synthetic weeks, and checks that both
+pick the same winners with the same confidence.
+
+needs scikit-learn for the legacy version
+run from the repo root: python -m test_scripts.bench_ml [games ...]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+import utils.ml as ml
+import utils.relevance as relevance
+
+def make_week(n, seed=0):
+    """(bovada, team_rating, merged) frames shaped like the get_calls readers return them"""
+    rng = random.Random(seed)
+    teams = list(relevance.TEAMS)
+    # team names repeat past 16 games, suffix them so home teams stay unique like a real week
+    pairs = [(f"{teams[2 * i % 32]} {i // 16}", f"{teams[(2 * i + 1) % 32]} {i // 16}") for i in range(n)]
+    bovada = pd.DataFrame({
+        'date': pd.Timestamp('2024-10-20'),
+        'bets': [rng.randint(100, 5000) for _ in pairs],
+        'home_team': [home for home, away in pairs],
+        'away_team': [away for home, away in pairs],
+        'home_win': [rng.choice([-1, 1]) * rng.randint(100, 400) for _ in pairs],
+        'away_win': [rng.choice([-1, 1]) * rng.randint(100, 400) for _ in pairs],
+        'points': 0.0,
+        'game_id': [f"game{i}" for i in range(n)],
+    })
+    bovada['win_diff'] = (bovada['home_win'] - bovada['away_win']).abs()
+    # a second, less bet on line per game that the dedupe drops
+    bovada = pd.concat([bovada, bovada.assign(bets=1, home_win=0)], ignore_index=True)
+    team_rating = pd.DataFrame({
+        'Team': [team for pair in pairs for team in pair],
+        'AI News Sentiment Score': [rng.randint(-10, 10) for _ in range(2 * n)],
+    })
+    merged = pd.DataFrame({
+        'Matchup': [f"{home} vs {away}" for home, away in pairs],
+        'Projected Winner': [home for home, away in pairs],
+        'Ranking': 0.0, 'Week': '7', 'Time': '', 'IngestTime': '',
+        'message': [f"{rng.randint(50, 100)}% of experts chose {home}" for home, away in pairs],
+    })
+    return bovada, team_rating, merged
+
+def legacy_score(bovada_data, team_rating, merged_data):
+    """the scoring steps of ml.py before score_week, on the same inputs"""
+    bovada_data = bovada_data.sort_values('bets', ascending=False).drop_duplicates(subset='game_id', keep='first')
+    bovada_data = bovada_data.merge(team_rating, left_on='home_team', right_on='Team', how='left')
+    bovada_data = bovada_data.rename(columns={'AI News Sentiment Score': 'Home AI News Sentiment'})
+    bovada_data = bovada_data.drop(columns=['Team'])
+    bovada_data = bovada_data.merge(team_rating, left_on='away_team', right_on='Team', how='left')
+    bovada_data = bovada_data.rename(columns={'AI News Sentiment Score': 'Away AI News Sentiment'})
+    bovada_data = bovada_data.drop(columns=['Team'])
+    bovada_data['Matchup'] = bovada_data.apply(lambda x: x['home_team'] + ' vs ' + x['away_team'], axis=1)
+
+    data = pd.merge(bovada_data, merged_data, on='Matchup', how='left')
+    data = data.drop(columns=['points', 'Ranking', 'Time', 'IngestTime', 'Matchup', 'Projected Winner', 'Week']).drop_duplicates(subset='home_team')
+
+    scaler = MinMaxScaler()
+    data[['win_diff', 'home_win', 'away_win']] = scaler.fit_transform(data[['win_diff', 'home_win', 'away_win']].fillna(0))
+    data[['Home AI News Sentiment', 'Away AI News Sentiment']] = scaler.fit_transform(data[['Home AI News Sentiment', 'Away AI News Sentiment']].fillna(0))
+    data['expert_opinion'] = data['message'].str.extract(r'(\d+)%').astype(float) / 100
+    data['expert_opinion'] = scaler.fit_transform(data[['expert_opinion']])
+
+    weights = {'win_diff': 0.4, 'home_win': 0.2, 'away_win': 0.2,
+               'Home AI News Sentiment': 0.1, 'Away AI News Sentiment': 0.1, 'expert_opinion': 0.3}
+    data['home_score'] = (data['win_diff'] * weights['win_diff'] + (1 - data['home_win']) * weights['home_win']
+                          + data['Home AI News Sentiment'] * weights['Home AI News Sentiment']
+                          + data['expert_opinion'] * weights['expert_opinion'])
+    data['away_score'] = (data['win_diff'] * weights['win_diff'] + (1 - data['away_win']) * weights['away_win']
+                          + data['Away AI News Sentiment'] * weights['Away AI News Sentiment']
+                          + (1 - data['expert_opinion']) * weights['expert_opinion'])
+    data['confidence_score'] = data['home_score'] - data['away_score']
+    data['ranking'] = data['confidence_score'].apply(abs)
+    data['pick'] = data.apply(lambda row: row['home_team'] if row['confidence_score'] > 0 else row['away_team'], axis=1)
+    return data.sort_values('ranking', ascending=False)
+
+def best_of(fn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def run(n):
+    week = make_week(n)
+    legacy_s, legacy = best_of(lambda: legacy_score(*week))
+    new_s, new = best_of(lambda: ml.score(ml.game_features(*week)))
+    legacy = legacy.set_index('game_id').loc[new['game_id']]
+    # exact ties come out as +-1e-16 from the legacy running sum and 0 from the dot product
+    decided = new['confidence'].abs().to_numpy() > 1e-9
+    same_picks = (legacy['pick'].to_numpy() == new['pick'].to_numpy())[decided].all()
+    same_confidence = np.allclose(legacy['confidence_score'].to_numpy(), new['confidence'].to_numpy())
+    print(f"{n:>7} games  legacy {legacy_s * 1000:9.1f}ms  score {new_s * 1000:8.1f}ms"
+          f"  x{legacy_s / new_s:.1f}  same picks: {same_picks}, same confidence: {same_confidence}, ties: {(~decided).sum()}")
+
+if __name__ == '__main__':
+    for n in [int(arg) for arg in sys.argv[1:]] or [16, 1000, 100000]:
+        run(n)
@@ -0,0 +1,93 @@
+"""
+Compares the old per-row insert_news / update_column loops with the
+executemany upserts in utils/insert_news.py on a throwaway database.
+
+run from the repo root: python -m test_scripts.bench_news_upsert [articles ...]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import utils.insert_news as insert_news
+import utils.schema as schema
+
+def make_articles(n, classified=False):
+    return pd.DataFrame({
+        'title': [f"Headline {i}" for i in range(n)],
+        'date': '2024-10-20',
+        'link': [f"https://www.nfl.com/news/headline-{i}" for i in range(n)],
+        'image_url': [f"https://static.nfl.com/{i}.jpg" for i in range(n)],
+        'relevant': 'True' if classified else None,
+        'ai_score': '{"Buffalo Bills": 1}' if classified else None,
+    })
+
+def legacy_insert_news(df):
+    """insert_news before the upsert, one SELECT and one INSERT or UPDATE per article"""
+    conn = sqlite3.connect(schema.DB_PATH)
+    cursor = conn.cursor()
+
+    def row_exists_and_relevant_not_none(title):
+        cursor.execute("SELECT relevant FROM espn_news WHERE title = ?", (title,))
+        row = cursor.fetchone()
+        return row is not None and row[0] is not None
+
+    for ix, row in df.iterrows():
+        if row_exists_and_relevant_not_none(row['title']):
+            cursor.execute('''
+            UPDATE espn_news
+            SET date = ?, link = ?, image_url = ?, relevant = ?, ai_score = ?
+            WHERE title = ?
+            ''', (row['date'], row['link'], row['image_url'], row['relevant'], row['ai_score'], row['title']))
+        else:
+            cursor.execute('''
+            INSERT OR IGNORE INTO espn_news (title, date, link, image_url, relevant, ai_score)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', (row['title'], row['date'], row['link'], row['image_url'], row['relevant'], row['ai_score']))
+    conn.commit()
+    conn.close()
+
+def legacy_update_column(row_name, df):
+    """update_column before executemany, one UPDATE per article"""
+    conn = sqlite3.connect(schema.DB_PATH)
+    cursor = conn.cursor()
+    for ix, row in df.iterrows():
+        cursor.execute(f'''
+            UPDATE espn_news
+            SET {row_name} = ?
+            WHERE title = ?
+            ''', (row[row_name], row['title']))
+    conn.commit()
+    conn.close()
+
+def run(n):
+    # half the page is already stored and classified, the rest is new
+    stored = make_articles(n // 2, classified=True)
+    scraped = make_articles(n)
+    scored = scraped.assign(ai_score='{"Buffalo Bills": 2}')
+
+    timings = {}
+    for name, insert, update in (('legacy', legacy_insert_news, legacy_update_column),
+                                 ('upsert', insert_news.insert_news, insert_news.update_column)):
+        with tempfile.TemporaryDirectory() as tmp:
+            schema.DB_PATH = os.path.join(tmp, 'bench.db')
+            schema.ensure_schema()
+            insert_news.insert_news(stored)
+            started = time.perf_counter()
+            insert(scraped)
+            update('ai_score', scored)
+            timings[name] = time.perf_counter() - started
+            with sqlite3.connect(schema.DB_PATH) as conn:
+                kept = conn.execute("SELECT COUNT(*) FROM espn_news WHERE relevant = 'True'").fetchone()[0]
+            conn.close()
+        timings[f"{name} kept"] = kept
+    print(f"{n:>6} articles  legacy {timings['legacy']:7.3f}s  upsert {timings['upsert']:7.3f}s"
+          f"  x{timings['legacy'] / timings['upsert']:.1f}"
+          f"  classified rows kept: legacy {timings['legacy kept']}, upsert {timings['upsert kept']}")
+
+if __name__ == '__main__':
+    for n in [int(arg) for arg in sys.argv[1:]] or [1000, 3000, 10000]:
+        run(n)
@@ -0,0 +1,105 @@
+"""
+Line-movement queries against the appended bovada_data rows and against the
+odds_history time series. Both are filled with the same synthetic 1-minute
+snapshots (18 weeks x 16 games a season, written a scrape at a time). The
+bench checks that the per game and per week reads stay flat as seasons pile
+up, and compares the size on disk.
+
+run from the repo root: python -m test_scripts.bench_odds_history [snapshots per game]
+"""
+import hashlib
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import utils.odds as odds
+import utils.relevance as relevance
+import utils.schema as schema
+
+def fill(path, seasons, snapshots):
+    rng = random.Random(0)
+    schema.ensure_schema(path)
+    teams = list(relevance.TEAMS)
+    conn = sqlite3.connect(path)
+    for season in range(2024 - seasons + 1, 2025):
+        kickoff = pd.Timestamp(season, 9, 8)
+        for week in range(18):
+            day = kickoff + pd.Timedelta(weeks=week)
+            games = pd.DataFrame({
+                'game_id': [hashlib.md5(f"{day}{g}".encode()).hexdigest() for g in range(16)],
+                'date': day.strftime(schema.ISO_DATE),
+                'home_team': teams[:16], 'away_team': teams[16:],
+            })
+            keys = odds.game_keys(conn, games)
+            lines = {game_id: [rng.randint(-300, -110), rng.randint(100, 280), 100] for game_id in games['game_id']}
+            started = int(day.timestamp()) - snapshots * 60
+            legacy, history = [], []
+            for minute in range(snapshots):
+                ts = started + minute * 60
+                for game_id, home, away in games[['game_id', 'home_team', 'away_team']].itertuples(index=False):
+                    line = lines[game_id]
+                    line[0] += rng.choice([-5, 0, 0, 0, 5])
+                    line[2] += rng.randint(0, 3)
+                    legacy.append((day.strftime(schema.ISO_DATE), '1:00 PM', line[2], home, away, line[0], line[1],
+                                   abs(line[0] - line[1]), 'Sunday', 0.0, game_id,
+                                   hashlib.md5(f"{game_id}{ts}".encode()).hexdigest()))
+                    history.append((keys[game_id], ts, line[0], line[1], line[2]))
+            conn.executemany("INSERT INTO bovada_data VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", legacy)
+            conn.executemany("INSERT INTO odds_history VALUES (?, ?, ?, ?, ?)", history)
+            conn.commit()
+    conn.close()
+
+def table_bytes(path, table, indexes=()):
+    with sqlite3.connect(path) as conn:
+        names = (table,) + tuple(indexes)
+        return conn.execute(f"SELECT SUM(pgsize) FROM dbstat WHERE name IN ({', '.join('?' for _ in names)})",
+                            names).fetchone()[0]
+
+def best_of(fn, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000, result
+
+def legacy_game(game_id):
+    with sqlite3.connect(schema.DB_PATH) as conn:
+        return pd.read_sql_query("SELECT rowid, date, home_win, away_win, bets FROM bovada_data WHERE game_id = ? ORDER BY rowid",
+                                 conn, params=(game_id,))
+
+def legacy_week(start, end):
+    with sqlite3.connect(schema.DB_PATH) as conn:
+        return pd.read_sql_query("""SELECT game_id, rowid, home_win, away_win, bets FROM bovada_data
+                                    WHERE date BETWEEN ? AND ? ORDER BY game_id, rowid""", conn, params=(start, end))
+
+def run(seasons, snapshots):
+    with tempfile.TemporaryDirectory() as tmp:
+        schema.DB_PATH = os.path.join(tmp, 'bench.db')
+        fill(schema.DB_PATH, seasons, snapshots)
+        with sqlite3.connect(schema.DB_PATH) as conn:
+            game_id, date, season, week = conn.execute(
+                "SELECT game_id, date, season, week FROM games ORDER BY game_key DESC LIMIT 1 OFFSET 40").fetchone()
+            rows = conn.execute("SELECT COUNT(*) FROM odds_history").fetchone()[0]
+        conn.close()
+
+        legacy_game_ms, legacy_rows = best_of(lambda: legacy_game(game_id))
+        game_ms, game_rows = best_of(lambda: odds.line_movement(game_id))
+        legacy_week_ms, legacy_week_rows = best_of(lambda: legacy_week(date, date), 5)
+        week_ms, week_rows = best_of(lambda: odds.week_movement(season, week), 5)
+        legacy_mb = table_bytes(schema.DB_PATH, 'bovada_data', ('idx_bovada_data_game_id', 'idx_bovada_data_date')) / 1e6
+        history_mb = table_bytes(schema.DB_PATH, 'odds_history') / 1e6
+        assert len(legacy_rows) == len(game_rows) and len(legacy_week_rows) == len(week_rows)
+        print(f"{seasons} season(s), {rows} snapshots: bovada_data {legacy_mb:.0f}MB, odds_history {history_mb:.0f}MB")
+        print(f"  one game ({len(game_rows)} rows)  bovada_data {legacy_game_ms:6.1f}ms  odds_history {game_ms:6.1f}ms")
+        print(f"  one week ({len(week_rows)} rows) bovada_data {legacy_week_ms:6.1f}ms  odds_history {week_ms:6.1f}ms")
+
+if __name__ == '__main__':
+    snapshots = int(sys.argv[1]) if len(sys.argv) > 1 else 720
+    for seasons in (1, 3):
+        run(seasons, snapshots)
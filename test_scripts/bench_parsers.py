@@ -0,0 +1,93 @@
+"""
+Times the old html.parser + positional split path against utils/parsers.py
+on the Bovada and nfl.com pages of recorded fixture sets, and checks both
+paths read the same values.
+
+run from the repo root: python -m test_scripts.bench_parsers [fixtures/week7 more sets ...] [--repeat 20]
+without a set it reads test_scripts/fixtures/synthetic
+"""
+import argparse
+import time
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+import utils.fetch as fetch
+import utils.insert_data as insert_data
+import utils.insert_news as insert_news
+import utils.parsers as parsers
+from test_scripts.make_fixtures import FIXTURE_DIR
+
+BOVADA_COLUMNS = ['date', 'time', 'bets', 'home_team', 'away_team', 'home_win', 'away_win']
+
+def legacy_parse_bovada(html):
+    """the string splitting get_data used before the parser layer"""
+    soup = BeautifulSoup(html, "html.parser")
+    data = []
+    for game in soup.find_all("section", {"class": "coupon-content more-info"}):
+        item = str(game).split('>')
+        data.append([x.split('<')[0].strip() for x in item if not x.startswith("<")])
+    df = pd.DataFrame(data)
+    df = df.rename(columns={0: "date", 1: "time", 2: "bets", 6: "home_team", 7: "away_team",
+                            14: "home_win", 15: "away_win"})
+    return df[BOVADA_COLUMNS] if len(df) else pd.DataFrame(columns=BOVADA_COLUMNS)
+
+def legacy_parse_news(html):
+    """the soup walk get_espn_news used before the parser layer"""
+    soup = BeautifulSoup(html, 'html.parser')
+    scraped_data = []
+
+    def extract_article_data(article):
+        image_tag = article.find('picture').find('img')
+        scraped_data.append({
+            'title': article.find('h3', class_='d3-o-media-object__title').get_text(strip=True),
+            'date': article.find('p', class_='d3-o-media-object__date').get_text(strip=True),
+            'link': f"https://www.nfl.com{article['href']}",
+            'image_url': image_tag['src'] if image_tag else None,
+        })
+
+    for article in soup.find_all('div', class_='d3-o-media-object--vertical'):
+        extract_article_data(article.find('a'))
+    for article in soup.find_all('a', class_='d3-o-media-object--horizontal'):
+        extract_article_data(article)
+    return scraped_data
+
+def best_of(fn, html, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(html)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def compare(label, html, legacy, current, repeat, same):
+    legacy_time, legacy_result = best_of(legacy, html, repeat)
+    current_time, current_result = best_of(current, html, repeat)
+    print(f"    {label:<8}{len(html) / 1024:8.0f} KiB  legacy {legacy_time * 1000:8.1f}ms"
+          f"  parsers {current_time * 1000:8.1f}ms  x{legacy_time / current_time:.1f}"
+          f"  {'same values' if same(legacy_result, current_result) else 'VALUES DIFFER'}")
+
+def same_bovada(legacy, current):
+    return legacy.astype(str).reset_index(drop=True).equals(current.astype(str).reset_index(drop=True))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('fixture_sets', nargs='*', default=[FIXTURE_DIR])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    fetch.configure(mode='replay')
+    for fixture_dir in args.fixture_sets:
+        fetch.configure(fixture_dir=fixture_dir)
+        print(fixture_dir)
+        pages = (
+            ('bovada', insert_data.BOVADA_URL, legacy_parse_bovada, parsers.parse_bovada, same_bovada),
+            ('news', insert_news.NEWS_URL, legacy_parse_news, parsers.parse_news, lambda a, b: a == b),
+        )
+        for label, url, legacy, current, same in pages:
+            try:
+                html = fetch.fetch_page(url)
+            except fetch.FixtureMissing:
+                print(f"    {label:<8}not recorded")
+                continue
+            compare(label, html, legacy, current, args.repeat, same)
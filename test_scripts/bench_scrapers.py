@@ -0,0 +1,86 @@
+"""
+Replays recorded fixture sets through the full ingest pipeline offline and
+times every stage (parse, transform, db write, ...) against a throwaway
+SQLite file.
+
+test_scripts/fixtures/synthetic is replayed when no set is given (rebuild it
+with python -m test_scripts.make_fixtures). Record a live set with
+    FETCH_MODE=record FIXTURE_DIR=fixtures/week7 python ingest.py --once
+then from the repo root:
+    python -m test_scripts.bench_scrapers [fixtures/week7 more sets ...] [--scale 1 5 25]
+
+--scale also replays copies of the first set with every Bovada game coupon
+and nfl.com article repeated N times, to see how each stage grows.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+os.environ.setdefault('API_KEY', 'replay')  # the OpenAI client is never called in replay mode
+
+import utils.fetch as fetch
+import utils.insert_data as insert_data
+import utils.insert_news as insert_news
+import utils.schema as schema
+import utils.timing as timing
+from test_scripts.make_fixtures import FIXTURE_DIR
+
+# wide enough that nothing recorded gets filtered out by date
+START, END = datetime(2000, 1, 1), datetime(2100, 1, 1)
+
+def scale_fixture_set(source, target, factor):
+    """copies a fixture set, repeating each game coupon and news article factor times"""
+    shutil.copytree(source, target)
+    repeat = {
+        insert_data.BOVADA_URL: lambda soup: soup.find_all("section", {"class": "coupon-content more-info"}),
+        insert_news.NEWS_URL: lambda soup: (soup.find_all('div', class_='d3-o-media-object--vertical')
+                                            + soup.find_all('a', class_='d3-o-media-object--horizontal')),
+    }
+    fetch.configure(fixture_dir=target)
+    for url, containers in repeat.items():
+        try:
+            status, html = fetch._replay_page(url)
+        except fetch.FixtureMissing:
+            continue
+        soup = BeautifulSoup(html, 'html.parser')
+        for element in containers(soup):
+            for _ in range(factor - 1):
+                element.insert_after(BeautifulSoup(str(element), 'html.parser'))
+        fetch._record_page(url, status, str(soup))
+
+def run(fixture_dir, label):
+    fetch.configure(mode='replay', fixture_dir=fixture_dir)
+    with tempfile.TemporaryDirectory() as tmp:
+        schema.DB_PATH = os.path.join(tmp, 'bench.db')
+        schema.ensure_schema()
+        timing.reset()
+        started = time.perf_counter()
+        insert_data.insert_betting_expert_data(START, END)
+        insert_news.insert_espn_news(START, END)
+        total = time.perf_counter() - started
+        with sqlite3.connect(schema.DB_PATH) as conn:
+            rows = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    for table in ('bovada_data', 'expert_data', 'merged_data', 'espn_news')}
+    print(f"{label}: {total:.3f}s total  rows {rows}")
+    for stage, seconds in sorted(timing.totals.items()):
+        print(f"    {stage:<22}{seconds:8.3f}s")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('fixture_sets', nargs='*', default=[FIXTURE_DIR])
+    parser.add_argument('--scale', type=int, nargs='*', default=[])
+    args = parser.parse_args()
+
+    for fixture_dir in args.fixture_sets:
+        run(fixture_dir, fixture_dir)
+    with tempfile.TemporaryDirectory() as tmp:
+        for factor in args.scale:
+            scaled = os.path.join(tmp, f"x{factor}")
+            scale_fixture_set(args.fixture_sets[0], scaled, factor)
+            run(scaled, f"{args.fixture_sets[0]} x{factor}")
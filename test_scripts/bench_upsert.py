@@ -0,0 +1,79 @@
+"""
+Compares the old per-game SELECT + DataFrame.equals insert loop with
+insert_data.insert_changed_rows on a throwaway database.
+
+run from the repo root: python -m test_scripts.bench_upsert [rows ...]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import utils.schema as schema
+from utils.insert_data import insert_changed_rows
+
+COLUMNS = ['date', 'time', 'bets', 'home_team', 'away_team', 'home_win', 'away_win',
+           'win_differential', 'day', 'points', 'game_id']
+
+def make_games(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'date': '2024-10-20',
+        'time': '1:00 PM',
+        'bets': rng.integers(0, 500, n),
+        'home_team': [f"Home {i}" for i in range(n)],
+        'away_team': [f"Away {i}" for i in range(n)],
+        'home_win': rng.integers(-400, 400, n),
+        'away_win': rng.integers(-400, 400, n),
+        'win_differential': rng.integers(0, 800, n),
+        'day': 'Sunday',
+        'points': rng.integers(0, 16, n).astype(float),
+        'game_id': [f"game-{i}" for i in range(n)],
+    })[COLUMNS]
+
+def legacy_insert(conn, current_df):
+    """the loop insert_bovada_data ran before fingerprints"""
+    cursor = conn.cursor()
+    games_to_insert_list = []
+    for index, game in current_df.iterrows():
+        cursor.execute("SELECT * FROM bovada_data WHERE game_id = ?", (game['game_id'],))
+        db_game = cursor.fetchone()
+        if db_game:
+            db_game_df = pd.DataFrame([db_game[:len(COLUMNS)]], columns=COLUMNS)
+            current_game_df = pd.DataFrame([game], columns=COLUMNS)
+            if not current_game_df.equals(db_game_df):
+                games_to_insert_list.append(current_game_df)
+        else:
+            games_to_insert_list.append(pd.DataFrame([game], columns=COLUMNS))
+    if games_to_insert_list:
+        pd.concat(games_to_insert_list, ignore_index=True).to_sql('bovada_data', conn, if_exists='append', index=False)
+    conn.commit()
+
+def run(n):
+    seeded = make_games(n)
+    # half the games move their line between scrapes
+    batch = seeded.copy()
+    batch.loc[batch.index[::2], 'bets'] += 1
+
+    timings = {}
+    for name, insert in (('legacy', legacy_insert),
+                         ('fingerprint', lambda conn, df: insert_changed_rows(conn, 'bovada_data', df))):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            schema.ensure_schema(path)
+            conn = sqlite3.connect(path)
+            insert_changed_rows(conn, 'bovada_data', seeded)
+            started = time.perf_counter()
+            insert(conn, batch)
+            timings[name] = time.perf_counter() - started
+            conn.close()
+    print(f"{n:>7} rows  legacy {timings['legacy']:8.3f}s  fingerprint {timings['fingerprint']:8.3f}s"
+          f"  x{timings['legacy'] / timings['fingerprint']:.1f}")
+
+if __name__ == '__main__':
+    for n in [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 20000]:
+        run(n)
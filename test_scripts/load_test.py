@@ -0,0 +1,110 @@
+"""
+Load test for the served dashboard. Each simulated client opens the page
+like a browser (index, layout, dependencies, assets), then polls the data
+version probe and pages through the open table for the test duration.
+Prints request counts and p50 / p95 / p99 latency per request kind.
+
+start the server first, e.g.
+    WEB_WORKERS=4 gunicorn -c gunicorn.conf.py wsgi:server
+then from the repo root:
+    python -m test_scripts.load_test http://127.0.0.1:8050 --clients 100 --duration 30
+"""
+import argparse
+import json
+import random
+import re
+import statistics
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+TABLES = ['data-table', 'news-table', 'team-outlook']
+
+def probe_body(version):
+    return {
+        'output': 'data-version.data',
+        'outputs': {'id': 'data-version', 'property': 'data'},
+        'inputs': [{'id': 'table-refresh-component', 'property': 'n_intervals', 'value': 1}],
+        'changedPropIds': ['table-refresh-component.n_intervals'],
+        'state': [{'id': 'data-version', 'property': 'data', 'value': version}],
+    }
+
+class Client(threading.Thread):
+    def __init__(self, url, deadline, think, results, lock):
+        super().__init__(daemon=True)
+        self.url = url.rstrip('/')
+        self.deadline = deadline
+        self.think = think
+        self.results = results
+        self.lock = lock
+        self.session = requests.Session()
+        self.session.headers['Accept-Encoding'] = 'br, gzip'
+
+    def timed(self, kind, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.url + path, timeout=30, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.results[kind].append(elapsed)
+            if not ok:
+                self.results['errors'].append(kind)
+        return response
+
+    def open_page(self):
+        index = self.timed('index', 'GET', '/')
+        if index is not None:
+            for src in re.findall(r'src="(/[^"]+)"', index.text)[:5]:
+                self.timed('asset', 'GET', src)
+        self.timed('layout', 'GET', '/_dash-layout')
+        self.timed('dependencies', 'GET', '/_dash-dependencies')
+
+    def probe(self, version):
+        response = self.timed('probe', 'POST', '/_dash-update-component', json=probe_body(version))
+        try:
+            return json.loads(response.text)['response']['data-version']['data']
+        except (AttributeError, KeyError, ValueError):
+            return version
+
+    def run(self):
+        self.open_page()
+        version = self.probe(None)
+        table = random.choice(TABLES)
+        while time.monotonic() < self.deadline:
+            page = random.randrange(4)
+            self.timed('table page', 'GET', f"/tables/{table}/{version}", params={'page': page, 'size': 25})
+            time.sleep(random.uniform(0, 2 * self.think))
+            version = self.probe(version)
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1] if len(values) > 1 else values[0]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('url')
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=20, help="seconds")
+    parser.add_argument('--think', type=float, default=0.5, help="mean seconds between a client's requests")
+    args = parser.parse_args()
+
+    results, lock = defaultdict(list), threading.Lock()
+    deadline = time.monotonic() + args.duration
+    started = time.perf_counter()
+    clients = [Client(args.url, deadline, args.think, results, lock) for _ in range(args.clients)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started
+
+    errors = results.pop('errors', [])
+    total = sum(len(values) for values in results.values())
+    print(f"{args.clients} clients, {total} requests in {elapsed:.1f}s ({total / elapsed:.0f} req/s), {len(errors)} errors")
+    for kind, values in sorted(results.items()):
+        print(f"  {kind:<13} {len(values):>6}  p50 {percentile(values, 50) * 1000:7.1f}ms"
+              f"  p95 {percentile(values, 95) * 1000:7.1f}ms  p99 {percentile(values, 99) * 1000:7.1f}ms")
@@ -0,0 +1,209 @@
+"""
+Writes the synthetic fixture set in test_scripts/fixtures/synthetic: a
+Bovada page, the ESPN picks page, an nfl.com all-news page, its article
+pages and the OpenAI responses the ingest asks for, so the replay benches
+run offline without recording live pages first.
+
+The pages mimic the markup the scrapers select on, with made up week 7
+games and headlines. OpenAI answers are canned: a headline is relevant when
+it mentions availability news, and each article rates the teams it names.
+
+run from the repo root: python -m test_scripts.make_fixtures [fixture dir]
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+os.environ.setdefault('API_KEY', 'replay')  # the OpenAI client is never created
+
+import utils.fetch as fetch
+import utils.insert_data as insert_data
+import utils.insert_news as insert_news
+import utils.relevance as relevance
+import utils.schema as schema
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'synthetic')
+
+# (first listed team, second listed team, first team moneyline, second team moneyline, bets)
+GAMES = [
+    ('Tennessee Titans', 'Buffalo Bills', 310, -390, 412),
+    ('Seattle Seahawks', 'Atlanta Falcons', 120, -140, 288),
+    ('Cincinnati Bengals', 'Cleveland Browns', -270, 220, 251),
+    ('Houston Texans', 'Green Bay Packers', 120, -142, 307),
+    ('Philadelphia Eagles', 'New York Giants', -148, 124, 266),
+    ('Las Vegas Raiders', 'Los Angeles Rams', 270, -330, 198),
+    ('Carolina Panthers', 'Washington Commanders', 360, -470, 176),
+    ('Kansas City Chiefs', 'San Francisco 49ers', -102, -118, 533),
+    ('New York Jets', 'Pittsburgh Steelers', -105, -115, 402),
+    ('Baltimore Ravens', 'Tampa Bay Buccaneers', -162, 136, 377),
+]
+GAME_DATE = '10/20/24'
+KICKOFFS = ['1:00 PM', '1:00 PM', '1:00 PM', '1:00 PM', '4:25 PM', '4:05 PM', '4:05 PM', '4:25 PM', '8:20 PM', '8:15 PM']
+
+EXPERTS = ['Bell', 'Bowen', 'Clay', 'Fowler', 'Graziano', 'Kahler', 'Martin', 'Moody', 'Reid', 'Thiry', 'Wicker']
+
+# (headline, date, article body), a mix of clear calls for the pre-filter and ones it leaves to the API
+ARTICLES = [
+    ("Titans QB Will Levis ruled out vs. Bills with shoulder injury", "Oct 18, 2024",
+     "The Tennessee Titans will start Mason Rudolph on Sunday. The Buffalo Bills get a defense that has allowed 30 points a game."),
+    ("Browns trade Amari Cooper to Bills", "Oct 15, 2024",
+     "The Cleveland Browns sent Amari Cooper to the Buffalo Bills for a third-round pick, thinning an offense that already struggles."),
+    ("Falcons activate Kirk Cousins' top target from injured reserve", "Oct 17, 2024",
+     "The Atlanta Falcons get their receiver back for the Seattle Seahawks game, a boost for a passing attack ranked 20th."),
+    ("Raiders name Aidan O'Connell starting quarterback", "Oct 16, 2024",
+     "The Las Vegas Raiders turn to O'Connell against the Los Angeles Rams, who are still without Cooper Kupp."),
+    ("Panthers' Andy Dalton questionable with thumb sprain", "Oct 18, 2024",
+     "The Carolina Panthers may be down to their third quarterback against the Washington Commanders."),
+    ("Steelers to start Russell Wilson against Jets", "Oct 17, 2024",
+     "The Pittsburgh Steelers hand Russell Wilson his first start. The New York Jets defense ranks second against the pass."),
+    ("Chiefs and 49ers meet in Super Bowl rematch", "Oct 18, 2024",
+     "The Kansas City Chiefs are unbeaten. The San Francisco 49ers lost Brandon Aiyuk for the season."),
+    ("Ravens' Derrick Henry on pace for career year", "Oct 16, 2024",
+     "The Baltimore Ravens lead the league in rushing, and the Tampa Bay Buccaneers allowed 180 yards on the ground last week."),
+    ("NFL Week 7 uniform schedule and throwback jerseys", "Oct 16, 2024",
+     "Eight teams wear alternate uniforms this week."),
+    ("Fantasy football: Week 7 waiver wire pickups", "Oct 15, 2024",
+     "Add these players before Wednesday's waivers run."),
+    ("Giants' Malik Nabers clears concussion protocol", "Oct 18, 2024",
+     "The New York Giants get their top receiver back against the Philadelphia Eagles."),
+    ("NFL announces 2025 international series venues", "Oct 15, 2024",
+     "The league will play games in Dublin, Berlin and Madrid next season."),
+]
+
+# ESPN writes games with the abbreviations generate_matchups builds its game_id from
+ABBREVIATIONS = {
+    'Houston Texans': 'HOU', 'New York Jets': 'NYJ', 'Baltimore Ravens': 'BAL', 'Philadelphia Eagles': 'PHI',
+    'Carolina Panthers': 'CAR', 'Las Vegas Raiders': 'LV', 'Cincinnati Bengals': 'CIN', 'Buffalo Bills': 'BUF',
+    'Washington Commanders': 'WSH', 'New York Giants': 'NYG', 'Green Bay Packers': 'GB', 'Tennessee Titans': 'TEN',
+    'Atlanta Falcons': 'ATL', 'Cleveland Browns': 'CLE', 'Los Angeles Rams': 'LAR', 'Seattle Seahawks': 'SEA',
+    'Tampa Bay Buccaneers': 'TB', 'Kansas City Chiefs': 'KC', 'San Francisco 49ers': 'SF', 'Pittsburgh Steelers': 'PIT',
+}
+
+def slug(text):
+    return ''.join(c if c.isalnum() else '-' for c in text.lower()).strip('-')
+
+def bovada_page():
+    coupons = []
+    for (first, second, first_ml, second_ml, bets), kickoff in zip(GAMES, KICKOFFS):
+        # no whitespace between tags, the old positional parser counts every text node
+        coupons.append(
+            '<section class="coupon-content more-info">'
+            f'<sp-score-coupon><span class="period">{GAME_DATE}</span><span class="period">{kickoff}</span></sp-score-coupon>'
+            f'<a class="game-view-cta" href="/sports/football/nfl/{slug(first)}-{slug(second)}">+ {bets}</a>'
+            '<span class="market-header">Spread</span><span class="market-header">Win</span>'
+            '<span class="market-header">Total</span>'
+            f'<h4 class="competitor-name"><span class="name">{first}</span></h4>'
+            f'<h4 class="competitor-name"><span class="name">{second}</span></h4>'
+            '<span class="competitor-record">3-3</span><span class="competitor-record">4-2</span>'
+            '<sp-two-way-vertical class="market-type">'
+            '<span class="market-line">+3.5</span><span class="bet-price">-110</span>'
+            '<span class="market-line">-3.5</span><span class="bet-price">-110</span>'
+            '</sp-two-way-vertical>'
+            '<sp-two-way-vertical class="market-type">'
+            f'<span class="bet-price">{first_ml:+d}</span><span class="bet-price">{second_ml:+d}</span>'
+            '</sp-two-way-vertical>'
+            '<sp-two-way-vertical class="market-type">'
+            '<span class="market-line">O 44.5</span><span class="bet-price">-110</span>'
+            '<span class="market-line">U 44.5</span><span class="bet-price">-110</span>'
+            '</sp-two-way-vertical>'
+            '</section>')
+    return ('<html><head><title>NFL Odds | Bovada</title></head><body><main><div class="grouped-events">\n'
+            + '\n'.join(coupons) + '\n</div></main></body></html>\n')
+
+def espn_picks_page():
+    games, picks = [], []
+    for g, ((first, second, first_ml, second_ml, _), kickoff) in enumerate(zip(GAMES, KICKOFFS)):
+        games.append('<tr class="Table__TR"><td class="Table__TD"><div class="wrap-competition">'
+                     f'<a href="/nfl/game/_/gameId/40154{g:04d}">{ABBREVIATIONS[first]} at {ABBREVIATIONS[second]}</a></div>'
+                     f'<div class="competition-dates">{kickoff}</div></td></tr>')
+        favorite, underdog = (first, second) if first_ml < second_ml else (second, first)
+        # experts mostly side with the favorite, fewer pick the underdog the bigger the gap
+        upsets = max(0, 5 - abs(first_ml - second_ml) // 100)
+        cells = []
+        for e in range(len(EXPERTS)):
+            team = underdog if e < upsets else favorite
+            cells.append(f'<td class="Table__TD"><img src="https://a.espncdn.com/i/teamlogos/nfl/500/{ABBREVIATIONS[team].lower()}.png"></td>')
+        picks.append(f'<tr class="Table__TR">{"".join(cells)}</tr>')
+    # the last scroller row is each expert's season record, it has no logos
+    picks.append('<tr class="Table__TR">' + ''.join('<td class="Table__TD">61-40</td>' for _ in EXPERTS) + '</tr>')
+    experts = ''.join(f'<th class="Table__TH"><div>{expert}</div></th>' for expert in EXPERTS)
+    return ('<html><body><h1 class="headline headline__h1 dib">NFL Week 7 Expert Picks - Week 7</h1>\n'
+            '<div class="Table--fixed-left"><table><tbody class="Table__TBODY">\n' + '\n'.join(games)
+            + '\n</tbody></table></div>\n<div class="Table__Scroller"><table><thead class="Table__THEAD"><tr>'
+            + experts + '</tr></thead><tbody class="Table__TBODY">\n' + '\n'.join(picks)
+            + '\n</tbody></table></div></body></html>\n')
+
+def news_card(index, title, date):
+    href = f"/news/{slug(title)}"
+    inner = (f'<a href="{href}"><picture><img src="https://static.www.nfl.com/image/upload/news-{index}.jpg"></picture>'
+             f'<h3 class="d3-o-media-object__title">{title}</h3><p class="d3-o-media-object__date">{date}</p></a>')
+    # the first cards are the large vertical ones, the rest are horizontal links
+    if index < 3:
+        return f'<div class="d3-o-media-object d3-o-media-object--vertical">{inner}</div>'
+    return inner.replace('<a href=', '<a class="d3-o-media-object d3-o-media-object--horizontal" href=', 1)
+
+def news_page():
+    cards = [news_card(i, title, date) for i, (title, date, _) in enumerate(ARTICLES)]
+    return ('<html><body><main><section class="d3-l-grid--outer">\n' + '\n'.join(cards)
+            + '\n</section></main></body></html>\n')
+
+def article_page(title, body):
+    paragraphs = ''.join(f'<p>{sentence.strip()}.</p>' for sentence in body.split('.') if sentence.strip())
+    return (f'<html><body><article><h1>{title}</h1><div class="nfl-c-article__body">{paragraphs}</div>'
+            '</article></body></html>\n')
+
+def answer(request):
+    """the canned completion for a recorded request"""
+    system, user = request['messages'][0]['content'], request['messages'][-1]['content']
+    if system.startswith('For each numbered'):
+        titles = [line.split('. ', 1)[1] for line in user.splitlines()]
+        return json.dumps({'results': [{'id': i, 'relevant': headline_relevant(title)} for i, title in enumerate(titles)]})
+    if system.startswith('Reply True or False'):
+        return str(headline_relevant(user))
+    teams = [team for team, names in relevance.TEAMS.items() if team in user]
+    ratings = [{team: int(hashlib.md5(f"{team}{user}".encode()).hexdigest(), 16) % 11 - 5} for team in teams]
+    return json.dumps({'results': ratings})
+
+def headline_relevant(title):
+    return relevance.IMPACT_PATTERN.search(title) is not None
+
+def write_pages(fixture_dir):
+    fetch.configure(fixture_dir=fixture_dir)
+    fetch._record_page(insert_data.BOVADA_URL, 200, bovada_page())
+    fetch._record_page(insert_data.ESPN_PICKS_URL, 200, espn_picks_page())
+    fetch._record_page(insert_news.NEWS_URL, 200, news_page())
+    for title, _, body in ARTICLES:
+        fetch._record_page(f"https://www.nfl.com/news/{slug(title)}", 200, article_page(title, body))
+
+def write_responses(fixture_dir):
+    """runs the ingest against the pages and saves a canned answer for every OpenAI request it makes"""
+    def record(request):
+        key = json.dumps(request, sort_keys=True)
+        path = os.path.join(fixture_dir, 'responses', 'openai', f"{fetch._digest(key)}.json")
+        response = answer(request)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'request': request, 'response': response}, f, indent=1)
+        return response
+
+    complete = insert_news.complete
+    insert_news.complete = record
+    fetch.configure(mode='replay', fixture_dir=fixture_dir)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            schema.DB_PATH = os.path.join(tmp, 'fixtures.db')
+            schema.ensure_schema()
+            insert_news.insert_espn_news(datetime(2000, 1, 1), datetime(2100, 1, 1))
+    finally:
+        insert_news.complete = complete
+
+if __name__ == '__main__':
+    fixture_dir = sys.argv[1] if len(sys.argv) > 1 else FIXTURE_DIR
+    shutil.rmtree(fixture_dir, ignore_errors=True)
+    write_pages(fixture_dir)
+    write_responses(fixture_dir)
+    print(f"wrote {fixture_dir}")
@@ -0,0 +1,42 @@
+"""
+Archives finished weeks of news into Parquet, including a row whose date never
+parsed to ISO, and reads them back through read_history.
+
+run from the repo root: python -m pytest test_scripts
+"""
+import sqlite3
+
+import utils.archive as archive
+import utils.schema as schema
+
+def test_archive_leaves_rows_without_an_iso_date(tmp_path, monkeypatch):
+    path = str(tmp_path / 'archive.db')
+    monkeypatch.setattr(schema, 'DB_PATH', path)
+    schema.ensure_schema()
+    with sqlite3.connect(path) as conn:
+        conn.executemany("INSERT INTO espn_news (title, date, relevant) VALUES (?, ?, 'True')", [
+            ('Titans QB ruled out', '2024-10-18'),
+            ('Bills sign a kicker', '2024-10-26'),
+            # iso_date leaves dates it can't parse as they were scraped
+            ('Chiefs activate a tackle', '2 hours ago'),
+        ])
+        conn.executemany("INSERT INTO article_team_scores (title, team, rating) VALUES (?, ?, ?)", [
+            ('Titans QB ruled out', 'Tennessee Titans', -3),
+            ('Chiefs activate a tackle', 'Kansas City Chiefs', 1),
+        ])
+    conn.close()
+
+    archive_dir = str(tmp_path / 'archive')
+    moved = archive.archive(archive_dir=archive_dir)
+    assert moved['espn_news'] == {(2024, 7): 1, (2024, 8): 1}
+    assert moved['article_team_scores'] == {(2024, 7): 1}
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT title, date FROM espn_news").fetchall() == \
+            [('Chiefs activate a tackle', '2 hours ago')]
+        assert conn.execute("SELECT title, team FROM article_team_scores").fetchall() == \
+            [('Chiefs activate a tackle', 'Kansas City Chiefs')]
+    conn.close()
+
+    history = archive.read_history('espn_news', '2024-10-15', '2024-10-21', archive_dir)
+    assert history['title'].tolist() == ['Titans QB ruled out']
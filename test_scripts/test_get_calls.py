@@ -0,0 +1,36 @@
+"""
+The dashboard readers filter by the week get_start_end returns, whose start
+carries the time of day the page was loaded. Rows dated on the start day
+must still be in the week.
+
+run from the repo root: python -m pytest test_scripts
+"""
+import sqlite3
+from datetime import datetime
+
+import utils.get_calls as get_calls
+import utils.schema as schema
+
+def test_date_columns_keep_the_start_day(tmp_path, monkeypatch):
+    path = str(tmp_path / 'readers.db')
+    monkeypatch.setattr(schema, 'DB_PATH', path)
+    schema.ensure_schema()
+    with sqlite3.connect(path) as conn:
+        conn.executemany("INSERT INTO espn_news (title, date, relevant) VALUES (?, ?, 'True')", [
+            ('Titans QB ruled out', '2024-10-15'),
+            ('Bills sign a kicker', '2024-10-21'),
+            ('Chiefs activate a tackle', '2024-10-22'),
+        ])
+        conn.executemany("INSERT INTO article_team_scores (title, team, rating) VALUES (?, ?, ?)", [
+            ('Titans QB ruled out', 'Tennessee Titans', -3),
+            ('Bills sign a kicker', 'Buffalo Bills', 1),
+            ('Chiefs activate a tackle', 'Kansas City Chiefs', 1),
+        ])
+        conn.execute("INSERT INTO bovada_data (date, home_team, away_team, bets, game_id) "
+                     "VALUES ('2024-10-15', 'Buffalo Bills', 'Tennessee Titans', 10, 'g1')")
+    conn.close()
+
+    start, end = datetime(2024, 10, 15, 9, 30), datetime(2024, 10, 21, 9, 30)
+    records, page_count = get_calls.get_table_page('news', start, end, sort_by=[{'column_id': 'Date', 'direction': 'asc'}])
+    assert [record['Article Title'] for record in records] == ['Titans QB ruled out', 'Bills sign a kicker']
+    assert get_calls.get_bovada_data(start, end)['game_id'].tolist() == ['g1']
@@ -0,0 +1,78 @@
+"""
+LLMExecutor.map against a local stub of the OpenAI client: results come back
+in input order, a 429 is retried, and a call that keeps failing gives None.
+Nothing leaves the machine.
+
+run from the repo root: python -m pytest test_scripts
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import utils.fetch as fetch
+import utils.insert_news as insert_news
+import utils.llm as llm
+import utils.schema as schema
+
+class StubRateLimit(Exception):
+    status_code = 429
+
+class StubClient:
+    """answers chat.completions.create like the OpenAI client, even numbered titles are relevant"""
+
+    def __init__(self, latency=lambda title: 0.0, fail=lambda title, attempt: None):
+        self.latency = latency
+        self.fail = fail
+        self.calls = {}
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        title = messages[-1]['content']
+        with self._lock:
+            attempt = self.calls[title] = self.calls.get(title, 0) + 1
+        time.sleep(self.latency(title))
+        error = self.fail(title, attempt)
+        if error is not None:
+            raise error
+        message = SimpleNamespace(content=str(int(title.split()[-1]) % 2 == 0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+@pytest.fixture
+def executor(tmp_path, monkeypatch):
+    """an LLMExecutor wired into insert_news with a fresh llm_cache and no backoff sleeps"""
+    monkeypatch.setattr(schema, 'DB_PATH', str(tmp_path / 'llm.db'))
+    schema.ensure_schema()
+    monkeypatch.setattr(fetch, 'FETCH_MODE', 'live')
+    executor = llm.LLMExecutor(max_workers=4, requests_per_minute=60000, max_retries=2, base_delay=0)
+    monkeypatch.setattr(insert_news, 'llm_executor', executor)
+    return executor
+
+def use(monkeypatch, client):
+    monkeypatch.setattr(insert_news, '_client', client)
+    return client
+
+def test_map_keeps_input_order(executor, monkeypatch):
+    # earlier titles answer last, so completion order is the reverse of input order
+    titles = [f"title {i}" for i in range(8)]
+    use(monkeypatch, StubClient(latency=lambda title: 0.01 * (8 - int(title.split()[-1]))))
+    assert executor.map(insert_news.check_relevance, titles) == [str(i % 2 == 0) for i in range(8)]
+
+def test_map_retries_rate_limited_calls(executor, monkeypatch):
+    client = use(monkeypatch, StubClient(fail=lambda title, attempt: StubRateLimit("rate limited") if attempt == 1 else None))
+    assert executor.map(insert_news.check_relevance, ["title 2", "title 3"]) == ['True', 'False']
+    assert client.calls == {"title 2": 2, "title 3": 2}
+
+def test_map_gives_none_for_calls_that_keep_failing(executor, monkeypatch):
+    def fail(title, attempt):
+        if title == "title 1":
+            return StubRateLimit("rate limited")
+        if title == "title 2":
+            return ValueError("bad request")
+
+    client = use(monkeypatch, StubClient(fail=fail))
+    assert executor.map(insert_news.check_relevance, ["title 0", "title 1", "title 2"]) == ['True', None, None]
+    # a 429 is tried max_retries more times, anything else is not retried
+    assert client.calls == {"title 0": 1, "title 1": executor.max_retries + 1, "title 2": 1}
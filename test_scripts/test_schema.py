@@ -0,0 +1,79 @@
+"""
+Migrates a fresh database and a legacy-shaped one (the tables pandas.to_sql
+created before utils/schema.py existed), then checks every hot query is
+answered from an index.
+
+run from the repo root: python -m pytest test_scripts
+"""
+import json
+import sqlite3
+
+import pandas as pd
+
+import utils.schema as schema
+
+def test_fresh_database_has_no_full_scans(tmp_path):
+    path = str(tmp_path / 'fresh.db')
+    assert schema.ensure_schema(path) == schema.SCHEMA_VERSION
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == schema.SCHEMA_VERSION
+        assert schema.check_query_plans(conn) == {}
+    conn.close()
+
+def seed_legacy(path):
+    """the tables as the baseline scrapers wrote them, no primary keys and unformatted dates"""
+    with sqlite3.connect(path) as conn:
+        pd.DataFrame({
+            'date': ['10/20/2024', 'Oct 27, 2024'], 'time': ['1:00 PM', '4:25 PM'], 'bets': [120, 80],
+            'home_team': ['Buffalo Bills', 'Dallas Cowboys'], 'away_team': ['Tennessee Titans', 'Atlanta Falcons'],
+            'home_win': [-200, 110], 'away_win': [170, -130], 'win_differential': [370, 240],
+            'day': ['Sunday', 'Sunday'], 'points': [1.0, 2.0], 'game_id': ['g1', 'g2'],
+        }).to_sql('bovada_data', conn, index=False)
+        pd.DataFrame({
+            'time': ['1:00 PM'], 'matchup': ['Buffalo Bills vs Tennessee Titans'],
+            'projected_winner': ['Buffalo Bills'], 'ranking': [1.0], 'game_id': ['g1'],
+        }).to_sql('matchup_data', conn, index=False)
+        pd.DataFrame({
+            'Game': ['TEN @ BUF'], 'Time': ['1:00 PM'], 'Bell': ['buf'], 'week': ['Week 7'], 'pct': [100.0],
+            'message': ['100% of experts chose buf'], 'game_id': ['TENBUF'],
+            'datetime': ['2024-10-20T09:15:42.123456'],
+        }).to_sql('expert_data', conn, index=False)
+        pd.DataFrame({
+            'game_id': ['TENBUF'], 'matchup': ['Buffalo Bills vs Tennessee Titans'],
+            'projected_winner': ['Buffalo Bills'], 'ranking': [1], 'alt_game_id': ['g1'], 'week': ['Week 7'],
+            'Game': ['TEN @ BUF'], 'Time': ['1:00 PM'], 'pct': [100.0],
+            'message': ['100% of experts chose buf'], 'IngestTime': ['10/20 09:15'],
+        }).to_sql('merged_data', conn, index=False)
+        scored = json.dumps({'Tennessee Titans': -3, 'Buffalo Bills': 2})
+        pd.DataFrame({
+            'title': ['Titans QB ruled out', 'Titans QB ruled out', 'Bills sign a kicker'],
+            'date': ['Oct 18, 2024', 'Oct 18, 2024', 'October 19, 2024'],
+            'link': ['[link](https://www.nfl.com/news/a)'] * 2 + ['[link](https://www.nfl.com/news/b)'],
+            'image_url': [None, None, None],
+            'relevant': ['True', 'True', 'False'],
+            'ai_score': [None, scored, None],
+        }).to_sql('espn_news', conn, index=False)
+    conn.close()
+
+def test_legacy_database_migrates(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    seed_legacy(path)
+    assert schema.ensure_schema(path) == schema.SCHEMA_VERSION
+
+    with sqlite3.connect(path) as conn:
+        assert schema.check_query_plans(conn) == {}
+        assert [row[0] for row in conn.execute("SELECT date FROM bovada_data ORDER BY date")] == \
+            ['2024-10-20', '2024-10-27']
+        assert conn.execute("SELECT datetime FROM expert_data").fetchone()[0] == '2024-10-20 09:15:42'
+        # duplicate titles collapse to the copy that was scored
+        assert conn.execute("SELECT title, date, ai_score IS NOT NULL FROM espn_news ORDER BY title").fetchall() == \
+            [('Bills sign a kicker', '2024-10-19', 0), ('Titans QB ruled out', '2024-10-18', 1)]
+        assert conn.execute("SELECT team, rating FROM article_team_scores ORDER BY team").fetchall() == \
+            [('Buffalo Bills', 2.0), ('Tennessee Titans', -3.0)]
+        assert conn.execute("SELECT game_id, season, week FROM games ORDER BY game_id").fetchall() == \
+            [('g1', 2024, 7), ('g2', 2024, 8)]
+        assert conn.execute("SELECT ingested_at FROM merged_data").fetchone()[0] == '2024-10-20 09:15:00'
+    conn.close()
+
+    # a second run finds nothing to do
+    assert schema.ensure_schema(path) == schema.SCHEMA_VERSION
@@ -0,0 +1,229 @@
+"""
+Moves completed NFL weeks out of data-log.db into Parquet files, so the
+database the dashboard queries only holds the recent weeks.
+
+Rows are written to ARCHIVE_DIR/<table>/season=<season>/week=<week>/ and
+deleted from SQLite in the same write transaction. Nothing is deleted if
+the Parquet write fails. read_history() unions the archive with the rows
+still in SQLite, so historical queries don't need to know where a week
+lives.
+
+python -m utils.archive                  # archive every week older than ARCHIVE_KEEP_WEEKS
+python -m utils.archive --dry-run        # count what would move
+"""
+import argparse
+import logging
+import os
+import sqlite3
+from datetime import timedelta
+
+import pandas as pd
+import pyarrow as pa
+
+import utils.get_calls as get_calls
+import utils.schema as schema
+
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')
+# the current week plus this many completed weeks stay in SQLite
+ARCHIVE_KEEP_WEEKS = int(os.getenv('ARCHIVE_KEEP_WEEKS', 2))
+
+def setup_logger(name):
+    """Set up a logger for a given module."""
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+
+    # Create file handler which logs even debug messages
+    fh = logging.FileHandler('app.log')
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] - %(message)s')
+    fh.setFormatter(formatter)
+
+    # Add the handler to the logger
+    if not logger.handlers:
+        logger.addHandler(fh)
+
+    return logger
+
+logger = setup_logger(__name__)
+
+# only rows whose week column starts with an ISO date can be given a week, anything else
+# (e.g. a relative "2 hours ago" news date) stays in SQLite
+ISO_DAY = "GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'"
+
+# table -> (column its week comes from, rows before a cutoff, delete for the same rows).
+# article_team_scores goes with its articles, so it comes before espn_news
+ARCHIVED_TABLES = {
+    'bovada_data': ('date',
+                    f"SELECT * FROM bovada_data WHERE date < ? AND date {ISO_DAY}",
+                    f"DELETE FROM bovada_data WHERE date < ? AND date {ISO_DAY}"),
+    'expert_data': ('datetime',
+                    f"SELECT * FROM expert_data WHERE datetime < ? AND datetime {ISO_DAY}",
+                    f"DELETE FROM expert_data WHERE datetime < ? AND datetime {ISO_DAY}"),
+    'merged_data': ('ingested_at',
+                    f"SELECT * FROM merged_data WHERE ingested_at < ? AND ingested_at {ISO_DAY}",
+                    f"DELETE FROM merged_data WHERE ingested_at < ? AND ingested_at {ISO_DAY}"),
+    'article_team_scores': ('date',
+                            f"""SELECT s.title, s.team, s.rating, n.date FROM article_team_scores s
+                                JOIN espn_news n ON n.title = s.title WHERE n.date < ? AND n.date {ISO_DAY}""",
+                            f"""DELETE FROM article_team_scores
+                                WHERE title IN (SELECT title FROM espn_news WHERE date < ? AND date {ISO_DAY})"""),
+    'espn_news': ('date',
+                  f"SELECT * FROM espn_news WHERE date < ? AND date {ISO_DAY}",
+                  f"DELETE FROM espn_news WHERE date < ? AND date {ISO_DAY}"),
+}
+
+# rows that can be scraped again after their week was archived, the SQLite copy wins
+UNIQUE_KEYS = {
+    'espn_news': ['title'],
+    'article_team_scores': ['title', 'team'],
+}
+
+def archive_cutoff(keep_weeks=ARCHIVE_KEEP_WEEKS):
+    """ISO date before which weeks are complete and old enough to archive"""
+    start, end = get_calls.get_start_end()
+    return (start - timedelta(weeks=keep_weeks)).strftime(schema.ISO_DATE)
+
+_ARROW_TYPES = {'INTEGER': pa.int64(), 'REAL': pa.float64()}
+
+def _typed(conn, table, rows):
+    """
+    rows cast to the declared SQLite column types, so every Parquet file of a table has
+    the same schema even when a column is all NULL in one week
+    """
+    declared = {row[1]: row[2].upper() for row in conn.execute(f"PRAGMA table_info({table})")}
+    fields = []
+    for column in rows.columns:
+        arrow_type = _ARROW_TYPES.get(declared.get(column), pa.string())
+        if arrow_type == pa.string():
+            rows[column] = rows[column].where(rows[column].isna(), rows[column].astype(str))
+        else:
+            rows[column] = pd.to_numeric(rows[column], errors='coerce')
+        fields.append(pa.field(column, arrow_type))
+    return rows, pa.schema(fields)
+
+def _partition_dir(table, season, week, archive_dir):
+    return os.path.join(archive_dir, table, f"season={season}", f"week={week}")
+
+def archive_table(conn, table, cutoff, archive_dir=ARCHIVE_DIR, dry_run=False, written=None):
+    """
+    writes table's rows from before cutoff to Parquet and deletes them, returns {(season, week): rows}.
+    the new file paths are appended to written
+    """
+    column, select_sql, delete_sql = ARCHIVED_TABLES[table]
+    rows = pd.read_sql_query(select_sql, conn, params=(cutoff,))
+    if rows.empty:
+        return {}
+    rows = get_calls.with_season_week(rows.assign(_day=rows[column].str[:10]), '_day').drop(columns='_day')
+    counts = rows.groupby(['season', 'week']).size().to_dict()
+    if dry_run:
+        return counts
+    stamp = pd.Timestamp.now().strftime('%Y%m%dT%H%M%S%f')
+    for (season, week), partition in rows.groupby(['season', 'week']):
+        partition, arrow_schema = _typed(conn, table, partition.drop(columns=['season', 'week']))
+        directory = _partition_dir(table, season, week, archive_dir)
+        os.makedirs(directory, exist_ok=True)
+        # a week archived twice, e.g. news scraped again later, gets a second file
+        path = os.path.join(directory, f"part-{stamp}.parquet")
+        partition.to_parquet(path, index=False, schema=arrow_schema)
+        if written is not None:
+            written.append(path)
+    conn.execute(delete_sql, (cutoff,))
+    return counts
+
+def archive(keep_weeks=ARCHIVE_KEEP_WEEKS, archive_dir=ARCHIVE_DIR, dry_run=False, vacuum=False):
+    """archives every completed week older than keep_weeks, returns {table: {(season, week): rows}}"""
+    cutoff = archive_cutoff(keep_weeks)
+    moved, written = {}, []
+    conn = sqlite3.connect(schema.DB_PATH, timeout=30)
+    try:
+        # the write lock keeps ingest from adding rows between the Parquet write and the delete
+        conn.execute("BEGIN IMMEDIATE")
+        for table in ARCHIVED_TABLES:
+            moved[table] = archive_table(conn, table, cutoff, archive_dir, dry_run, written)
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        # the rows are all still in SQLite, drop this run's files so a retry doesn't duplicate them
+        for path in written:
+            os.remove(path)
+        logger.exception("Archive failed, nothing was deleted from SQLite")
+        raise
+    finally:
+        conn.close()
+
+    total = sum(sum(counts.values()) for counts in moved.values())
+    if total and not dry_run:
+        if vacuum:
+            with sqlite3.connect(schema.DB_PATH) as conn:
+                conn.execute("VACUUM")
+            conn.close()
+        schema.bump_data_version()
+    logger.info(f"{'Would archive' if dry_run else 'Archived'} {total} rows from before {cutoff}: "
+                + ", ".join(f"{table} {sum(counts.values())}" for table, counts in moved.items()))
+    return moved
+
+def _bound(column, value):
+    """start/end bound for column, the date columns hold no time of day"""
+    return get_calls.sql_bound(value, schema.ISO_DATE if column == 'date' else schema.ISO_DATETIME)
+
+def read_archive(table, start=None, end=None, archive_dir=ARCHIVE_DIR):
+    """archived rows of table whose week column falls between start and end, partitions outside are skipped"""
+    root = os.path.join(archive_dir, table)
+    if not os.path.isdir(root):
+        return pd.DataFrame()
+    column = ARCHIVED_TABLES[table][0]
+    filters = []
+    if start is not None:
+        filters += [('season', '>=', get_calls.nfl_season_week(start)[0]), (column, '>=', _bound(column, start))]
+    if end is not None:
+        filters += [('season', '<=', get_calls.nfl_season_week(end)[0]), (column, '<=', _bound(column, end))]
+    df = pd.read_parquet(root, filters=filters or None)
+    return df.drop(columns=['season', 'week'], errors='ignore')
+
+def read_history(table, start=None, end=None, archive_dir=ARCHIVE_DIR):
+    """rows of table between start and end from the archive and SQLite together"""
+    column, select_sql, delete_sql = ARCHIVED_TABLES[table]
+    where, params = [], []
+    if start is not None:
+        where.append(f"{column} >= ?")
+        params.append(_bound(column, start))
+    if end is not None:
+        where.append(f"{column} <= ?")
+        params.append(_bound(column, end))
+    if table == 'article_team_scores':
+        sql = "SELECT s.title, s.team, s.rating, n.date FROM article_team_scores s JOIN espn_news n ON n.title = s.title"
+        where = [f"n.{condition}" for condition in where]
+    else:
+        sql = f"SELECT * FROM {table}"
+    with sqlite3.connect(schema.DB_PATH) as conn:
+        hot = pd.read_sql_query(sql + (" WHERE " + " AND ".join(where) if where else ""), conn, params=params)
+    conn.close()
+
+    archived = read_archive(table, start, end, archive_dir)
+    frames = [frame for frame in (hot, archived) if not frame.empty]
+    if not frames:
+        return hot
+    df = pd.concat(frames, ignore_index=True)
+    if table in UNIQUE_KEYS:
+        df = df.drop_duplicates(subset=UNIQUE_KEYS[table], keep='first', ignore_index=True)
+    return df
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keep-weeks', type=int, default=ARCHIVE_KEEP_WEEKS,
+                        help="completed weeks to keep in SQLite besides the current one")
+    parser.add_argument('--archive-dir', default=ARCHIVE_DIR)
+    parser.add_argument('--dry-run', action='store_true', help="count the rows that would move")
+    parser.add_argument('--vacuum', action='store_true', help="compact the database file afterwards")
+    args = parser.parse_args()
+
+    schema.ensure_schema()
+    moved = archive(args.keep_weeks, args.archive_dir, args.dry_run, args.vacuum)
+    for table, counts in moved.items():
+        for (season, week), rows in sorted(counts.items()):
+            print(f"{table:<20} season {season} week {week:>2}: {rows} rows")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""
+Replays every stored week through the ml.py scoring model and grades the
+picks against the final scores in game_results.
+
+Confidence is linear in the weights: per game it is (home terms - away terms)
+@ w. One matrix product therefore scores a whole grid of weight vectors, one
+column per vector. Large grids are split into chunks and spread over a
+process pool.
+
+python -m utils.backtest import-results results.csv
+python -m utils.backtest run --steps 11 --top 10
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import utils.archive as archive
+import utils.get_calls as get_calls
+import utils.ml as ml
+import utils.schema as schema
+
+BACKTEST_GRID_STEPS = int(os.getenv('BACKTEST_GRID_STEPS', 11))  # values per weight, 0 to 1
+BACKTEST_WORKERS = int(os.getenv('BACKTEST_WORKERS', os.cpu_count() or 1))
+BACKTEST_CHUNK = int(os.getenv('BACKTEST_CHUNK', 20000))  # weight vectors per matrix product
+POOL_MIN_WEIGHTS = int(os.getenv('BACKTEST_POOL_MIN_WEIGHTS', 100000))  # smaller grids run in process
+CALIBRATION_BINS = 5
+
+RESULT_COLUMNS = ['date', 'home_team', 'away_team', 'home_points', 'away_points']
+
+# win_diff adds the same to the home and away score, so it never moves a pick
+GRID_WEIGHTS = [name for name in ml.WEIGHT_NAMES if name != 'win_diff']
+# largest home minus away difference each normalized term can reach
+TERM_BOUNDS = np.array([0.0 if name == 'win_diff' else 1.0 for name in ml.WEIGHT_NAMES])
+
+def setup_logger(name):
+    """Set up a logger for a given module."""
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+
+    # Create file handler which logs even debug messages
+    fh = logging.FileHandler('app.log')
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] - %(message)s')
+    fh.setFormatter(formatter)
+
+    # Add the handler to the logger
+    if not logger.handlers:
+        logger.addHandler(fh)
+
+    return logger
+
+logger = setup_logger(__name__)
+
+RESULTS_SQL = "SELECT date, home_team, away_team, home_points, away_points FROM game_results"
+
+def import_results(path):
+    """upserts final scores from a CSV with date, home_team, away_team, home_points, away_points"""
+    results = pd.read_csv(path)
+    missing = [column for column in RESULT_COLUMNS if column not in results.columns]
+    if missing:
+        raise ValueError(f"{path} is missing the columns {', '.join(missing)}")
+    results = results[RESULT_COLUMNS].dropna()
+    results['date'] = pd.to_datetime(results['date']).dt.strftime(schema.ISO_DATE)
+    results[['home_points', 'away_points']] = results[['home_points', 'away_points']].astype(int)
+    with sqlite3.connect(schema.DB_PATH) as conn:
+        conn.executemany("""
+            INSERT INTO game_results (date, home_team, away_team, home_points, away_points)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(date, home_team, away_team) DO UPDATE SET
+                home_points = excluded.home_points, away_points = excluded.away_points
+            """, results.astype(object).values.tolist())
+    conn.close()
+    logger.info(f"Imported {len(results)} game results from {path}")
+    return len(results)
+
+def load_inputs(seasons=None):
+    """
+    (games, messages, sentiment) from SQLite and the Parquet archive: every stored Bovada
+    line with its final score if imported, {game_id: latest expert consensus} and the
+    news sentiment summed per season, week and team
+    """
+    with sqlite3.connect(schema.DB_PATH) as conn:
+        results = pd.read_sql_query(RESULTS_SQL, conn)
+    conn.close()
+    games = archive.read_history('bovada_data').rename(columns={'win_differential': 'win_diff'})
+    games = games[['date', 'bets', 'home_team', 'away_team', 'home_win', 'away_win', 'win_diff', 'game_id']] \
+        .merge(results, on=['date', 'home_team', 'away_team'], how='left')
+    games = get_calls.with_season_week(games)
+    if seasons:
+        games = games[games['season'].isin(seasons)]
+
+    merged = archive.read_history('merged_data')
+    # legacy rows without ingested_at count as the oldest
+    latest = merged.sort_values('ingested_at', na_position='first', kind='stable') \
+        .drop_duplicates(subset='alt_game_id', keep='last')
+    messages = dict(zip(latest['alt_game_id'], latest['message']))
+
+    scores = archive.read_history('article_team_scores')
+    scores = get_calls.with_season_week(scores)
+    sentiment = scores.groupby(['season', 'week', 'team'])['rating'].sum()
+    return games, messages, sentiment
+
+def load_history(seasons=None):
+    """
+    (games, terms) for every stored game that has a result. games holds one row per game
+    with its season, week, odds favorite and outcome. terms is the (games x WEIGHT_NAMES)
+    array of home minus away score terms, normalized within each week like score_week does
+    """
+    games, messages, sentiment = load_inputs(seasons)
+
+    graded, terms = [], []
+    for (season, week), week_games in games.groupby(['season', 'week']):
+        try:
+            team_rating = sentiment.loc[(season, week)].rename_axis('Team').reset_index(name='AI News Sentiment Score')
+        except KeyError:
+            team_rating = pd.DataFrame(columns=['Team', 'AI News Sentiment Score'])
+        merged = pd.DataFrame({
+            'Matchup': week_games['home_team'] + ' vs ' + week_games['away_team'],
+            'message': week_games['game_id'].map(messages),
+        })
+        features = ml.game_features(week_games, team_rating, merged)
+        home, away = ml.score_terms(ml.normalize(features))
+        # scaled across the whole week, graded only where the final score is in and not a tie
+        keep = (features['home_points'].notna() & (features['home_points'] != features['away_points'])).to_numpy()
+        graded.append(features[keep])
+        terms.append((home - away)[keep])
+
+    if not graded:
+        return pd.DataFrame(columns=['game_id', 'season', 'week', 'favorite_home', 'home_won']), \
+            np.empty((0, len(ml.WEIGHT_NAMES)))
+    games = pd.concat(graded, ignore_index=True)
+    games['home_won'] = games['home_points'] > games['away_points']
+    # the same favorite generate_matchups projects, the more negative moneyline
+    games['favorite_home'] = games['home_win'] < games['away_win']
+    return games[['game_id', 'date', 'season', 'week', 'home_team', 'away_team', 'favorite_home', 'home_won']], \
+        np.concatenate(terms)
+
+def weight_grid(steps=BACKTEST_GRID_STEPS, names=GRID_WEIGHTS):
+    """every combination of steps values from 0 to 1 for names, as a (vectors x WEIGHT_NAMES) array"""
+    values = np.linspace(0, 1, steps)
+    mesh = np.stack(np.meshgrid(*[values] * len(names), indexing='ij'), axis=-1).reshape(-1, len(names))
+    grid = np.zeros((len(mesh), len(ml.WEIGHT_NAMES)))
+    grid[:, [ml.WEIGHT_NAMES.index(name) for name in names]] = mesh
+    # weights that are all zero where the terms move score every game 0
+    return grid[grid @ TERM_BOUNDS > 0]
+
+def evaluate(terms, home_won, grid, bins=CALIBRATION_BINS):
+    """
+    hit rate, Brier score and hit rate per confidence bin for each row of grid, as a
+    (vectors x 2 + bins) array. A pick's strength is |confidence| over the largest margin
+    the weights allow, read as a 0.5 to 1 chance that the pick is right
+    """
+    confidence = terms @ grid.T
+    hits = (confidence > 0) == home_won[:, None]
+    strength = np.abs(confidence) / (np.abs(grid) @ TERM_BOUNDS)
+    brier = ((0.5 + strength / 2 - hits) ** 2).mean(axis=0)
+    bin_index = np.minimum((strength * bins).astype(int), bins - 1)
+    calibration = np.empty((len(grid), bins))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for b in range(bins):
+            in_bin = bin_index == b
+            calibration[:, b] = (hits & in_bin).sum(axis=0) / in_bin.sum(axis=0)
+    return np.column_stack([hits.mean(axis=0), brier, calibration])
+
+def _evaluate_chunk(args):
+    return evaluate(*args)
+
+def search(terms, home_won, grid, chunk_size=BACKTEST_CHUNK, workers=BACKTEST_WORKERS):
+    """evaluate() over grid in chunks, on a process pool once the grid is large enough"""
+    home_won = np.asarray(home_won, dtype=bool)
+    chunks = [(terms, home_won, grid[i:i + chunk_size]) for i in range(0, len(grid), chunk_size)]
+    if len(grid) < POOL_MIN_WEIGHTS or workers <= 1:
+        scores = [_evaluate_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            scores = list(pool.map(_evaluate_chunk, chunks))
+    return np.concatenate(scores) if scores else np.empty((0, 2 + CALIBRATION_BINS))
+
+def report(grid, scores, bins=CALIBRATION_BINS):
+    """one row per weight vector, best hit rate first and the lower Brier score breaking ties"""
+    edges = np.linspace(0, 1, bins + 1)
+    columns = ['hit_rate', 'brier'] + [f"hit_rate_{lo:.1f}-{hi:.1f}" for lo, hi in zip(edges, edges[1:])]
+    table = pd.concat([pd.DataFrame(grid, columns=ml.WEIGHT_NAMES), pd.DataFrame(scores, columns=columns)], axis=1)
+    return table.sort_values(['hit_rate', 'brier'], ascending=[False, True], ignore_index=True)
+
+def backtest(seasons=None, steps=BACKTEST_GRID_STEPS, workers=BACKTEST_WORKERS):
+    """
+    (games, results, summary): the graded games, every grid vector's scores and a
+    summary comparing DEFAULT_WEIGHTS and the best vector with the odds favorite
+    """
+    started = time.perf_counter()
+    games, terms = load_history(seasons)
+    loaded = time.perf_counter()
+    grid = np.vstack([ml.weight_vector(ml.DEFAULT_WEIGHTS), weight_grid(steps)])
+    scores = search(terms, games['home_won'].to_numpy(bool), grid, workers=workers)
+    searched = time.perf_counter()
+
+    results = report(grid[1:], scores[1:])
+    summary = {
+        'games': len(games),
+        'weeks': int(games[['season', 'week']].drop_duplicates().shape[0]),
+        'weight_vectors': len(grid) - 1,
+        'favorite_hit_rate': float((games['favorite_home'] == games['home_won']).mean()) if len(games) else None,
+        'default_hit_rate': float(scores[0, 0]) if len(games) else None,
+        'default_brier': float(scores[0, 1]) if len(games) else None,
+        'best_hit_rate': float(results['hit_rate'].iloc[0]) if len(games) else None,
+        'best_weights': results[ml.WEIGHT_NAMES].iloc[0].to_dict() if len(games) else None,
+        'load_s': round(loaded - started, 3),
+        'search_s': round(searched - loaded, 3),
+    }
+    logger.info(f"BACKTEST {summary}")
+    return games, results, summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    imported = commands.add_parser('import-results', help="load final scores from a CSV")
+    imported.add_argument('path')
+    run = commands.add_parser('run', help="grade DEFAULT_WEIGHTS and a weight grid")
+    run.add_argument('--season', type=int, action='append', help="limit to a season, repeatable")
+    run.add_argument('--steps', type=int, default=BACKTEST_GRID_STEPS, help="values per weight")
+    run.add_argument('--workers', type=int, default=BACKTEST_WORKERS)
+    run.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    schema.ensure_schema()
+    if args.command == 'import-results':
+        print(f"imported {import_results(args.path)} results")
+        return
+
+    games, results, summary = backtest(args.season, args.steps, args.workers)
+    if not len(games):
+        print("no stored games have results yet, import some with import-results")
+        return
+    print(f"{summary['games']} games over {summary['weeks']} weeks, {summary['weight_vectors']} weight vectors"
+          f" in {summary['search_s']:.2f}s (load {summary['load_s']:.2f}s)")
+    print(f"odds favorite hit rate {summary['favorite_hit_rate']:.3f}, DEFAULT_WEIGHTS"
+          f" {summary['default_hit_rate']:.3f} (brier {summary['default_brier']:.3f})")
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(results.head(args.top).round(3).to_string())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+PAGE_TIMEOUT = int(os.getenv('PAGE_TIMEOUT', 20))  # seconds to wait for the target element
+# restart chrome after this many pages so a long running ingest doesn't leak memory
+MAX_PAGES_PER_DRIVER = int(os.getenv('MAX_PAGES_PER_DRIVER', 50))
+
+# the scrapers only read the DOM, none of this needs to download
+BLOCKED_URLS = [
+    '*.css', '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot', '*.mp4',
+]
+
+def setup_logger(name):
+    """Set up a logger for a given module."""
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+
+    # Create file handler which logs even debug messages
+    fh = logging.FileHandler('app.log')
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] - %(message)s')
+    fh.setFormatter(formatter)
+
+    # Add the handler to the logger
+    if not logger.handlers:
+        logger.addHandler(fh)
+
+    return logger
+
+logger = setup_logger(__name__)
+
+# one warm browser shared by every scraper, pages are loaded one at a time
+_lock = threading.Lock()
+_driver = None
+_pages_loaded = 0
+
+def _build_driver():
+    # Configure ChromeOptions for lean headless browsing
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")  # This line can be important in certain environments
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_experimental_option('prefs', {
+        'profile.managed_default_content_settings.images': 2,
+        'profile.managed_default_content_settings.stylesheets': 2,
+    })
+    options.set_capability('goog:loggingPrefs', {'browser': 'SEVERE'})
+    # return once the DOM is parsed instead of waiting on every subresource
+    options.page_load_strategy = 'eager'
+    driver = webdriver.Chrome(options=options)
+    driver.set_page_load_timeout(PAGE_TIMEOUT)
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URLS})
+    return driver
+
+def quit_driver():
+    """closes the shared browser, the next page load starts a new one"""
+    global _driver, _pages_loaded
+    if _driver is not None:
+        try:
+            _driver.quit()
+        except WebDriverException:
+            logger.exception("Error closing chrome")
+        _driver = None
+        _pages_loaded = 0
+
+atexit.register(quit_driver)
+
+def _load(url, wait_for, timeout):
+    global _driver, _pages_loaded
+    timings = {}
+
+    started = time.perf_counter()
+    if _driver is None or _pages_loaded >= MAX_PAGES_PER_DRIVER:
+        quit_driver()
+        _driver = _build_driver()
+    timings['startup'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    try:
+        _driver.get(url)
+    except TimeoutException:
+        logger.warning(f"Page load timed out after {PAGE_TIMEOUT}s on {url}, reading what loaded")
+    _pages_loaded += 1
+    timings['navigate'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    try:
+        WebDriverWait(_driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, wait_for))
+        )
+    except TimeoutException:
+        logger.warning(f"Timed out after {timeout}s waiting for {wait_for} on {url}")
+    timings['wait'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    html = _driver.page_source
+    timings['source'] = time.perf_counter() - started
+
+    logger.info(f"LOADED {url} in {sum(timings.values()):.2f}s ("
+                + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()) + ")")
+    return html
+
+def get_page_source(url, wait_for, timeout=PAGE_TIMEOUT):
+    """loads url in the shared browser and returns its html once the wait_for css selector is present"""
+    with _lock:
+        try:
+            return _load(url, wait_for, timeout)
+        except WebDriverException:
+            # the session died (chrome crashed or was killed), retry once on a fresh browser
+            logger.exception(f"Chrome session failed loading {url}, restarting")
+            quit_driver()
+            return _load(url, wait_for, timeout)
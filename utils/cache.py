@@ -0,0 +1,37 @@
+import threading
+from collections import OrderedDict
+
+class VersionedCache:
+    """Keeps results computed against one data version.
+
+    Every lookup passes the current data version; when it differs from the
+    version the entries were computed for, the cache is emptied first, so
+    new data invalidates it without any explicit expiry. With max_entries set,
+    the least recently used entries are dropped beyond that many.
+    """
+
+    def __init__(self, max_entries=None):
+        self._lock = threading.Lock()
+        self._version = None
+        self._entries = OrderedDict()
+        self.max_entries = max_entries
+
+    def get_or_compute(self, version, key, compute):
+        """returns the cached value for key at version, calling compute() on a miss"""
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._entries = OrderedDict()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        value = compute()
+
+        with self._lock:
+            # don't store a result if an ingest landed while computing it
+            if version == self._version:
+                self._entries[key] = value
+                if self.max_entries is not None and len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
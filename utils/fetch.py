@@ -0,0 +1,212 @@
+"""
+Every page the scrapers read goes through here, so it can be recorded to or
+replayed from fixtures on disk.
+
+FETCH_MODE=live    fetch from the network (default)
+FETCH_MODE=record  fetch from the network and save to FIXTURE_DIR
+FETCH_MODE=replay  read from FIXTURE_DIR only, never touch the network
+
+A fixture set is a directory holding index.json, which maps each url to its
+status code and file, plus the raw HTML in pages/. Non-page responses such as
+OpenAI completions are stored as JSON in responses/.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import utils.timing as timing
+
+FETCH_MODE = os.getenv('FETCH_MODE', 'live')
+FIXTURE_DIR = os.getenv('FIXTURE_DIR', 'fixtures')
+REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', 20))  # seconds
+FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', 16))  # concurrent requests in fetch_pages
+FETCH_PER_HOST = int(os.getenv('FETCH_PER_HOST', 8))  # of those, at most this many to one host
+
+MODES = ('live', 'record', 'replay')
+
+def setup_logger(name):
+    """Set up a logger for a given module."""
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+
+    # Create file handler which logs even debug messages
+    fh = logging.FileHandler('app.log')
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] - %(message)s')
+    fh.setFormatter(formatter)
+
+    # Add the handler to the logger
+    if not logger.handlers:
+        logger.addHandler(fh)
+
+    return logger
+
+logger = setup_logger(__name__)
+
+class FixtureMissing(KeyError):
+    """raised in replay mode for a request that was never recorded"""
+
+_index_lock = threading.Lock()
+
+def configure(mode=None, fixture_dir=None):
+    """switches mode and/or fixture set at runtime, e.g. from a benchmark"""
+    global FETCH_MODE, FIXTURE_DIR
+    if mode is not None:
+        if mode not in MODES:
+            raise ValueError(f"FETCH_MODE must be one of {MODES}, got {mode!r}")
+        FETCH_MODE = mode
+    if fixture_dir is not None:
+        FIXTURE_DIR = fixture_dir
+
+def _digest(key):
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+def _index_path():
+    return os.path.join(FIXTURE_DIR, 'index.json')
+
+def _read_index():
+    try:
+        with open(_index_path()) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def _record_page(url, status, html):
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', url.split('://', 1)[-1]).strip('_')[:60]
+    filename = f"{slug}-{_digest(url)}.html"
+    os.makedirs(os.path.join(FIXTURE_DIR, 'pages'), exist_ok=True)
+    if html is not None:
+        with open(os.path.join(FIXTURE_DIR, 'pages', filename), 'w', encoding='utf-8') as f:
+            f.write(html)
+    with _index_lock:
+        index = _read_index()
+        index[url] = {'status': status, 'file': filename if html is not None else None}
+        with open(_index_path(), 'w') as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+
+def _replay_page(url):
+    entry = _read_index().get(url)
+    if entry is None:
+        raise FixtureMissing(f"no fixture for {url} in {FIXTURE_DIR}")
+    if entry['file'] is None:
+        return entry['status'], None
+    with open(os.path.join(FIXTURE_DIR, 'pages', entry['file']), encoding='utf-8') as f:
+        return entry['status'], f.read()
+
+def _page(url, load):
+    """(status, html) for url from load() or the fixture set, depending on FETCH_MODE"""
+    if FETCH_MODE == 'replay':
+        return _replay_page(url)
+    with timing.timed('fetch'):
+        status, html = load()
+    if FETCH_MODE == 'record':
+        _record_page(url, status, html)
+    return status, html
+
+def fetch_page(url, session=None):
+    """GETs url, returns its html or None when the status isn't 200"""
+    def load():
+        response = (session or requests).get(url, timeout=REQUEST_TIMEOUT)
+        return response.status_code, response.text if response.status_code == 200 else None
+
+    status, html = _page(url, load)
+    if status != 200:
+        logger.warning(f"Failed to retrieve {url}. Status code: {status}")
+    return html
+
+def fetch_conditional(url, etag=None, last_modified=None, session=None):
+    """
+    GETs url with If-None-Match / If-Modified-Since from an earlier response,
+    returns (status, html, etag, last_modified); html is None unless status is 200
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    validators = {}
+
+    def load():
+        response = (session or requests).get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        validators.update(etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'))
+        return response.status_code, response.text if response.status_code == 200 else None
+
+    status, html = _page(url, load)
+    if status not in (200, 304):
+        logger.warning(f"Failed to retrieve {url}. Status code: {status}")
+    return status, html, validators.get('etag'), validators.get('last_modified')
+
+def make_session(pool_size=FETCH_WORKERS):
+    """requests session with keep-alive connections and retry with backoff on failures and 429s"""
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,  # 0.5s, 1s, 2s
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET'],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def fetch_pages(urls, max_workers=FETCH_WORKERS, per_host=FETCH_PER_HOST):
+    """
+    fetch_page for every url concurrently over one pooled session, returns
+    the html (or None) for each url in input order
+    """
+    session = make_session(max_workers)
+    host_slots = {host: threading.BoundedSemaphore(per_host) for host in {urlsplit(url).netloc for url in urls}}
+
+    def fetch_one(url):
+        with host_slots[urlsplit(url).netloc]:
+            try:
+                return fetch_page(url, session=session)
+            except FixtureMissing:
+                raise
+            except requests.RequestException as e:
+                logger.warning(f"Failed to retrieve {url}: {e}")
+                return None
+
+    with session, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(fetch_one, urls))
+
+def fetch_rendered(url, wait_for):
+    """loads url in the shared headless browser, returns its html once wait_for is present"""
+    def load():
+        # only the live and record modes need selenium
+        import utils.browser as browser
+        return 200, browser.get_page_source(url, wait_for)
+
+    return _page(url, load)[1]
+
+def replay_call(namespace, request, produce):
+    """
+    returns produce(), recording or replaying its result keyed by the
+    json-serializable request; used for calls like OpenAI completions
+    """
+    if FETCH_MODE == 'live':
+        return produce()
+
+    key = json.dumps(request, sort_keys=True)
+    path = os.path.join(FIXTURE_DIR, 'responses', namespace, f"{_digest(key)}.json")
+    if FETCH_MODE == 'replay':
+        try:
+            with open(path) as f:
+                return json.load(f)['response']
+        except FileNotFoundError:
+            raise FixtureMissing(f"no recorded {namespace} response for {key[:200]}")
+
+    response = produce()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'request': request, 'response': response}, f, indent=1)
+    return response
@@ -1,17 +1,33 @@
 import sqlite3
 import pandas as pd
 from datetime import datetime, timedelta
-import json
+import math
+import utils.schema as schema
+import utils.table_query as table_query
+
+def sql_bound(value, fmt=schema.ISO_DATETIME):
+    """
+    formats a start/end bound for comparison with the ISO-8601 date columns. Date-only
+    columns need fmt=schema.ISO_DATE, or rows from the start day sort below the bound
+    """
+    return pd.Timestamp(value).strftime(fmt)
+
+def get_data_version():
+    """gets the ingest counter the dashboard cache is keyed by"""
+    with sqlite3.connect(schema.DB_PATH) as conn:
+        return schema.get_data_version(conn)
 
 def get_merged_data():
     """gets the bovada betting data and espn expert data"""
-    with sqlite3.connect('data-log.db') as conn:
+    with sqlite3.connect(schema.DB_PATH) as conn:
         cursor = conn.cursor()
 
         # Fetch the corresponding game data from the database by game_id
         cursor.execute("""
-                    SELECT * FROM merged_data 
-                    WHERE IngestTime = (SELECT MAX(IngestTime) FROM merged_data)
+                    SELECT game_id, matchup, projected_winner, ranking, alt_game_id,
+                           week, Game, Time, pct, message, IngestTime
+                    FROM merged_data
+                    WHERE ingested_at = (SELECT MAX(ingested_at) FROM merged_data)
                     """)
     columns = ['game_id', 'Matchup', 'Projected Winner', 'Ranking', 'alt_game_id',
             'Week', 'Game', 'Time', 'pct', 'message', 'IngestTime']
@@ -21,112 +37,111 @@ def get_merged_data():
 
 def get_bovada_data(start, end):
     """gets the bovada betting data and espn expert data"""
-    with sqlite3.connect('data-log.db') as conn:
+    with sqlite3.connect(schema.DB_PATH) as conn:
         cursor = conn.cursor()
 
         # Fetch the corresponding game data from the database by game_id
         cursor.execute("""
-                    SELECT * FROM bovada_data 
-                    """)
+                    SELECT date, time, bets, home_team, away_team, home_win, away_win,
+                           win_differential, day, points, game_id
+                    FROM bovada_data
+                    WHERE date BETWEEN ? AND ?
+                    """, (sql_bound(start, schema.ISO_DATE), sql_bound(end, schema.ISO_DATE)))
     columns = ['date', 'time', 'bets', 'home_team', 'away_team',
             'home_win', 'away_win', 'win_diff', 'day', 'points', 'game_id']
     df = pd.DataFrame(cursor.fetchall(), columns=columns)
     df['date'] = pd.to_datetime(df['date'])
-    df = df[(df['date']>=start) & (df['date']<=end)]
     return df
 
 def get_expert_data(start, end):
-    with sqlite3.connect('data-log.db') as conn:
+    with sqlite3.connect(schema.DB_PATH) as conn:
         cursor = conn.cursor()
 
         # Fetch the corresponding game data from the database by game_id
         cursor.execute("""
-                    SELECT * FROM expert_data 
-                    """)
+                    SELECT Game, Time, Bell, Bowen, Clay, Fowler, Graziano, Kahler, Martin,
+                           Moody, Reid, Thiry, Wicker, week, pct, message, game_id, datetime
+                    FROM expert_data
+                    WHERE datetime BETWEEN ? AND ?
+                    """, (sql_bound(start), sql_bound(end)))
     columns = ['game', 'time', 'Bell', 'Bowen', 'Clay', 'Fowler', 'Graziano', 'Kahler', 'Martin',
             'Moody', 'Reid', 'Thiry', 'Wicker' ,'week', 'pct', 'message', 'game_id', 'datetime']
     df = pd.DataFrame(cursor.fetchall(), columns=columns)
     df['datetime'] = pd.to_datetime(df['datetime'])
-    df = df[(df['datetime']>=start) & (df['datetime']<=end)]
     return df
 
+# dashboard tables, with columns aliased to the names the DataTables show
+MERGED_TABLE_SQL = '''
+    SELECT matchup AS "Matchup", projected_winner AS "Projected Winner", ranking AS "Ranking",
+           week AS "Week", Time AS "Time", message AS "message", IngestTime AS "IngestTime"
+    FROM merged_data
+    WHERE ingested_at = (SELECT MAX(ingested_at) FROM merged_data)
+    '''
+# article_team_scores holds the parsed score_article output, one row per article and team
+NEWS_TABLE_SQL = '''
+    SELECT n.date AS "Date", n.title AS "Article Title", s.team AS "Team",
+           s.rating AS "AI Rating", n.link AS "Article Link"
+    FROM espn_news n
+    JOIN article_team_scores s ON s.title = n.title
+    WHERE n.date BETWEEN ? AND ?
+    '''
+TEAM_RATING_SQL = '''
+    SELECT s.team AS "Team", SUM(s.rating) AS "AI News Sentiment Score"
+    FROM espn_news n
+    JOIN article_team_scores s ON s.title = n.title
+    WHERE n.date BETWEEN ? AND ?
+    GROUP BY s.team
+    '''
+# written by ml.update_picks at ingest time
+PICKS_TABLE_SQL = '''
+    SELECT date AS "Date", home_team || ' vs ' || away_team AS "Matchup", pick AS "Pick",
+           ROUND(ABS(confidence), 3) AS "Confidence", ROUND(home_score, 3) AS "Home Score",
+           ROUND(away_score, 3) AS "Away Score"
+    FROM picks
+    WHERE date BETWEEN ? AND ?
+    ORDER BY ABS(confidence) DESC
+    '''
+
+TABLES = {
+    'merged': (MERGED_TABLE_SQL, ['Matchup', 'Projected Winner', 'Ranking', 'Week', 'Time', 'message', 'IngestTime']),
+    'news': (NEWS_TABLE_SQL, ['Date', 'Article Title', 'Team', 'AI Rating', 'Article Link']),
+    'team_rating': (TEAM_RATING_SQL, ['Team', 'AI News Sentiment Score']),
+    'picks': (PICKS_TABLE_SQL, ['Date', 'Matchup', 'Pick', 'Confidence', 'Home Score', 'Away Score']),
+}
+
+def _table_params(name, start_date, end_date):
+    if name == 'merged':
+        return ()
+    # news, team_rating and picks all filter on a date-only column
+    return (sql_bound(start_date, schema.ISO_DATE), sql_bound(end_date, schema.ISO_DATE))
+
 def get_transformed_news_data(start_date, end_date):
     """Returns the news data and the aggregated team scoring data"""
-    # Connect to SQLite database
-    with sqlite3.connect('data-log.db') as conn:
-        cursor = conn.cursor()
+    params = _table_params('news', start_date, end_date)
+    with sqlite3.connect(schema.DB_PATH) as conn:
+        espn_news_df = pd.read_sql_query(NEWS_TABLE_SQL, conn, params=params)
+        team_rating = pd.read_sql_query(TEAM_RATING_SQL, conn, params=params)
 
-        # Execute the query to get articles within the date range where relevant is None
-        cursor.execute('''
-        SELECT * FROM espn_news
-        ''')
-    # 1
-    # Fetch all results
-    data = cursor.fetchall()
-
-    columns = ['title', 'date', 'link', 'image_url', 'relevant', 'ai_score']
-    espn_news_df = pd.DataFrame(data, columns=columns)
-
-    espn_news_df['date'] = espn_news_df['date'].apply(lambda x: pd.to_datetime(x))
-    espn_news_df = espn_news_df[(espn_news_df['date']>=start_date) & (espn_news_df['date']<=end_date)]
-
-    df = espn_news_df[espn_news_df['ai_score'].notna()]
-    df['ai_score'] = df['ai_score'].str.replace('\n', '')
-    items = []
-    for ix, row in df.iterrows():
-        load = json.loads(row['ai_score'])
-        keys =  list(load.keys())
-        # if key.lower() in ['result', 'results', 'team', 'team_name']:
-        #     return load[key]
-        if len(keys)!=0:
-            if keys[0].lower() in ['result', 'results', 'team', 'team_name']:
-                if len(load[keys[0]]) > 1:
-                    try:
-                        for r in load[keys[0]]:
-                            item = {
-                                "title": row['title'],
-                                "team": list(r.keys())[0],
-                                "ai_rating": list(r.values())[0]
-                            }
-                            items.append(item)
-                    except:
-                        item = {
-                            'title': row['title'],
-                            "team": load[keys[0]],
-                            "ai_rating": load[keys[1]]
-                            }
-                        items.append(item)
-                else:
-                    item = {
-                        "title": row['title'],
-                        "team": list(load[keys[0]].keys())[0],
-                        "ai_rating": load[keys[0]][list(load[keys[0]].keys())[0]]
-                    }
-                    items.append(item)
-            else:
-                item = {
-                        "title": row['title'],
-                        "team": keys[0],
-                        "ai_rating": load[keys[0]]
-                    }
-                items.append(item)
-
-    df = pd.DataFrame(items)
-    teams = ['Arizona Cardinals','Baltimore Ravens','Buffalo Bills','Chicago Bears','Cincinnati Bengals','Dallas Cowboys','Denver Broncos','Detroit Lions','Green Bay Packers','Houston Texans',
-    'Indianapolis Colts','Jacksonville Jaguars','Kansas City Chiefs','Los Angeles Chargers','Miami Dolphins','Minnesota Vikings','New Orleans Saints','New York Giants','New York Jets',
-    'Philadelphia Eagles','San Francisco 49ers','Seattle Seahawks','Tampa Bay Buccaneers','Washington Commanders']
-    df = df[df['team'].isin(teams)]
-
-    merged = pd.merge(df, espn_news_df, on='title', how='left').drop(columns=['date', 'link', 'image_url', 'ai_score', 'relevant'])
-    espn_news_df = pd.merge(espn_news_df, merged, on='title', how='left').drop(columns=['ai_score', 'image_url', 'relevant'])
-    espn_news_df = espn_news_df[['date', 'title', 'team', 'ai_rating', 'link']]
-    espn_news_df.columns = ['Date', 'Article Title', 'Team', 'AI Rating', 'Article Link']
-    espn_news_df.dropna(subset= ['Team'], inplace=True)
-    merged.drop(columns=['title'], inplace=True)
-    team_rating = merged.groupby('team').agg(sum).reset_index()
-    team_rating.columns = ['Team', 'AI News Sentiment Score']
+    espn_news_df['Date'] = pd.to_datetime(espn_news_df['Date'])
     return espn_news_df, team_rating
 
+def get_table_page(name, start_date, end_date, page_current=0, page_size=25, sort_by=None, filter_query=''):
+    """
+    one page of a dashboard table, filtered and sorted in SQL, as
+    (records, page_count) for a DataTable with custom page/sort/filter actions
+    """
+    sql, columns = TABLES[name]
+    where, where_params = table_query.where_clause(filter_query, columns)
+    order = table_query.order_clause(sort_by, columns)
+    params = _table_params(name, start_date, end_date) + tuple(where_params)
+    with sqlite3.connect(schema.DB_PATH) as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM ({sql}){where}", params).fetchone()[0]
+        page = pd.read_sql_query(f"SELECT * FROM ({sql}){where}{order} LIMIT ? OFFSET ?", conn,
+                                 params=params + (page_size, page_current * page_size))
+    # NaN isn't valid JSON, the tables show missing values as empty cells
+    page = page.astype(object).where(page.notna(), None)
+    return page.to_dict('records'), max(1, math.ceil(total / page_size))
+
 
 def get_start_end():
     """get start and end for this weeks games"""
@@ -144,4 +159,24 @@ def get_start_end():
         end_date = today
     else:  # If today is after Monday
         end_date = today + timedelta(days=(7 - weekday))
-    return start_date, end_date
\ No newline at end of file
+    return start_date, end_date
+
+def nfl_season_week(value):
+    """
+    (season, week) for a date. Weeks run Tuesday to Monday like get_start_end,
+    week 1 starts the day after Labor Day, preseason dates get week 0 or below
+    """
+    day = pd.Timestamp(value).normalize()
+    # January and February games belong to the season that started the fall before
+    season = day.year if day.month >= 6 else day.year - 1
+    september = pd.Timestamp(season, 9, 1)
+    labor_day = september + timedelta(days=(7 - september.weekday()) % 7)
+    return season, (day - labor_day - timedelta(days=1)).days // 7 + 1
+
+def with_season_week(df, column='date'):
+    """df with season and week columns from nfl_season_week(df[column])"""
+    if df.empty:
+        return df.assign(season=pd.Series(dtype='int64'), week=pd.Series(dtype='int64'))
+    weeks = {value: nfl_season_week(value) for value in df[column].unique()}
+    season_week = df[column].map(weeks)
+    return df.assign(season=season_week.str[0], week=season_week.str[1])
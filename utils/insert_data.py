@@ -1,15 +1,24 @@
 import logging
 import pandas as pd
 import hashlib
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+import json
 from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
-import time
 import sqlite3
+import utils.schema as schema
+import utils.fetch as fetch
+import utils.odds as odds
+import utils.parsers as parsers
+import utils.timing as timing
 
 pd.set_option('display.max_columns', None)
 
+BOVADA_URL = "https://www.bovada.lv/sports/football/nfl"
+ESPN_PICKS_URL = "https://www.espn.com/nfl/picks"
+# elements the scrapers wait for instead of sleeping a fixed time
+BOVADA_WAIT_FOR = "section.coupon-content"
+ESPN_PICKS_WAIT_FOR = ".Table__Scroller .Table__TBODY .Table__TR"
+
 def setup_logger(name):
     """Set up a logger for a given module."""
     logger = logging.getLogger(name)
@@ -28,164 +37,84 @@ def setup_logger(name):
 
 logger = setup_logger(__name__)
 
-def insert_data_to_db(df, conn, table):
+def row_hashes(df):
+    """md5 fingerprint of each row's values"""
+    return pd.Series([
+        hashlib.md5('\x1f'.join(map(str, row)).encode()).hexdigest()
+        for row in df.itertuples(index=False, name=None)
+    ], index=df.index, dtype=object)
+
+def insert_changed_rows(conn, table, df, ignore=()):
+    """
+    appends the rows of df whose content differs from the latest stored row
+    with the same game_id, returns (inserted, unchanged)
+
+    columns in ignore are written but left out of the fingerprint
+    """
+    if df.empty:
+        return 0, 0
+
+    # line the frame up with the table, sqlite column names are case insensitive
+    table_columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})") if row[1] != 'row_hash']
+    by_name = {column.lower(): column for column in df.columns}
+    dropped = sorted(set(by_name) - {column.lower() for column in table_columns} - {'row_hash'})
+    if dropped:
+        # e.g. a new ESPN expert, add the column in a schema migration to keep it
+        logger.warning(f"{table} has no column for {', '.join(by_name[column] for column in dropped)}, not stored")
+    rows = pd.DataFrame({
+        column: df[by_name[column.lower()]] if column.lower() in by_name else None
+        for column in table_columns
+    }, index=df.index)
+    rows['row_hash'] = row_hashes(rows[[c for c in table_columns if c not in ignore]])
+
+    # one indexed lookup for the latest stored fingerprint of every game in the batch
+    cursor = conn.execute(f"""
+        SELECT game_id, row_hash FROM {table}
+        WHERE rowid IN (SELECT MAX(rowid) FROM {table}
+                        WHERE game_id IN (SELECT value FROM json_each(?))
+                        GROUP BY game_id)
+        """, (json.dumps(rows['game_id'].astype(str).unique().tolist()),))
+    stored = dict(cursor.fetchall())
+    changed = rows[rows['game_id'].astype(str).map(stored.get) != rows['row_hash']]
+
+    placeholders = ", ".join("?" for _ in changed.columns)
+    column_list = ", ".join(f'"{column}"' for column in changed.columns)
     try:
-        df.to_sql(table, conn, if_exists='append', index=False)
+        with conn:
+            conn.executemany(
+                f"INSERT INTO {table} ({column_list}) VALUES ({placeholders})",
+                changed.astype(object).where(changed.notna(), None).values.tolist()
+            )
     except Exception as e:
         logger.exception(f"SQL INSERT Error on TABLE: {table}\n{e}")
+        return 0, len(rows) - len(changed)
+    return len(changed), len(rows) - len(changed)
 
 def insert_bovada_data(current_df):
-    with sqlite3.connect('data-log.db') as conn:
-        cursor = conn.cursor()
-
-        # Initialize an empty list to collect DataFrames for concatenation
-        games_to_insert_list = []
-
-        # Iterate over each game in the current DataFrame
-        for index, game in current_df.iterrows():
-            game_id = game['game_id']
-
-            # Fetch the corresponding game data from the database by game_id
-            cursor.execute("SELECT * FROM bovada_data WHERE game_id = ?", (game_id,))
-            db_game = cursor.fetchone()
-            columns = ['date', 'time', 'bets', 'home_team', 'away_team', 'home_win', 'away_win', 'win_differential', 'day', 'points', 'game_id']
-
-            if db_game:
-                # Convert db_game to DataFrame for comparison
-                db_game_df = pd.DataFrame([db_game], columns=columns)
-
-                # Prepare current game data for comparison
-                current_game_df = pd.DataFrame([game], columns=columns)
-                # current_game_df['datetime'] = datetime.now().isoformat()
-
-                # Compare with current game data
-                if not current_game_df.equals(db_game_df):
-                    # Add to the list for bulk insertion
-                    games_to_insert_list.append(current_game_df)
-            else:
-                # If there is no entry for this game in the database, prepare for insertion
-                # game['datetime'] = datetime.now().isoformat()
-                games_to_insert_list.append(pd.DataFrame([game], columns=columns))
-
-        # Concatenate all DataFrames in the list for bulk insertion
-        if games_to_insert_list:
-            games_to_insert = pd.concat(games_to_insert_list, ignore_index=True)
-            insert_data_to_db(games_to_insert, conn, 'bovada_data')
-        logger.info("Added bovada data to SQL")
+    with sqlite3.connect(schema.DB_PATH) as conn:
+        inserted, unchanged = insert_changed_rows(conn, 'bovada_data', current_df)
+    logger.info(f"Added bovada data to SQL ({inserted} inserted, {unchanged} unchanged)")
 
 
 def insert_matchup_data(current_df):
-    with sqlite3.connect('data-log.db') as conn:
-        cursor = conn.cursor()
-
-        # Initialize an empty list to collect DataFrames for concatenation
-        games_to_insert_list = []
-
-        # Iterate over each game in the current DataFrame
-        for index, game in current_df.iterrows():
-            game_id = game['game_id']
-
-            # Fetch the corresponding game data from the database by game_id
-            cursor.execute("SELECT * FROM matchup_data WHERE game_id = ?", (game_id,))
-            db_game = cursor.fetchone()
-            columns = ['time', 'matchup', 'projected_winner', 'ranking', 'game_id']
-
-            if db_game:
-                # Convert db_game to DataFrame for comparison
-                db_game_df = pd.DataFrame([db_game], columns=columns)
-
-                # Prepare current game data for comparison
-                current_game_df = pd.DataFrame([game], columns=columns)
-                # current_game_df['datetime'] = datetime.now().isoformat()
-
-                # Compare with current game data
-                if not current_game_df.equals(db_game_df):
-                    # Add to the list for bulk insertion
-                    games_to_insert_list.append(current_game_df)
-            else:
-                # If there is no entry for this game in the database, prepare for insertion
-                # game['datetime'] = datetime.now().isoformat()
-                games_to_insert_list.append(pd.DataFrame([game], columns=columns))
-
-        # Concatenate all DataFrames in the list for bulk insertion
-        if games_to_insert_list:
-            games_to_insert = pd.concat(games_to_insert_list, ignore_index=True)
-            insert_data_to_db(games_to_insert, conn, 'matchup_data')
-        logger.info("Added matchup data to SQL")
+    with sqlite3.connect(schema.DB_PATH) as conn:
+        inserted, unchanged = insert_changed_rows(conn, 'matchup_data', current_df)
+    logger.info(f"Added matchup data to SQL ({inserted} inserted, {unchanged} unchanged)")
 
 def insert_expert_data(current_df):
-    with sqlite3.connect('data-log.db') as conn:
-        cursor = conn.cursor()
-
-        # Initialize an empty list to collect DataFrames for concatenation
-        games_to_insert_list = []
-
-        # Iterate over each game in the current DataFrame
-        for index, game in current_df.iterrows():
-            game_id = game['game_id']
-
-            # Fetch the corresponding game data from the database by game_id
-            cursor.execute("SELECT * FROM matchup_data WHERE game_id = ?", (game_id,))
-            db_game = cursor.fetchone()
-
-            if db_game:
-                # Convert db_game to DataFrame for comparison
-                db_game_df = pd.DataFrame([db_game])
-
-                # Prepare current game data for comparison
-                current_game_df = pd.DataFrame([game])
-                current_game_df['datetime'] = datetime.now().isoformat()
-
-                # Compare with current game data
-                if not current_game_df.equals(db_game_df):
-                    # Add to the list for bulk insertion
-                    games_to_insert_list.append(current_game_df)
-            else:
-                # If there is no entry for this game in the database, prepare for insertion
-                game['datetime'] = datetime.now().isoformat()
-                games_to_insert_list.append(pd.DataFrame([game]))
-
-        # Concatenate all DataFrames in the list for bulk insertion
-        if games_to_insert_list:
-            games_to_insert = pd.concat(games_to_insert_list, ignore_index=True)
-            insert_data_to_db(games_to_insert, conn, 'expert_data')
-        logger.info("Added expert data to SQL")
+    current_df = current_df.copy()
+    current_df['datetime'] = datetime.now().strftime(schema.ISO_DATETIME)
+    with sqlite3.connect(schema.DB_PATH) as conn:
+        # datetime is the scrape time, only a change in the picks is a new row
+        inserted, unchanged = insert_changed_rows(conn, 'expert_data', current_df, ignore=('datetime',))
+    logger.info(f"Added expert data to SQL ({inserted} inserted, {unchanged} unchanged)")
 
 def insert_merge_data(current_df):
-    with sqlite3.connect('data-log.db') as conn:
-        cursor = conn.cursor()
-
-        # Initialize an empty list to collect DataFrames for concatenation
-        games_to_insert_list = []
-
-        # Iterate over each game in the current DataFrame
-        for index, game in current_df.iterrows():
-            game_id = game['game_id']
-
-            # Fetch the corresponding game data from the database by game_id
-            cursor.execute("SELECT * FROM merged_data WHERE game_id = ?", (game_id,))
-            db_game = cursor.fetchone()
-
-            if db_game:
-                # Convert db_game to DataFrame for comparison
-                db_game_df = pd.DataFrame([db_game])
-
-                # Prepare current game data for comparison
-                current_game_df = pd.DataFrame([game])
-
-                # Compare with current game data
-                if not current_game_df.equals(db_game_df):
-                    # Add to the list for bulk insertion
-                    games_to_insert_list.append(current_game_df)
-            else:
-                # If there is no entry for this game in the database, prepare for insertion
-                games_to_insert_list.append(pd.DataFrame([game]))
-
-        # Concatenate all DataFrames in the list for bulk insertion
-        if games_to_insert_list:
-            games_to_insert = pd.concat(games_to_insert_list, ignore_index=True)
-            insert_data_to_db(games_to_insert, conn, 'merged_data')
-        logger.info("Added MERGED data to SQL")
+    with sqlite3.connect(schema.DB_PATH) as conn:
+        # IngestTime stays in the fingerprint, get_merged_data reads whole
+        # snapshots by their ingested_at
+        inserted, unchanged = insert_changed_rows(conn, 'merged_data', current_df)
+    logger.info(f"Added MERGED data to SQL ({inserted} inserted, {unchanged} unchanged)")
 
 def generate_game_id(row):
     try:
@@ -215,36 +144,20 @@ def concat_values(x, y, z=None):
     return f"{x} {y}"
 
 def get_data(start_date, end_date):
-    # Configure ChromeOptions for headless browsing
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--disable-extensions")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")  # This line can be important in certain environments
-    options.set_capability('goog:loggingPrefs', {'browser': 'SEVERE'})
-    # Initialize the Chrome WebDriver with the specified options
-    driver = webdriver.Chrome(options=options)
-    driver.get("https://www.bovada.lv/sports/football/nfl")
-    # wait for the page to load
-    time.sleep(10)
-    driver.implicitly_wait(10)
-    # get the HTML source
-    html = driver.page_source
-    # create a BeautifulSoup object
-    soup = BeautifulSoup(html, "html.parser")
-    # close the driver
-    driver.quit()
-
-    data = []
-    sections = soup.find_all("section", {"class":"coupon-content more-info"})#soup.find_all("section", {"class":"coupon-content more-info"})
-    for game in sections:
-        try:
-            item = str(game).split('>')
-            info = [x.split('<')[0].strip() for x in item if not x.startswith("<")]
-            data.append(info)
-        except Exception as e:
-            print(f"Error!: {e} {item}")
+    # get the HTML source once the game coupons have rendered
+    html = fetch.fetch_rendered(BOVADA_URL, BOVADA_WAIT_FOR)
+    with timing.timed('bovada.parse'):
+        df = parsers.parse_bovada(html)
+    with timing.timed('bovada.transform'):
+        current_df = transform_bovada(df, start_date, end_date)
+    with timing.timed('bovada.write'):
+        insert_bovada_data(current_df)
+    with timing.timed('bovada.odds_history'):
+        odds.record_snapshot(current_df)
+    return current_df
 
+def transform_bovada(df, start_date, end_date):
+    """names, date filters and ranks the parsed Bovada games"""
     def get_bets(string):
         try:
             return int(string.split('+')[1].strip())
@@ -252,22 +165,7 @@ def get_data(start_date, end_date):
             print(f"Get Bets Error {e} {string}")
             return None
 
-    df = pd.DataFrame(data)
-    # df["Home Spread"] = df.apply(lambda row: concat_values(row[10], row[11]), axis=1)
-    # df["Away Spread"] = df.apply(lambda row: concat_values(row[12], row[13]), axis=1)
-    # df["total_home"] = df.apply(lambda row: concat_values(row[16], row[17], row[18]), axis=1)
-    # df["total_away"] = df.apply(lambda row: concat_values(row[19], row[20], row[21]), axis=1)
-    df['bets'] = df[2].apply(lambda x: get_bets(x))
-    df.rename(columns = {
-        0: "date",
-        1: "time",
-        6: "home_team",
-        7: "away_team",
-        14: "home_win",
-        15: "away_win"
-    }, inplace=True)
-
-    df = df[["date", "time", "bets", "home_team", "away_team", "home_win", "away_win"]]
+    df['bets'] = df['bets'].apply(lambda x: get_bets(x))
 
     def create_differential(home_win, away_win):
         try:
@@ -298,7 +196,7 @@ def get_data(start_date, end_date):
     #create day of the week column
     df["day"] = df['date'].dt.strftime('%A')
     #set back to string
-    df['date'] = df['date'].dt.strftime('%Y-%m-%d')
+    df['date'] = df['date'].dt.strftime(schema.ISO_DATE)
     df.reset_index(inplace=True, drop=True)
 
     # Applying the conversion to the 'win_home' and "Away Win" columns
@@ -317,7 +215,6 @@ def get_data(start_date, end_date):
     current_df = df.sort_values('points', ascending=False)
     #add game id
     current_df["game_id"] = current_df.apply(generate_game_id, axis=1)
-    insert_bovada_data(current_df)
     return current_df
 
 def generate_matchups(df):
@@ -387,6 +284,78 @@ def generate_matchups(df):
     return matchup_df
 
 def get_espn_expert_data():
+    try:
+        # get the HTML source once the picks table has rendered
+        html = fetch.fetch_rendered(ESPN_PICKS_URL, ESPN_PICKS_WAIT_FOR)
+        with timing.timed('espn_picks.parse'):
+            df = parse_espn_picks(html)
+        with timing.timed('espn_picks.transform'):
+            df = transform_espn_picks(df)
+        with timing.timed('espn_picks.write'):
+            insert_expert_data(df)
+        return df[["game_id", "week", "Game", "Time", "pct", "message"]]
+    except Exception as e:
+        logger.exception(f"get espn data, {e}")
+
+def parse_espn_picks(html):
+    """reads the week, games and each expert's picks off the ESPN picks page"""
+    # create a BeautifulSoup object
+    soup = BeautifulSoup(html, "html.parser")
+
+    week = soup.find('h1', class_='headline headline__h1 dib').get_text(strip=True).split('- ')[1]
+
+    # Extract game details
+    games = []
+    game_rows = soup.select('.Table--fixed-left .Table__TBODY .Table__TR')
+    for row in game_rows:
+        game_info_element = row.select_one('.wrap-competition a')
+        game_time_element = row.select_one('.competition-dates')
+        if game_info_element and game_time_element:
+            game_info = game_info_element.text
+            game_time = game_time_element.text
+            games.append((game_info, game_time))
+
+    # Extract expert names
+    experts = []
+    expert_headers = soup.select('.Table__Scroller .Table__THEAD .Table__TH')
+    for header in expert_headers:
+        expert_name_element = header.select_one('div')
+        if expert_name_element:
+            expert_name = expert_name_element.text.strip()
+            experts.append(expert_name)
+
+    # Extract picks
+    picks = []
+    pick_rows = soup.select('.Table__Scroller .Table__TBODY .Table__TR')
+    for row in pick_rows:
+        pick_row = []
+        pick_cells = row.select('.Table__TD')
+        for cell in pick_cells:
+            team_logo = cell.select_one('img')
+            if team_logo:
+                # Extract the team abbreviation from the image URL
+                team = team_logo['src'].split('/')[-1].split('.')[0]
+            else:
+                team = None
+            pick_row.append(team)
+        picks.append(pick_row)
+
+    # Create DataFrame
+    data = {'Game': [game[0] for game in games], 'Time': [game[1] for game in games]}
+    for i, expert in enumerate(experts):
+        data[expert] = [pick[i] for pick in picks]
+
+    data['Game'].append(None)
+    data['Time'].append(None)
+
+    df = pd.DataFrame(data)
+    df.dropna(subset=["Game"], inplace=True)
+
+    df['week'] = week
+    return df
+
+def transform_espn_picks(df):
+    """adds the expert consensus pct, message and game_id for each game"""
     # Function to transform the game string
     def transform_game(game):
         try:
@@ -395,123 +364,59 @@ def get_espn_expert_data():
         except:
             teams = game.split(' VS ')
             return teams[0] + teams[1]
-    try:
-        options = Options()
-        options.add_argument("--headless")
-        options.add_argument("--disable-extensions")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--no-sandbox")  # This line can be important in certain environments
-        options.set_capability('goog:loggingPrefs', {'browser': 'SEVERE'})
-        # Initialize the Chrome WebDriver with the specified options
-        driver = webdriver.Chrome(options=options)
-        driver.get("https://www.espn.com/nfl/picks")
-        #time.sleep(10)
-        driver.implicitly_wait(10)
-        # get the HTML source
-        html = driver.page_source
-        # create a BeautifulSoup object
-        soup = BeautifulSoup(html, "html.parser")
-        # close the driver
-        driver.quit()
-
-        week = soup.find('h1', class_='headline headline__h1 dib').get_text(strip=True).split('- ')[1]
-
-        # Extract game details
-        games = []
-        game_rows = soup.select('.Table--fixed-left .Table__TBODY .Table__TR')
-        for row in game_rows:
-            game_info_element = row.select_one('.wrap-competition a')
-            game_time_element = row.select_one('.competition-dates')
-            if game_info_element and game_time_element:
-                game_info = game_info_element.text
-                game_time = game_time_element.text
-                games.append((game_info, game_time))
-
-        # Extract expert names
-        experts = []
-        expert_headers = soup.select('.Table__Scroller .Table__THEAD .Table__TH')
-        for header in expert_headers:
-            expert_name_element = header.select_one('div')
-            if expert_name_element:
-                expert_name = expert_name_element.text.strip()
-                experts.append(expert_name)
-
-        # Extract picks
-        picks = []
-        pick_rows = soup.select('.Table__Scroller .Table__TBODY .Table__TR')
-        for row in pick_rows:
-            pick_row = []
-            pick_cells = row.select('.Table__TD')
-            for cell in pick_cells:
-                team_logo = cell.select_one('img')
-                if team_logo:
-                    # Extract the team abbreviation from the image URL
-                    team = team_logo['src'].split('/')[-1].split('.')[0]
-                else:
-                    team = None
-                pick_row.append(team)
-            picks.append(pick_row)
-
-        # Create DataFrame
-        data = {'Game': [game[0] for game in games], 'Time': [game[1] for game in games]}
-        for i, expert in enumerate(experts):
-            data[expert] = [pick[i] for pick in picks]
-
-        data['Game'].append(None)
-        data['Time'].append(None)
-
-        df = pd.DataFrame(data)
-        df.dropna(subset=["Game"], inplace=True)
-
-        df['week'] = week
-
-        convert_dict = {
-            "min": "Vikings", "phi": "Eagles", "bal": "Ravens", "det": "Lions", "mia": "Dolphins",
-            "nyj": "Jets", "atl": "Falcons", "gb": "Packers", "hou" : "Texans", "lac": "Chargers",
-            "buf": "Bills", "den": "Broncos", "kc": "Chiefs", "chi": "Bears", "sf": "49ers", "pit": "Steelers",
-            "no": "Saints", "cin": "Bengals", "ne": "Patriots", "wsh": "Commanders", "ari": "Cardinals", 
-            "lar": "Rams", "tb": "Tampa Bay", "dal": "Dallas Cowboys", "ind": "Indianappolis Colts", 
-            "sea": "Seattle Seahawks"
-        }
-
-        for ix, row in df.iterrows():
-            values = row.to_list()[2:]
-            values = [value for value in values if value is not None]
-            values_len = len(values)
-            values_dict = {}
-            for value in values:
-                if value not in values_dict.keys():
-                    values_dict[value] = 1
-                else:
-                    values_dict[value] += 1
-            #sorting
-            values_dict = dict(sorted(values_dict.items(), key=lambda item: item[1], reverse=True))
-            top_key = next(iter(values_dict))
-            if top_key in convert_dict:
-                converted_key = convert_dict[top_key]
+
+    convert_dict = {
+        "min": "Vikings", "phi": "Eagles", "bal": "Ravens", "det": "Lions", "mia": "Dolphins",
+        "nyj": "Jets", "atl": "Falcons", "gb": "Packers", "hou" : "Texans", "lac": "Chargers",
+        "buf": "Bills", "den": "Broncos", "kc": "Chiefs", "chi": "Bears", "sf": "49ers", "pit": "Steelers",
+        "no": "Saints", "cin": "Bengals", "ne": "Patriots", "wsh": "Commanders", "ari": "Cardinals", 
+        "lar": "Rams", "tb": "Tampa Bay", "dal": "Dallas Cowboys", "ind": "Indianappolis Colts", 
+        "sea": "Seattle Seahawks"
+    }
+
+    for ix, row in df.iterrows():
+        values = row.to_list()[2:]
+        values = [value for value in values if value is not None]
+        values_len = len(values)
+        values_dict = {}
+        for value in values:
+            if value not in values_dict.keys():
+                values_dict[value] = 1
             else:
-                converted_key = top_key
-            pct = int(values_dict[top_key]/values_len*100)
-            message = f"{pct}% of experts chose {converted_key}"
-            df.loc[ix, "pct"] = pct
-            df.loc[ix, "message"] = message
-
-        df["game_id"] = df["Game"].apply(transform_game)
-        insert_expert_data(df)
-        return df[["game_id", "week", "Game", "Time", "pct", "message"]]
-    except Exception as e:
-        logger.exception(f"get espn data, {e}")
+                values_dict[value] += 1
+        #sorting
+        values_dict = dict(sorted(values_dict.items(), key=lambda item: item[1], reverse=True))
+        top_key = next(iter(values_dict))
+        if top_key in convert_dict:
+            converted_key = convert_dict[top_key]
+        else:
+            converted_key = top_key
+        pct = int(values_dict[top_key]/values_len*100)
+        message = f"{pct}% of experts chose {converted_key}"
+        df.loc[ix, "pct"] = pct
+        df.loc[ix, "message"] = message
+
+    df["game_id"] = df["Game"].apply(transform_game)
+    return df
 
 def insert_betting_expert_data(start_date, end_date):
     logger.info("STARTING data grab")
+    schema.ensure_schema()
     bovada_df = get_data(start_date, end_date)
-    matchup_df = generate_matchups(bovada_df)
+    with timing.timed('matchups.transform'):
+        matchup_df = generate_matchups(bovada_df)
     expert_df = get_espn_expert_data()
-    expert_df.sort_values("pct", ascending=False)
-    merged_df = pd.merge(matchup_df, expert_df, on="game_id")
-    merged_df.drop(columns=["time"], inplace=True)
-    merged_df["IngestTime"] = datetime.now().strftime("%m/%d %H:%M")
-    # merged_df = merged_df[["IngestTime", "week", "Game", "Time", "projected_winner", "ranking", "message"]]
-    merged_df["ranking"] = merged_df["ranking"]+1
-    insert_merge_data(merged_df)
+    with timing.timed('merged.transform'):
+        expert_df.sort_values("pct", ascending=False)
+        merged_df = pd.merge(matchup_df, expert_df, on="game_id")
+        merged_df.drop(columns=["time"], inplace=True)
+        ingested_at = datetime.now()
+        merged_df["IngestTime"] = ingested_at.strftime("%m/%d %H:%M")
+        # IngestTime has no year, the readers and the archive go by ingested_at
+        merged_df["ingested_at"] = ingested_at.strftime(schema.ISO_DATETIME)
+        # merged_df = merged_df[["IngestTime", "week", "Game", "Time", "projected_winner", "ranking", "message"]]
+        merged_df["ranking"] = merged_df["ranking"]+1
+    with timing.timed('merged.write'):
+        insert_merge_data(merged_df)
+    schema.bump_data_version()
     logger.info("COMPLETED data grab")
\ No newline at end of file
@@ -1,17 +1,35 @@
-import requests
 import sqlite3
 from datetime import datetime, timedelta
 import logging
 import json
-from bs4 import BeautifulSoup
 import pandas as pd
 import openai
 from dotenv import load_dotenv
 import os
+import utils.schema as schema
+import utils.fetch as fetch
+import utils.parsers as parsers
+import utils.timing as timing
+import utils.llm as llm
+import utils.relevance as relevance
+from utils.get_calls import sql_bound
 
 # Set your OpenAI API key
 load_dotenv()
-client = openai.OpenAI(api_key=os.getenv('API_KEY'))
+_client = None
+
+def get_client():
+    """the OpenAI client, created on first use so fixture replays run without an API key"""
+    global _client
+    if _client is None:
+        # retries and 429 backoff are handled by the shared LLMExecutor
+        _client = openai.OpenAI(api_key=os.getenv('API_KEY'), max_retries=0)
+    return _client
+
+def set_client(client):
+    """swaps in another client, e.g. a local stub exposing chat.completions.create"""
+    global _client
+    _client = client
 
 def setup_logger(name):
     """Set up a logger for a given module."""
@@ -31,107 +49,138 @@ def setup_logger(name):
 
 logger = setup_logger(__name__)
 
-def insert_news(df):
-    conn = sqlite3.connect('../data-log.db')
-    cursor = conn.cursor()
-
-    # Function to check if a row with the same title exists and if relevant is not None
-    def row_exists_and_relevant_not_none(title):
-        cursor.execute("SELECT relevant FROM espn_news WHERE title = ?", (title,))
-        row = cursor.fetchone()
-        return row is not None and row[0] is not None
+# check_relevance and score_article share one rate limit and worker pool
+llm_executor = llm.LLMExecutor()
+# and one response cache; bump a prompt version whenever its prompt changes
+llm_cache = llm.LLMCache()
+# headlines classified per check_relevance_batch request
+RELEVANCE_BATCH_SIZE = int(os.getenv('RELEVANCE_BATCH_SIZE', 25))
+MODEL = "gpt-4o"
+RELEVANCE_PROMPT = 'relevance:1'
+RELEVANCE_BATCH_PROMPT = 'relevance-batch:1'
+SCORE_PROMPT = 'score:2'
+
+NEWS_COLUMNS = ['title', 'date', 'link', 'image_url', 'relevant', 'ai_score',
+                'relevance_source', 'relevance_confidence']
+
+def _records(df, columns):
+    """rows of df[columns] as tuples of plain python values, NaN as None"""
+    values = df[columns].astype(object)
+    return list(values.where(values.notna(), None).itertuples(index=False, name=None))
 
-    for ix, row in df.iterrows():
-        if row_exists_and_relevant_not_none(row['title']):
-            # Update the row
-            cursor.execute('''
-            UPDATE espn_news
-            SET date = ?, link = ?, image_url = ?, relevant = ?, ai_score = ?
-            WHERE title = ?
-            ''', (row['date'], row['link'], row['image_url'], row['relevant'], row['ai_score'], row['title']))
-        else:
-            # Insert the row if it doesn't exist
-            cursor.execute('''
-            INSERT OR IGNORE INTO espn_news (title, date, link, image_url, relevant, ai_score)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ''', (row['title'], row['date'], row['link'], row['image_url'], row['relevant'], row['ai_score']))
-
-    # Commit the transaction
-    conn.commit()
-
-    # Close the connection
+def insert_news(df):
+    """upserts the scraped articles in one transaction, a re-scrape never clears relevant or ai_score"""
+    columns = [column for column in NEWS_COLUMNS if column in df.columns]
+    updates = ', '.join(
+        f"{column} = COALESCE(excluded.{column}, espn_news.{column})" if column in ('relevant', 'ai_score')
+        else f"{column} = excluded.{column}"
+        for column in columns if column != 'title')
+    conn = sqlite3.connect(schema.DB_PATH)
+    with conn:
+        conn.executemany(f'''
+        INSERT INTO espn_news ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})
+        ON CONFLICT(title) DO UPDATE SET {updates}
+        ''', _records(df, columns))
     conn.close()
 
-    logger.info("INSERTED NEWS TO espn_news")
+    logger.info(f"INSERTED {len(df)} NEWS TO espn_news")
 
 
-def get_espn_news():
-    # URL of the page to scrape
-    url = "https://www.nfl.com/news/all-news"
+NEWS_URL = "https://www.nfl.com/news/all-news"
+# how far a backfill follows the all-news pagination
+NEWS_MAX_PAGES = int(os.getenv('NEWS_MAX_PAGES', 20))
 
-    # Send a GET request to the URL
-    response = requests.get(url)
-
-    # Check if the request was successful
-    if response.status_code == 200:
-        # Parse the HTML content of the page
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # List to store the scraped data
-        scraped_data = []
-
-        # Function to extract article data
-        def extract_article_data(article):
-            # Extract the title
-            title = article.find('h3', class_='d3-o-media-object__title').get_text(strip=True)
-
-            # Extract the date
-            date = article.find('p', class_='d3-o-media-object__date').get_text(strip=True)
-
-            # Extract the link to the article
-            link = article['href']
-            full_link = f"https://www.nfl.com{link}"
-
-            # Extract the image URL
-            image_tag = article.find('picture').find('img')
-            image_url = image_tag['src'] if image_tag else None
-
-            # Append the extracted data to the list
-            scraped_data.append({
-                'title': title,
-                'date': date,
-                'link': full_link,
-                'image_url': image_url
-            })
+def get_validators(url):
+    """(etag, last_modified) from the last crawl of url"""
+    conn = sqlite3.connect(schema.DB_PATH)
+    row = conn.execute("SELECT etag, last_modified FROM http_validators WHERE url = ?", (url,)).fetchone()
+    conn.close()
+    return row if row is not None else (None, None)
+
+def save_validators(validators):
+    """stores {url: (etag, last_modified)} for the next conditional GET"""
+    now = datetime.now().strftime(schema.ISO_DATETIME)
+    conn = sqlite3.connect(schema.DB_PATH)
+    with conn:
+        conn.executemany('''
+        INSERT OR REPLACE INTO http_validators (url, etag, last_modified, checked_at)
+        VALUES (?, ?, ?, ?)
+        ''', [(url, etag, last_modified, now) for url, (etag, last_modified) in validators.items()])
+    conn.close()
 
-        # Find all vertical article containers
-        vertical_articles = soup.find_all('div', class_='d3-o-media-object--vertical')
-        for article in vertical_articles:
-            extract_article_data(article.find('a'))
+def known_titles(titles):
+    """the subset of titles already in espn_news"""
+    conn = sqlite3.connect(schema.DB_PATH)
+    rows = conn.execute("SELECT title FROM espn_news WHERE title IN (SELECT value FROM json_each(?))",
+                        (json.dumps(list(titles)),)).fetchall()
+    conn.close()
+    return {row[0] for row in rows}
+
+def crawl_news(max_pages=NEWS_MAX_PAGES, backfill=False):
+    """
+    articles not yet in espn_news, newest first. Follows the all-news pagination
+    and stops at a page that is unchanged (304) or holds no new titles; a backfill
+    skips both checks and reads max_pages pages
+    """
+    session = fetch.make_session(1)
+    frames, validators, seen = [], {}, set()
+    url = NEWS_URL
+    with session:
+        for page in range(1, max_pages + 1):
+            etag, last_modified = (None, None) if backfill else get_validators(url)
+            status, html, etag, last_modified = fetch.fetch_conditional(url, etag, last_modified, session=session)
+            if status == 304:
+                logger.info(f"NEWS page {page} not modified, stopping")
+                break
+            if html is None:
+                break
+            validators[url] = (etag, last_modified)
+            with timing.timed('news.parse'):
+                df, next_url = parse_news_page(html)
+            new = df[~df['title'].isin(seen | known_titles(df['title']))]
+            seen.update(df['title'])
+            frames.append(new)
+            if new.empty and not backfill:
+                logger.info(f"NEWS page {page} has no new titles, stopping")
+                break
+            if next_url is None:
+                break
+            url = next_url
+    logger.info(f"CRAWLED {len(validators)} news pages, {sum(len(df) for df in frames)} new articles")
+    news = pd.concat(frames, ignore_index=True) if frames else parse_news('')
+    return news, validators
+
+def get_espn_news(max_pages=NEWS_MAX_PAGES, backfill=False):
+    df, validators = crawl_news(max_pages, backfill)
+    with timing.timed('news.write'):
+        insert_news(df)
+        # only after the articles are stored, so a failed write is retried on the next crawl
+        save_validators(validators)
+    return df
 
-        # Find all horizontal article containers
-        horizontal_articles = soup.find_all('a', class_='d3-o-media-object--horizontal')
-        for article in horizontal_articles:
-            extract_article_data(article)
+def parse_news_page(html):
+    """(articles on one all-news page as a frame, url of the next page or None)"""
+    articles, next_url = parsers.parse_news_page(html)
+    df = pd.DataFrame(articles, columns=['title', 'date', 'link', 'image_url'])
+    df['date'] = df['date'].apply(schema.iso_date)
+    df['relevant'] = None
+    df['ai_score'] = None
+    return df, next_url
 
-        df = pd.DataFrame(scraped_data)
-        df['relevant'] = None
-        df['ai_score'] = None
-        insert_news(df)
-        return df
-    else:
-        print(f"Failed to retrieve the page. Status code: {response.status_code}")
+def parse_news(html):
+    """reads title, date, link and image of every article on the all-news page"""
+    return parse_news_page(html)[0]
 
 def get_unclassified(start_date, end_date):
     # Connect to SQLite database
-    conn = sqlite3.connect('../data-log.db')
+    conn = sqlite3.connect(schema.DB_PATH)
     cursor = conn.cursor()
 
     # Execute the query to get articles within the date range where relevant is None
     cursor.execute('''
-    SELECT * FROM espn_news
-    WHERE relevant IS NULL
-    ''')
+    SELECT title, date, link, image_url, relevant, ai_score FROM espn_news
+    WHERE relevant IS NULL AND date BETWEEN ? AND ?
+    ''', (sql_bound(start_date, schema.ISO_DATE), sql_bound(end_date, schema.ISO_DATE)))
     # 1
     # Fetch all results
     articles = cursor.fetchall()
@@ -141,84 +190,185 @@ def get_unclassified(start_date, end_date):
 
     columns = ['title', 'date', 'link', 'image_url', 'relevant', 'ai_score']
     df = pd.DataFrame(articles, columns=columns)
-    #filter on_days
-    df['date'] = df['date'].apply(lambda x: pd.to_datetime(x))
-    df = df[(df['date']>=start_date) & (df['date']<=end_date)]
+    df['date'] = pd.to_datetime(df['date'])
     return df
 
-def update_column(row_name, df):
-    # Connect to SQLite database
-    conn = sqlite3.connect('../data-log.db')
-    cursor = conn.cursor()
-
-    for ix, row in df.iterrows():
-        cursor.execute(f'''
+def update_columns(columns, df):
+    """writes df[columns] to the espn_news rows with matching titles in one transaction"""
+    unknown = set(columns) - set(NEWS_COLUMNS)
+    if unknown:
+        raise ValueError(f"not espn_news columns: {sorted(unknown)}")
+    conn = sqlite3.connect(schema.DB_PATH)
+    with conn:
+        conn.executemany(f'''
             UPDATE espn_news
-            SET {row_name} = ?
+            SET {', '.join(f"{column} = ?" for column in columns)}
             WHERE title = ?
-            ''', (row[row_name], row['title']))
-        
-    # Commit the transaction
-    conn.commit()
+            ''', _records(df, list(columns) + ['title']))
+    conn.close()
+    logger.info(f"UPDATED {', '.join(columns)} in espn_news")
 
-    # Close the connection
+def update_column(row_name, df):
+    """update_columns for a single column"""
+    update_columns([row_name], df)
+
+def insert_team_scores(df):
+    """replaces the article_team_scores rows of the scored titles with their parsed ai_score"""
+    rows = [(title, team, rating)
+            for title, ai_score in zip(df['title'], df['ai_score'])
+            for team, rating in parsers.parse_ai_score(ai_score) if team in relevance.TEAMS]
+    conn = sqlite3.connect(schema.DB_PATH)
+    with conn:
+        conn.executemany("DELETE FROM article_team_scores WHERE title = ?", [(title,) for title in df['title']])
+        conn.executemany("INSERT OR REPLACE INTO article_team_scores (title, team, rating) VALUES (?, ?, ?)", rows)
     conn.close()
-    logger.info(f"UPDATED {row_name} in espn_news")
+    logger.info(f"INSERTED {len(rows)} team scores for {len(df)} articles to article_team_scores")
 
 def extract_article_text(article_url):
-    article_response = requests.get(article_url)
-    if article_response.status_code == 200:
-        article_soup = BeautifulSoup(article_response.content, 'html.parser')
-        article_body = article_soup.find('div', class_='nfl-c-article__body')
-        if article_body:
-            paragraphs = article_body.find_all('p')
-            article_text = "\n".join([p.get_text(strip=True) for p in paragraphs])
-            return article_text
+    html = fetch.fetch_page(article_url)
+    if html is not None:
+        return parsers.parse_article_text(html)
     return None
 
+def extract_article_texts(links):
+    """extract_article_text for every link, fetched concurrently, in input order"""
+    return [parsers.parse_article_text(html) if html is not None else None
+            for html in fetch.fetch_pages(list(links))]
+
+def complete(request):
+    """returns the content of a chat completion, recorded and replayed by the fetch layer"""
+    return fetch.replay_call(
+        'openai', request,
+        lambda: _create(request)
+    )
+
+def _create(request):
+    llm_executor.throttle()
+    return get_client().chat.completions.create(**request).choices[0].message.content
+
 def check_relevance(title):
 
-    completion = client.chat.completions.create(
-    model="gpt-4o",
+    return llm_cache.get_or_compute(RELEVANCE_PROMPT, MODEL, title, lambda: complete(dict(
+    model=MODEL,
     messages=[
         {"role": "system", "content": "Reply True or False to whether the following news title is relevant to the odds of a team winning or losing'"},
         {"role": "user", "content": f"{title}"}
     ]
-    )
-
-    return completion.choices[0].message.content
+    )))
+
+class MalformedBatch(ValueError):
+    pass
+
+def _parse_relevance_batch(content, count):
+    """[True/False per title] from {"results": [{"id": i, "relevant": bool}]}, MalformedBatch otherwise"""
+    try:
+        results = json.loads(content)['results']
+        answers = {int(item['id']): item['relevant'] for item in results}
+    except (TypeError, ValueError, KeyError) as e:
+        raise MalformedBatch(f"unreadable batch response: {e}")
+    if sorted(answers) != list(range(count)) or not all(isinstance(a, bool) for a in answers.values()):
+        raise MalformedBatch(f"batch response doesn't answer ids 0-{count - 1} with booleans")
+    return [answers[i] for i in range(count)]
+
+def _classify_batch(titles):
+    if len(titles) == 1:
+        return [check_relevance(titles[0])]
+    numbered = "\n".join(f"{i}. {title}" for i, title in enumerate(titles))
+    content = complete(dict(
+    model=MODEL,
+    messages=[
+        {"role": "system", "content": "For each numbered news title, decide whether it is relevant to the odds of a team winning or losing"},
+        {"role": "system", "content": 'always reply in the following json format: {"results": [{"id": 0, "relevant": true}, {"id": 1, "relevant": false}]} with one entry per title'},
+        {"role": "user", "content": numbered}
+    ],
+     response_format={ "type": "json_object" }
+    ))
+    try:
+        return [str(answer) for answer in _parse_relevance_batch(content, len(titles))]
+    except MalformedBatch as e:
+        # split and retry the halves, a bad batch shrinks down to single-title calls
+        logger.warning(f"{e}, retrying {len(titles)} titles as two batches")
+        middle = len(titles) // 2
+        return _classify_batch(titles[:middle]) + _classify_batch(titles[middle:])
+
+def check_relevance_batch(titles):
+    """check_relevance for many titles in one request, 'True'/'False' per title in input order"""
+    titles = list(titles)
+    keys = [llm.cache_key(RELEVANCE_BATCH_PROMPT, MODEL, title) for title in titles]
+    answers = [llm_cache.get(key) for key in keys]
+    missing = [i for i, answer in enumerate(answers) if answer is None]
+    if missing:
+        for i, answer in zip(missing, _classify_batch([titles[i] for i in missing])):
+            answers[i] = answer
+            if answer is not None:
+                llm_cache.put(keys[i], answer)
+    return answers
+
+def classify_relevance(titles):
+    """
+    'True'/'False' per title plus who decided it and how sure it was; the local
+    pre-filter settles the clear cases and only ambiguous titles go to the API
+    """
+    titles = list(titles)
+    decided, ambiguous = relevance.split(titles)
+    answers = [None] * len(titles)
+    sources = [None] * len(titles)
+    confidences = [None] * len(titles)
+    for i, (answer, confidence) in decided.items():
+        answers[i], sources[i], confidences[i] = answer, 'prefilter', confidence
+
+    batches = [ambiguous[i:i + RELEVANCE_BATCH_SIZE] for i in range(0, len(ambiguous), RELEVANCE_BATCH_SIZE)]
+    results = llm_executor.map(check_relevance_batch, [[titles[i] for i in batch] for batch in batches])
+    for batch, result in zip(batches, results):
+        # a batch that failed outright leaves its titles unclassified for the next run
+        for i, answer in zip(batch, result or [None] * len(batch)):
+            if answer is not None:
+                answers[i], sources[i] = answer, 'llm'
+    logger.info(f"PREFILTERED {len(decided)} of {len(titles)} titles, {len(ambiguous)} sent to the API")
+    return answers, sources, confidences
 
 def score_article(text):
 
-    completion = client.chat.completions.create(
-    model="gpt-4o",
+    return llm_cache.get_or_compute(SCORE_PROMPT, MODEL, text, lambda: complete(dict(
+    model=MODEL,
     messages=[
         {"role": "system", "content": "You are an assistant that reads article texts about sports teams. Your task is to identify the team name mentioned in the article and provide a rating on how the information in the article will affect that team's upcoming game. The rating should be on a scale from 5 to -5, where 5 indicates the team is sure to win and -5 indicates the team is sure to lose."},
         {"role": "system", "content": "Example return: [{'Tampa Bay Buccaneers': 3}]"},
         {"role": "system", "content": "always return json with a list of teams and impacts"},
         {"role": "system", "content": "always reply in the following format: [{'Team': Score}]"},
         {"role": "system", "content": "If data is missing or not relevant return [{'None': Score}]"},
-        {"role": "system", "content": "dictionary values should be the rating score, keys should be in the following list Baltimore Ravens, Buffalo Bills, Chicago Bears, Cincinnati Bengals, Dallas Cowboys, Denver Broncos, Detroit Lions, Green Bay Packers, Houston Texans, Indianapolis Colts, Jacksonville Jaguars, Kansas City Chiefs, Los Angeles Chargers, Miami Dolphins, Minnesota Vikings, New Orleans Saints, New York Giants, New York Jets, Philadelphia Eagles, San Francisco 49ers, Seattle Seahawks, Tampa Bay Buccaneers, Washington Commanders"},
+        {"role": "system", "content": f"dictionary values should be the rating score, keys should be in the following list {', '.join(relevance.TEAMS)}"},
         {"role": "user", "content": f"{text}"}
     ],
      response_format={ "type": "json_object" }
-    )
+    )))
 
-    return completion.choices[0].message.content
 
 
-
-def insert_espn_news(start_date, end_date):
+def insert_espn_news(start_date, end_date, backfill_pages=None):
     logger.info("Starting espn_news updates")
-    get_espn_news()
+    llm_cache.reset_stats()
+    if backfill_pages:
+        get_espn_news(max_pages=backfill_pages, backfill=True)
+    else:
+        get_espn_news()
     df = get_unclassified(start_date, end_date)
-    df["relevant"] = df["title"].apply(check_relevance)
+    with timing.timed('news.relevance'):
+        df["relevant"], df["relevance_source"], df["relevance_confidence"] = classify_relevance(df["title"])
     logger.info(f"RAN check_relevance on {len(df)} rows")
-    update_column('relevant', df)
+    with timing.timed('news.write'):
+        update_columns(['relevant', 'relevance_source', 'relevance_confidence'], df)
     #update_rows(df)
     df = df[df['relevant']=='True']
-    df['article_text'] = df['link'].apply(extract_article_text)
-    df['ai_score'] = df['article_text'].apply(score_article)
+    with timing.timed('news.articles'):
+        df['article_text'] = extract_article_texts(df['link'])
+    with timing.timed('news.score'):
+        df['ai_score'] = llm_executor.map(score_article, df['article_text'])
     logger.info(f"RAN score_article on {len(df)} rows")
-    update_column('ai_score', df)
+    with timing.timed('news.write'):
+        update_column('ai_score', df)
+        insert_team_scores(df)
+    llm_cache.evict()
+    logger.info(f"LLM cache {llm_cache.stats()}")
+    schema.bump_data_version()
     logger.info("Completed espn_news updates")
\ No newline at end of file
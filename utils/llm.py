@@ -0,0 +1,203 @@
+"""
+Runs chat completion calls concurrently under a shared rate limit.
+
+check_relevance and score_article both go through one LLMExecutor, so the
+requests-per-minute budget (LLM_RPM) and the concurrency (LLM_CONCURRENCY)
+hold across the whole ingest run.
+
+LLMCache keeps every response in the llm_cache table under a hash of the
+prompt version, model and input text, so re-runs and backfills only pay for
+text that hasn't been seen with the current prompt.
+"""
+import hashlib
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import openai
+
+import utils.schema as schema
+
+LLM_CONCURRENCY = int(os.getenv('LLM_CONCURRENCY', 8))
+LLM_RPM = float(os.getenv('LLM_RPM', 300))  # requests per minute
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 5))
+LLM_CACHE_MAX_ROWS = int(os.getenv('LLM_CACHE_MAX_ROWS', 50000))
+
+def setup_logger(name):
+    """Set up a logger for a given module."""
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+
+    # Create file handler which logs even debug messages
+    fh = logging.FileHandler('app.log')
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] - %(message)s')
+    fh.setFormatter(formatter)
+
+    # Add the handler to the logger
+    if not logger.handlers:
+        logger.addHandler(fh)
+
+    return logger
+
+logger = setup_logger(__name__)
+
+class TokenBucket:
+    """allows `rate` acquisitions per second on average, with bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """blocks until a token is available, then takes it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+def _is_rate_limit(error):
+    return isinstance(error, openai.RateLimitError) or getattr(error, 'status_code', None) == 429
+
+def _is_transient(error):
+    return _is_rate_limit(error) or isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)) \
+        or (getattr(error, 'status_code', None) or 0) >= 500
+
+def _retry_after(error):
+    """seconds the server asked us to wait, if it said"""
+    response = getattr(error, 'response', None)
+    try:
+        return float(response.headers['retry-after'])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+class LLMExecutor:
+    """maps a completion function over inputs concurrently, rate limited, keeping input order"""
+
+    def __init__(self, max_workers=LLM_CONCURRENCY, requests_per_minute=LLM_RPM,
+                 max_retries=LLM_MAX_RETRIES, base_delay=1.0):
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(requests_per_minute / 60, capacity=max_workers)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+
+    def throttle(self):
+        """call right before each API request, cache hits don't count against the rate limit"""
+        self.bucket.acquire()
+
+    def call(self, fn, item):
+        """fn(item) with 429-aware exponential backoff, None once retries run out"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return fn(item)
+            except Exception as e:
+                if not _is_transient(e) or attempt == self.max_retries:
+                    logger.exception(f"LLM call {fn.__name__} failed after {attempt + 1} attempts, {e}")
+                    return None
+                delay = _retry_after(e) or self.base_delay * 2 ** attempt * (1 + random.random())
+                logger.warning(f"LLM call {fn.__name__} {'rate limited' if _is_rate_limit(e) else 'failed'}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def map(self, fn, items):
+        """[fn(item) for item in items], run concurrently; failed calls come back as None"""
+        items = list(items)
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            return list(pool.map(lambda item: self.call(fn, item), items))
+
+def cache_key(prompt_version, model, text):
+    """sha256 of everything that determines the response"""
+    return hashlib.sha256(f"{prompt_version}\x1f{model}\x1f{text}".encode('utf-8')).hexdigest()
+
+class LLMCache:
+    """persistent response cache in the llm_cache table, least recently used rows evicted past max_rows"""
+
+    def __init__(self, db_path=None, max_rows=LLM_CACHE_MAX_ROWS):
+        self.db_path = db_path
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path or schema.DB_PATH, timeout=30)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        """the cached response for key or None, marks it as used"""
+        now = datetime.now().strftime(schema.ISO_DATETIME)
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+        finally:
+            conn.close()
+        self._count(row is not None)
+        return row[0] if row is not None else None
+
+    def put(self, key, response):
+        now = datetime.now().strftime(schema.ISO_DATETIME)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO llm_cache (key, response, last_used) VALUES (?, ?, ?)",
+                             (key, response, now))
+        finally:
+            conn.close()
+
+    def get_or_compute(self, prompt_version, model, text, compute):
+        """the cached response for this prompt, model and text, computing and storing it on a miss"""
+        key = cache_key(prompt_version, model, text)
+        response = self.get(key)
+        if response is None:
+            response = compute()
+            if response is not None:
+                self.put(key, response)
+        return response
+
+    def evict(self):
+        """drops the least recently used rows beyond max_rows, returns how many went"""
+        conn = self._connect()
+        try:
+            with conn:
+                deleted = conn.execute("""
+                    DELETE FROM llm_cache WHERE key IN (
+                        SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                    )""", (self.max_rows,)).rowcount
+        finally:
+            conn.close()
+        if deleted:
+            logger.info(f"EVICTED {deleted} rows from llm_cache")
+        return deleted
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {'hits': hits, 'misses': misses, 'hit_rate': round(hits / total, 3) if total else None}
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
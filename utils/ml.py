@@ -1,96 +1,161 @@
+"""
+Scores each game of a week from the Bovada odds, the expert consensus and
+the AI news sentiment, and picks a winner.
+
+Every step is a column operation. A team's score is its row of score_terms
+times the weight vector, so any weights can be tried without rebuilding
+the features.
+
+picks = score_week(start, end)                      # DEFAULT_WEIGHTS
+picks = score_week(start, end, weights={**DEFAULT_WEIGHTS, 'expert_opinion': 0.5})
+"""
+import json
+import logging
 import sqlite3
-import pandas as pd
-import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-
-from get_calls import *
-
-
-def get_all_merged_data():
-    """gets the bovada betting data and espn expert data"""
-    with sqlite3.connect('data-log.db') as conn:
-        cursor = conn.cursor()
+from datetime import datetime
 
-        # Fetch the corresponding game data from the database by game_id
-        cursor.execute("""
-                    SELECT * FROM merged_data 
-                    """)
-    columns = ['game_id', 'Matchup', 'Projected Winner', 'Ranking', 'alt_game_id',
-            'Week', 'Game', 'Time', 'pct', 'message', 'IngestTime']
-    merged_df = pd.DataFrame(cursor.fetchall(), columns=columns)
-    merged_df.drop(columns=['game_id','alt_game_id', 'Game', 'pct'], inplace=True)
-    return merged_df
-
-
-start, end = get_start_end()
-bovada_data = get_bovada_data(start, end)
-news_data, team_rating = get_transformed_news_data(start, end)
-expert_data = get_expert_data(start, end)
-merged_data = get_all_merged_data()
-
-bovada_data = bovada_data.sort_values('bets', ascending=False).drop_duplicates(subset='game_id', keep='first')
-# Step 1: Merge team_rating with bovada_data on the home_team column
-bovada_data = bovada_data.merge(team_rating, left_on='home_team', right_on='Team', how='left')
-bovada_data = bovada_data.rename(columns={'AI News Sentiment Score': 'Home AI News Sentiment'})
-bovada_data = bovada_data.drop(columns=['Team'])
+import numpy as np
+import pandas as pd
 
-# Step 2: Merge team_rating with bovada_data on the away_team column
-bovada_data = bovada_data.merge(team_rating, left_on='away_team', right_on='Team', how='left')
-bovada_data = bovada_data.rename(columns={'AI News Sentiment Score': 'Away AI News Sentiment'})
-bovada_data = bovada_data.drop(columns=['Team'])
-bovada_data['Matchup'] = bovada_data.apply(lambda x: x['home_team'] + ' vs ' + x['away_team'], axis=1)
+import utils.get_calls as get_calls
+import utils.schema as schema
 
-data = pd.merge(bovada_data, merged_data, on='Matchup', how='left')
-data = data.drop(columns=['points', 'Ranking', 'Time', 'IngestTime', 'game_id', 'Matchup', 'Projected Winner', 'Week']).drop_duplicates(subset='home_team')
+def setup_logger(name):
+    """Set up a logger for a given module."""
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
 
-# Normalize the data
-scaler = MinMaxScaler()
+    # Create file handler which logs even debug messages
+    fh = logging.FileHandler('app.log')
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] - %(message)s')
+    fh.setFormatter(formatter)
 
-# Normalize win_diff, home_win, away_win, Home AI News Sentiment, Away AI News Sentiment
-data[['win_diff', 'home_win', 'away_win']] = scaler.fit_transform(data[['win_diff', 'home_win', 'away_win']].fillna(0))
+    # Add the handler to the logger
+    if not logger.handlers:
+        logger.addHandler(fh)
 
-# Fill NaN values in AI News Sentiment with 0 and normalize
-data[['Home AI News Sentiment', 'Away AI News Sentiment']] = scaler.fit_transform(data[['Home AI News Sentiment', 'Away AI News Sentiment']].fillna(0))
+    return logger
 
-# Extract expert opinions percentage from message
-data['expert_opinion'] = data['message'].str.extract(r'(\d+)%').astype(float) / 100
+logger = setup_logger(__name__)
 
-# Normalize expert_opinion
-data['expert_opinion'] = scaler.fit_transform(data[['expert_opinion']])
+WEIGHT_NAMES = ['win_diff', 'home_win', 'away_win', 'home_sentiment', 'away_sentiment', 'expert_opinion']
 
-# Define weights for each factor
-weights = {
+DEFAULT_WEIGHTS = {
     'win_diff': 0.4,
     'home_win': 0.2,
     'away_win': 0.2,
-    'Home AI News Sentiment': 0.1,
-    'Away AI News Sentiment': 0.1,
-    'expert_opinion': 0.3
+    'home_sentiment': 0.1,
+    'away_sentiment': 0.1,
+    'expert_opinion': 0.3,
 }
 
-# Calculate scores for home and away teams
-data['home_score'] = (
-    data['win_diff'] * weights['win_diff'] +
-    (1 - data['home_win']) * weights['home_win'] +  # Invert home_win because more negative is better
-    data['Home AI News Sentiment'] * weights['Home AI News Sentiment'] +
-    data['expert_opinion'] * weights['expert_opinion']
-)
-
-data['away_score'] = (
-    data['win_diff'] * weights['win_diff'] +
-    (1 - data['away_win']) * weights['away_win'] +  # Invert away_win because more negative is better
-    data['Away AI News Sentiment'] * weights['Away AI News Sentiment'] +
-    (1 - data['expert_opinion']) * weights['expert_opinion']
-)
-
-# Calculate confidence score
-data['confidence_score'] = data['home_score'] - data['away_score']
-
-data['ranking'] = data['confidence_score'].apply(abs)
-def get_pick(row):
-    if row['confidence_score']>0:
-        return row['home_team']
-    else:
-        return row['away_team']
-data['pick'] = data.apply(get_pick, axis=1)
-data.sort_values('ranking', ascending=False)#.drop(columns=['bets', ''])
\ No newline at end of file
+PICK_COLUMNS = ['game_id', 'date', 'home_team', 'away_team', 'home_score', 'away_score',
+                'confidence', 'ranking', 'pick']
+
+def minmax(frame):
+    """scales each column to [0, 1], constant columns become 0 and NaN stays NaN"""
+    frame = frame.astype(float)
+    low = frame.min()
+    span = frame.max() - low
+    return (frame - low) / span.mask(span == 0, 1)
+
+def game_features(bovada, team_rating, merged):
+    """
+    one row per game with its raw features: the moneylines, win differential,
+    both teams' news sentiment and the share of experts behind the consensus pick
+    """
+    # the most bet on line for each game
+    games = bovada.sort_values('bets', ascending=False).drop_duplicates(subset='game_id')
+    sentiment = team_rating.set_index('Team')['AI News Sentiment Score']
+    matchup = games['home_team'] + ' vs ' + games['away_team']
+    messages = merged.drop_duplicates(subset='Matchup').set_index('Matchup')['message']
+    games = games.assign(
+        home_sentiment=games['home_team'].map(sentiment),
+        away_sentiment=games['away_team'].map(sentiment),
+        expert_opinion=matchup.map(messages).str.extract(r'(\d+)%', expand=False).astype(float) / 100,
+    )
+    return games.drop_duplicates(subset='home_team').reset_index(drop=True)
+
+def normalize(features):
+    """min-max scales the features across the week's games"""
+    scaled = features.copy()
+    odds = ['win_diff', 'home_win', 'away_win']
+    scaled[odds] = minmax(features[odds].fillna(0))
+    news = ['home_sentiment', 'away_sentiment']
+    scaled[news] = minmax(features[news].fillna(0))
+    # no consensus counts as a split vote, it adds the same to both sides
+    scaled['expert_opinion'] = minmax(features[['expert_opinion']])['expert_opinion'].fillna(0.5)
+    return scaled
+
+def score_terms(scaled):
+    """
+    (home, away) arrays of shape (games, len(WEIGHT_NAMES)), the home and away
+    scores are these times the weight vector
+    """
+    zero = np.zeros(len(scaled))
+    win_diff = scaled['win_diff'].to_numpy(float)
+    expert = scaled['expert_opinion'].to_numpy(float)
+    # moneylines are inverted, the more negative the line the stronger the favorite
+    home = np.column_stack([win_diff, 1 - scaled['home_win'].to_numpy(float), zero,
+                            scaled['home_sentiment'].to_numpy(float), zero, expert])
+    away = np.column_stack([win_diff, zero, 1 - scaled['away_win'].to_numpy(float),
+                            zero, scaled['away_sentiment'].to_numpy(float), 1 - expert])
+    return home, away
+
+def weight_vector(weights):
+    """weights dict as an array in WEIGHT_NAMES order, missing names weigh 0"""
+    return np.array([weights.get(name, 0.0) for name in WEIGHT_NAMES], dtype=float)
+
+def score(features, weights=DEFAULT_WEIGHTS):
+    """scores and picks for the games in features, most confident first"""
+    scaled = normalize(features)
+    home, away = score_terms(scaled)
+    w = weight_vector(weights)
+    picks = scaled[['game_id', 'date', 'home_team', 'away_team']].copy()
+    picks['home_score'] = home @ w
+    picks['away_score'] = away @ w
+    picks['confidence'] = picks['home_score'] - picks['away_score']
+    picks['ranking'] = picks['confidence'].abs()
+    picks['pick'] = np.where(picks['confidence'] > 0, picks['home_team'], picks['away_team'])
+    return picks.sort_values('ranking', ascending=False, ignore_index=True)[PICK_COLUMNS]
+
+def score_week(start, end, weights=DEFAULT_WEIGHTS):
+    """picks for the games between start and end, most confident first"""
+    bovada = get_calls.get_bovada_data(start, end)
+    if bovada.empty:
+        return pd.DataFrame(columns=PICK_COLUMNS)
+    news, team_rating = get_calls.get_transformed_news_data(start, end)
+    merged = get_calls.get_merged_data()
+    return score(game_features(bovada, team_rating, merged), weights)
+
+def store_picks(picks, weights=DEFAULT_WEIGHTS):
+    """upserts picks into the picks table, one row per game_id, returns the row count"""
+    if picks.empty:
+        return 0
+    rows = picks.assign(
+        date=pd.to_datetime(picks['date']).dt.strftime(schema.ISO_DATE),
+        weights=json.dumps(weights, sort_keys=True),
+        scored_at=datetime.now().strftime(schema.ISO_DATETIME),
+    )[['game_id', 'date', 'home_team', 'away_team', 'home_score', 'away_score',
+       'confidence', 'pick', 'weights', 'scored_at']]
+    with sqlite3.connect(schema.DB_PATH) as conn:
+        conn.executemany("""
+            INSERT INTO picks (game_id, date, home_team, away_team, home_score, away_score,
+                               confidence, pick, weights, scored_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(game_id) DO UPDATE SET
+                date = excluded.date, home_team = excluded.home_team, away_team = excluded.away_team,
+                home_score = excluded.home_score, away_score = excluded.away_score,
+                confidence = excluded.confidence, pick = excluded.pick,
+                weights = excluded.weights, scored_at = excluded.scored_at
+            """, rows.astype(object).where(rows.notna(), None).values.tolist())
+    conn.close()
+    logger.info(f"Stored {len(rows)} picks")
+    return len(rows)
+
+def update_picks(start, end, weights=DEFAULT_WEIGHTS):
+    """scores the week and stores the picks, the ingest job runs this after the scrapers"""
+    count = store_picks(score_week(start, end, weights), weights)
+    if count:
+        schema.bump_data_version()
+    return count
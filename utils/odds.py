@@ -0,0 +1,129 @@
+"""
+Odds snapshots kept as a time series per game.
+
+bovada_data keeps the rows a scrape appends, and its readers keep only the
+most bet line. odds_history keeps every captured line, one integer row per
+(game_key, ts). It is clustered on that key, so one game's movement is a
+single range read. A week or season goes through the games index first.
+
+record_snapshot(bovada_df)            # after each Bovada scrape
+line_movement('a1b2...')              # one game
+week_movement(2024, 7)                # every game of a week
+season_movement(2024)
+"""
+import json
+import logging
+import sqlite3
+import time
+
+import pandas as pd
+
+import utils.get_calls as get_calls
+import utils.schema as schema
+
+def setup_logger(name):
+    """Set up a logger for a given module."""
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+
+    # Create file handler which logs even debug messages
+    fh = logging.FileHandler('app.log')
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] - %(message)s')
+    fh.setFormatter(formatter)
+
+    # Add the handler to the logger
+    if not logger.handlers:
+        logger.addHandler(fh)
+
+    return logger
+
+logger = setup_logger(__name__)
+
+MOVEMENT_COLUMNS = ['game_id', 'date', 'home_team', 'away_team', 'ts', 'home_odds', 'away_odds', 'bets']
+
+# the games matching a where clause on g, and their snapshots as plain integers. The game
+# columns are added per row in Python rather than read from SQLite for every snapshot
+GAMES_SQL = "SELECT g.game_key, g.game_id, g.date, g.home_team, g.away_team FROM games g"
+SNAPSHOTS_SQL = '''
+    SELECT o.game_key, o.ts, o.home_odds, o.away_odds, o.bets
+    FROM games g
+    JOIN odds_history o ON o.game_key = g.game_key
+    '''
+
+def _int(value):
+    return None if pd.isna(value) else int(value)
+
+def game_keys(conn, games):
+    """
+    {game_id: game_key} for the rows of games (game_id, date, home_team, away_team),
+    adding the ones not seen before
+    """
+    games = games.drop_duplicates(subset='game_id')
+    conn.executemany("""
+        INSERT OR IGNORE INTO games (game_id, date, season, week, home_team, away_team)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """, [(game_id, date, *get_calls.nfl_season_week(date), home, away)
+              for game_id, date, home, away in games[['game_id', 'date', 'home_team', 'away_team']].itertuples(index=False)])
+    return dict(conn.execute("SELECT game_id, game_key FROM games WHERE game_id IN (SELECT value FROM json_each(?))",
+                             (json.dumps(games['game_id'].tolist()),)).fetchall())
+
+def record_snapshot(bovada_df, captured_at=None):
+    """
+    appends the current lines of bovada_df (as transform_bovada returns it) to odds_history,
+    skipping games whose odds and bets haven't moved since their last snapshot.
+    returns (recorded, unchanged)
+    """
+    if bovada_df.empty:
+        return 0, 0
+    ts = int(captured_at if captured_at is not None else time.time())
+    # the most bet line per game, the same one the readers use
+    current = bovada_df.dropna(subset=['game_id']).sort_values('bets', ascending=False).drop_duplicates(subset='game_id')
+    with sqlite3.connect(schema.DB_PATH) as conn:
+        keys = game_keys(conn, current)
+        latest = {row[0]: row[1:] for row in conn.execute("""
+            SELECT o.game_key, o.home_odds, o.away_odds, o.bets FROM odds_history o
+            WHERE o.game_key IN (SELECT value FROM json_each(?))
+              AND o.ts = (SELECT MAX(ts) FROM odds_history WHERE game_key = o.game_key)
+            """, (json.dumps(list(keys.values())),))}
+        rows = []
+        for game_id, home_odds, away_odds, bets in current[['game_id', 'home_win', 'away_win', 'bets']].itertuples(index=False):
+            line = (_int(home_odds), _int(away_odds), _int(bets))
+            if latest.get(keys[game_id]) != line:
+                rows.append((keys[game_id], ts, *line))
+        conn.executemany("""
+            INSERT OR REPLACE INTO odds_history (game_key, ts, home_odds, away_odds, bets)
+            VALUES (?, ?, ?, ?, ?)
+            """, rows)
+    conn.close()
+    logger.info(f"Recorded odds history ({len(rows)} recorded, {len(current) - len(rows)} unchanged)")
+    return len(rows), len(current) - len(rows)
+
+def _movement(where, params, since=None, until=None):
+    """odds snapshots for the games matching where, oldest first within each game"""
+    sql, snapshot_params = SNAPSHOTS_SQL + where, params
+    if since is not None:
+        sql += " AND o.ts >= ?"
+        snapshot_params += (int(pd.Timestamp(since).timestamp()),)
+    if until is not None:
+        sql += " AND o.ts <= ?"
+        snapshot_params += (int(pd.Timestamp(until).timestamp()),)
+    with sqlite3.connect(schema.DB_PATH) as conn:
+        games = {row[0]: row[1:] for row in conn.execute(GAMES_SQL + where, params)}
+        snapshots = conn.execute(sql + " ORDER BY g.game_key, o.ts", snapshot_params).fetchall()
+    conn.close()
+    df = pd.DataFrame([games[row[0]] + row[1:] for row in snapshots], columns=MOVEMENT_COLUMNS)
+    # ts is stored as epoch seconds, returned as UTC timestamps
+    df['ts'] = pd.to_datetime(df['ts'], unit='s')
+    return df
+
+def line_movement(game_id, since=None, until=None):
+    """every stored line for one game"""
+    return _movement(" WHERE g.game_id = ?", (game_id,), since, until)
+
+def week_movement(season, week, since=None, until=None):
+    """every stored line for the games of one NFL week, see get_calls.nfl_season_week"""
+    return _movement(" WHERE g.season = ? AND g.week = ?", (season, week), since, until)
+
+def season_movement(season, since=None, until=None):
+    """every stored line for the games of one season"""
+    return _movement(" WHERE g.season = ?", (season,), since, until)
@@ -0,0 +1,140 @@
+"""
+HTML parsing for the Bovada and nfl.com scrapers, plus reading the team
+ratings out of score_article responses.
+
+Pages are parsed by lxml in C, and Python only walks the containers the
+scrapers read (game coupons, article cards, article body). Fields are
+pulled out by precompiled CSS selectors.
+"""
+import json
+from urllib.parse import urljoin
+
+import pandas as pd
+from lxml import html as lxml_html
+from lxml.cssselect import CSSSelector
+
+# Bovada, one coupon section per game
+BOVADA_COUPON = CSSSelector("section.coupon-content.more-info")
+BOVADA_PERIOD = CSSSelector("sp-score-coupon span.period")  # game date, then kick off time
+BOVADA_BETS = CSSSelector("a.game-view-cta")  # "+ 123"
+BOVADA_TEAMS = CSSSelector("h4.competitor-name span.name")  # home, then away
+BOVADA_MARKETS = CSSSelector("sp-two-way-vertical.market-type")  # spread, moneyline, total
+BOVADA_PRICE = CSSSelector("span.bet-price")
+MONEYLINE_MARKET = 1
+
+# nfl.com all-news cards and article pages
+NEWS_VERTICAL = CSSSelector("div.d3-o-media-object--vertical")
+NEWS_HORIZONTAL = CSSSelector("a.d3-o-media-object--horizontal")
+NEWS_TITLE = CSSSelector("h3.d3-o-media-object__title")
+NEWS_DATE = CSSSelector("p.d3-o-media-object__date")
+NEWS_IMAGE = CSSSelector("picture img")
+ARTICLE_BODY = CSSSelector("div.nfl-c-article__body")
+NEWS_NEXT = CSSSelector('a[rel="next"], link[rel="next"]')
+NFL_BASE_URL = "https://www.nfl.com"
+
+_PARSER = lxml_html.HTMLParser(encoding='utf-8')
+
+def _document(html):
+    # parse bytes, lxml refuses str input that carries an encoding declaration
+    return lxml_html.fromstring(html.encode('utf-8'), parser=_PARSER) if html and html.strip() else None
+
+def _text(element):
+    """same as BeautifulSoup's get_text(strip=True)"""
+    if element is None:
+        return None
+    return "".join(text.strip() for text in element.itertext())
+
+def _first(elements):
+    return elements[0] if elements else None
+
+def _nth_text(elements, n):
+    return _text(elements[n]) if len(elements) > n else None
+
+def parse_bovada(html):
+    """one row per game coupon with date, time, bets, teams and moneyline prices as text"""
+    document = _document(html)
+    data = []
+    for coupon in BOVADA_COUPON(document) if document is not None else []:
+        period = BOVADA_PERIOD(coupon)
+        teams = BOVADA_TEAMS(coupon)
+        markets = BOVADA_MARKETS(coupon)
+        prices = BOVADA_PRICE(markets[MONEYLINE_MARKET]) if len(markets) > MONEYLINE_MARKET else []
+        data.append({
+            'date': _nth_text(period, 0),
+            'time': _nth_text(period, 1),
+            'bets': _text(_first(BOVADA_BETS(coupon))),
+            'home_team': _nth_text(teams, 0),
+            'away_team': _nth_text(teams, 1),
+            # prices render as "(-150)" under some layouts
+            'home_win': (_nth_text(prices, 0) or '').strip('()') or None,
+            'away_win': (_nth_text(prices, 1) or '').strip('()') or None,
+        })
+    return pd.DataFrame(data, columns=['date', 'time', 'bets', 'home_team', 'away_team', 'home_win', 'away_win'])
+
+def _news_item(article):
+    image_tag = _first(NEWS_IMAGE(article))
+    return {
+        'title': _text(_first(NEWS_TITLE(article))),
+        'date': _text(_first(NEWS_DATE(article))),
+        'link': f"https://www.nfl.com{article.get('href')}",
+        'image_url': image_tag.get('src') if image_tag is not None else None,
+    }
+
+def parse_news_page(html):
+    """(article cards as parse_news returns them, absolute url of the next page or None)"""
+    document = _document(html)
+    if document is None:
+        return [], None
+    articles = [_first(card.findall('.//a')) for card in NEWS_VERTICAL(document)]
+    articles += NEWS_HORIZONTAL(document)
+    next_link = _first(NEWS_NEXT(document))
+    next_url = urljoin(NFL_BASE_URL, next_link.get('href')) if next_link is not None and next_link.get('href') else None
+    return [_news_item(article) for article in articles if article is not None], next_url
+
+def parse_news(html):
+    """title, date, link and image_url of every article card on the all-news page"""
+    return parse_news_page(html)[0]
+
+def parse_article_text(html):
+    """the article body paragraphs joined by newlines, None when the page has no body"""
+    document = _document(html)
+    article_body = _first(ARTICLE_BODY(document)) if document is not None else None
+    if article_body is not None:
+        return "\n".join(_text(p) for p in article_body.iter('p'))
+    return None
+
+# wrapper keys the model sometimes nests its answer under
+_SCORE_WRAPPERS = ('result', 'results', 'team', 'team_name')
+
+def _rating(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_ai_score(ai_score):
+    """
+    [(team, rating)] from a score_article response. Accepts {team: rating},
+    {"results": [{team: rating}, ...]}, {"results": {team: rating}} and
+    {"team": name, "rating": rating}; anything unreadable gives []
+    """
+    try:
+        load = json.loads(ai_score.replace('\n', ''))
+    except (AttributeError, TypeError, ValueError):
+        return []
+    if not isinstance(load, dict) or not load:
+        return []
+
+    keys = list(load)
+    if keys[0].lower() not in _SCORE_WRAPPERS:
+        pairs = load.items()
+    elif isinstance(load[keys[0]], list):
+        pairs = [item for entry in load[keys[0]] if isinstance(entry, dict) for item in entry.items()]
+    elif isinstance(load[keys[0]], dict):
+        pairs = load[keys[0]].items()
+    elif len(keys) > 1:
+        pairs = [(load[keys[0]], load[keys[1]])]
+    else:
+        pairs = []
+    return [(team, _rating(rating)) for team, rating in pairs
+            if isinstance(team, str) and _rating(rating) is not None]
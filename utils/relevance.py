@@ -0,0 +1,101 @@
+"""
+Local relevance pre-filter for nfl.com headlines.
+
+Headlines that clearly do or don't bear on a team's next game are decided
+here from team names, nicknames and keywords, with a confidence score.
+Only the ones left ambiguous go to check_relevance_batch.
+"""
+import os
+import re
+
+# decisions below this confidence go to the API instead
+PREFILTER_MIN_CONFIDENCE = float(os.getenv('PREFILTER_MIN_CONFIDENCE', 0.8))
+
+TEAMS = {
+    'Arizona Cardinals': ['Cardinals', 'Arizona'],
+    'Atlanta Falcons': ['Falcons', 'Atlanta'],
+    'Baltimore Ravens': ['Ravens', 'Baltimore'],
+    'Buffalo Bills': ['Bills', 'Buffalo'],
+    'Carolina Panthers': ['Panthers', 'Carolina'],
+    'Chicago Bears': ['Bears', 'Chicago'],
+    'Cincinnati Bengals': ['Bengals', 'Cincinnati'],
+    'Cleveland Browns': ['Browns', 'Cleveland'],
+    'Dallas Cowboys': ['Cowboys', 'Dallas'],
+    'Denver Broncos': ['Broncos', 'Denver'],
+    'Detroit Lions': ['Lions', 'Detroit'],
+    'Green Bay Packers': ['Packers', 'Green Bay'],
+    'Houston Texans': ['Texans', 'Houston'],
+    'Indianapolis Colts': ['Colts', 'Indianapolis'],
+    'Jacksonville Jaguars': ['Jaguars', 'Jacksonville', 'Jags'],
+    'Kansas City Chiefs': ['Chiefs', 'Kansas City'],
+    'Las Vegas Raiders': ['Raiders', 'Las Vegas'],
+    'Los Angeles Chargers': ['Chargers'],
+    'Los Angeles Rams': ['Rams'],
+    'Miami Dolphins': ['Dolphins', 'Miami'],
+    'Minnesota Vikings': ['Vikings', 'Minnesota'],
+    'New England Patriots': ['Patriots', 'New England', 'Pats'],
+    'New Orleans Saints': ['Saints', 'New Orleans'],
+    'New York Giants': ['Giants'],
+    'New York Jets': ['Jets'],
+    'Philadelphia Eagles': ['Eagles', 'Philadelphia', 'Philly'],
+    'Pittsburgh Steelers': ['Steelers', 'Pittsburgh'],
+    'San Francisco 49ers': ['49ers', 'Niners', 'San Francisco'],
+    'Seattle Seahawks': ['Seahawks', 'Seattle'],
+    'Tampa Bay Buccaneers': ['Buccaneers', 'Bucs', 'Tampa Bay'],
+    'Tennessee Titans': ['Titans', 'Tennessee'],
+    'Washington Commanders': ['Commanders', 'Washington'],
+}
+
+def _words(words):
+    return re.compile(r'\b(' + '|'.join(re.escape(w) for w in words) + r')\b', re.IGNORECASE)
+
+TEAM_PATTERN = _words(list(TEAMS) + [name for names in TEAMS.values() for name in names])
+
+# availability and roster news that moves a game line
+IMPACT_PATTERN = _words([
+    'injury', 'injured', 'injuries', 'out', 'ruled out', 'questionable', 'doubtful', 'inactive',
+    'IR', 'injured reserve', 'activated', 'return', 'returns', 'returning', 'suspended', 'suspension',
+    'benched', 'to start', 'will start', 'starting', 'trade', 'traded', 'acquire', 'acquired',
+    'release', 'released', 'waive', 'waived', 'sign', 'signs', 'signed', 'concussion', 'surgery',
+    'torn', 'ACL', 'hamstring', 'ankle', 'illness', 'fired', 'coordinator',
+])
+
+# story types that never feed team_rating
+NOISE_PATTERN = _words([
+    'fantasy', 'mock draft', 'draft', 'prospect', 'prospects', 'combine', 'podcast', 'uniform',
+    'uniforms', 'Hall of Fame', 'Pro Bowl', 'power rankings', 'rankings', 'top 100', 'awards',
+    'MVP', 'video', 'highlights', 'recap', 'throwback', 'commissioner', 'Goodell', 'league office',
+    'tickets', 'schedule release', 'jersey', 'jerseys', 'fan', 'fans', 'NFL Network', 'mailbag',
+])
+
+def prefilter(title):
+    """(relevant, confidence) from the headline alone, relevant is None when it can't tell"""
+    if not title:
+        return False, 1.0
+    team = TEAM_PATTERN.search(title) is not None
+    impact = IMPACT_PATTERN.search(title) is not None
+    noise = NOISE_PATTERN.search(title) is not None
+    if noise and not team:
+        return False, 0.95
+    if noise and not impact:
+        return False, 0.85
+    if team and impact:
+        return True, 0.85
+    if not team and not impact:
+        # may still be about a player, the model knows rosters
+        return False, 0.6
+    return None, 0.5
+
+def split(titles, min_confidence=PREFILTER_MIN_CONFIDENCE):
+    """
+    (decided, ambiguous): decided maps index -> ('True'/'False', confidence) for titles the
+    pre-filter is sure about, ambiguous lists the indexes that need the API
+    """
+    decided, ambiguous = {}, []
+    for i, title in enumerate(titles):
+        relevant, confidence = prefilter(title)
+        if relevant is not None and confidence >= min_confidence:
+            decided[i] = (str(relevant), confidence)
+        else:
+            ambiguous.append(i)
+    return decided, ambiguous
@@ -0,0 +1,368 @@
+import logging
+import os
+import re
+import sqlite3
+import sys
+import pandas as pd
+
+DB_PATH = os.getenv('DB_PATH', 'data-log.db')
+
+# date columns are stored in these formats so range filters can run in SQL
+ISO_DATE = '%Y-%m-%d'
+ISO_DATETIME = '%Y-%m-%d %H:%M:%S'
+
+def setup_logger(name):
+    """Set up a logger for a given module."""
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+
+    # Create file handler which logs even debug messages
+    fh = logging.FileHandler('app.log')
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] - %(message)s')
+    fh.setFormatter(formatter)
+
+    # Add the handler to the logger
+    if not logger.handlers:
+        logger.addHandler(fh)
+
+    return logger
+
+logger = setup_logger(__name__)
+
+def _migrate_v1(conn):
+    """base tables, matching the shapes pandas.to_sql created them with, plus lookup indexes"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS bovada_data (
+            date TEXT, time TEXT, bets INTEGER, home_team TEXT, away_team TEXT,
+            home_win INTEGER, away_win INTEGER, win_differential INTEGER,
+            day TEXT, points REAL, game_id TEXT
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS matchup_data (
+            time TEXT, matchup TEXT, projected_winner TEXT, ranking REAL, game_id TEXT
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS expert_data (
+            Game TEXT, Time TEXT, Bell TEXT, Bowen TEXT, Clay TEXT, Fowler TEXT,
+            Graziano TEXT, Kahler TEXT, Martin TEXT, Moody TEXT, Reid TEXT,
+            Thiry TEXT, Wicker TEXT, week TEXT, pct REAL, message TEXT,
+            game_id TEXT, datetime TEXT
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS merged_data (
+            game_id TEXT, matchup TEXT, projected_winner TEXT, ranking REAL,
+            alt_game_id TEXT, week TEXT, Game TEXT, Time TEXT, pct REAL,
+            message TEXT, IngestTime TEXT
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS espn_news (
+            title TEXT PRIMARY KEY, date TEXT, link TEXT, image_url TEXT,
+            relevant TEXT, ai_score TEXT
+        )""")
+
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bovada_data_game_id ON bovada_data (game_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bovada_data_date ON bovada_data (date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_matchup_data_game_id ON matchup_data (game_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expert_data_game_id ON expert_data (game_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expert_data_datetime ON expert_data (datetime)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_merged_data_game_id ON merged_data (game_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_merged_data_ingest_time ON merged_data (IngestTime)")
+    # legacy databases may not have the title primary key
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_espn_news_title ON espn_news (title)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_espn_news_date ON espn_news (date)")
+
+def iso_date(value, fmt=ISO_DATE):
+    """normalizes a date string to fmt, unparseable values are returned unchanged"""
+    if value is None:
+        return None
+    parsed = pd.to_datetime(value, errors='coerce')
+    if pd.isna(parsed):
+        return value
+    return parsed.strftime(fmt)
+
+def _migrate_v2(conn):
+    """backfills the date columns the readers filter on to ISO-8601"""
+    conn.create_function('iso_date', 2, iso_date, deterministic=True)
+    conn.execute("UPDATE bovada_data SET date = iso_date(date, ?) WHERE date IS NOT NULL", (ISO_DATE,))
+    conn.execute("UPDATE expert_data SET datetime = iso_date(datetime, ?) WHERE datetime IS NOT NULL", (ISO_DATETIME,))
+    conn.execute("UPDATE espn_news SET date = iso_date(date, ?) WHERE date IS NOT NULL", (ISO_DATE,))
+
+def _migrate_v3(conn):
+    """single-row counter the ingest jobs bump whenever new data lands"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )""")
+    conn.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)")
+
+def _migrate_v4(conn):
+    """row_hash fingerprints so the insert_* functions can skip unchanged rows"""
+    for table in ('bovada_data', 'matchup_data', 'expert_data', 'merged_data'):
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if 'row_hash' not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN row_hash TEXT")
+
+def _migrate_v5(conn):
+    """content-addressed cache of LLM responses, keyed by prompt version, model and input"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY, response TEXT NOT NULL, last_used TEXT NOT NULL
+        )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used)")
+
+def _migrate_v6(conn):
+    """who decided relevance (the local pre-filter or the LLM) and how sure it was"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(espn_news)")]
+    if 'relevance_source' not in columns:
+        conn.execute("ALTER TABLE espn_news ADD COLUMN relevance_source TEXT")
+    if 'relevance_confidence' not in columns:
+        conn.execute("ALTER TABLE espn_news ADD COLUMN relevance_confidence REAL")
+
+def _migrate_v7(conn):
+    """score_article output normalized to one row per article and team, backfilled from ai_score"""
+    # imported here so the schema module stays importable on its own
+    import utils.parsers as parsers
+    import utils.relevance as relevance
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS article_team_scores (
+            title TEXT NOT NULL, team TEXT NOT NULL, rating REAL NOT NULL,
+            PRIMARY KEY (title, team)
+        ) WITHOUT ROWID""")
+    rows = [(title, team, rating)
+            for title, ai_score in conn.execute("SELECT title, ai_score FROM espn_news WHERE ai_score IS NOT NULL")
+            for team, rating in parsers.parse_ai_score(ai_score) if team in relevance.TEAMS]
+    conn.executemany("INSERT OR REPLACE INTO article_team_scores (title, team, rating) VALUES (?, ?, ?)", rows)
+
+def _migrate_v8(conn):
+    """ETag / Last-Modified of crawled pages so the next crawl can send a conditional GET"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS http_validators (
+            url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, checked_at TEXT
+        )""")
+
+def _migrate_v9(conn):
+    """one row per espn_news title, so inserts can upsert with ON CONFLICT(title)"""
+    unique = [index for index in conn.execute("PRAGMA index_list(espn_news)") if index[2]]
+    if any([row[2] for row in conn.execute(f"PRAGMA index_info('{index[1]}')")] == ['title'] for index in unique):
+        # the title primary key already covers the plain index v1 added for legacy tables
+        conn.execute("DROP INDEX IF EXISTS idx_espn_news_title")
+        return
+    # legacy tables were created without the primary key, keep the most complete copy of each title
+    conn.execute("""
+        DELETE FROM espn_news WHERE rowid NOT IN (
+            SELECT rowid FROM (
+                SELECT rowid, ROW_NUMBER() OVER (
+                    PARTITION BY title
+                    ORDER BY ai_score IS NULL, relevant IS NULL, rowid DESC
+                ) AS rank
+                FROM espn_news
+            ) WHERE rank = 1
+        )""")
+    conn.execute("DROP INDEX IF EXISTS idx_espn_news_title")
+    conn.execute("CREATE UNIQUE INDEX idx_espn_news_title ON espn_news (title)")
+
+def _migrate_v10(conn):
+    """scored picks for each game, written at ingest time so the dashboard only reads them"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS picks (
+            game_id TEXT PRIMARY KEY, date TEXT, home_team TEXT, away_team TEXT,
+            home_score REAL, away_score REAL, confidence REAL, pick TEXT,
+            weights TEXT, scored_at TEXT
+        )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_picks_date ON picks (date)")
+
+def _migrate_v11(conn):
+    """final scores, imported from CSV, that utils/backtest.py grades picks against"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS game_results (
+            date TEXT NOT NULL, home_team TEXT NOT NULL, away_team TEXT NOT NULL,
+            home_points INTEGER NOT NULL, away_points INTEGER NOT NULL,
+            PRIMARY KEY (date, home_team, away_team)
+        ) WITHOUT ROWID""")
+
+def _migrate_v12(conn):
+    """
+    odds snapshots as a time series per game: a games dimension keyed by an integer,
+    and odds_history clustered on (game_key, ts) so one game's line movement is a range read
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS games (
+            game_key INTEGER PRIMARY KEY, game_id TEXT NOT NULL UNIQUE, date TEXT,
+            season INTEGER, week INTEGER, home_team TEXT, away_team TEXT
+        )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_games_season_week ON games (season, week)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS odds_history (
+            game_key INTEGER NOT NULL, ts INTEGER NOT NULL,
+            home_odds INTEGER, away_odds INTEGER, bets INTEGER,
+            PRIMARY KEY (game_key, ts)
+        ) WITHOUT ROWID""")
+    # legacy bovada_data rows carry no capture time, so only the games are backfilled
+    # imported here so the schema module stays importable on its own
+    import utils.get_calls as get_calls
+    rows = conn.execute("""
+        SELECT game_id, date, home_team, away_team FROM bovada_data
+        WHERE rowid IN (SELECT MAX(rowid) FROM bovada_data WHERE game_id IS NOT NULL GROUP BY game_id)
+        """).fetchall()
+    conn.executemany("""
+        INSERT OR IGNORE INTO games (game_id, date, season, week, home_team, away_team)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """, [(game_id, date, *get_calls.nfl_season_week(date), home, away)
+              for game_id, date, home, away in rows if date])
+
+def _ingested_at(ingest_time, game_date, now):
+    """ISO datetime for a legacy "%m/%d %H:%M" IngestTime, taking the year from the game it scored"""
+    parsed = pd.to_datetime(f"2000/{ingest_time}", format='%Y/%m/%d %H:%M', errors='coerce')
+    if pd.isna(parsed):
+        return None
+    if game_date:
+        game = pd.Timestamp(game_date)
+        # picks for early January games can be scraped in late December
+        year = game.year - 1 if parsed.month > game.month + 6 else game.year
+    else:
+        year = now.year if parsed.replace(year=now.year) <= now else now.year - 1
+    return parsed.replace(year=year).strftime(ISO_DATETIME)
+
+def _migrate_v13(conn):
+    """merged_data.ingested_at, a full ISO timestamp, IngestTime has no year to archive by"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(merged_data)")]
+    if 'ingested_at' not in columns:
+        conn.execute("ALTER TABLE merged_data ADD COLUMN ingested_at TEXT")
+    now = pd.Timestamp.now()
+    rows = conn.execute("""
+        SELECT m.rowid, m.IngestTime, g.date FROM merged_data m
+        LEFT JOIN games g ON g.game_id = m.alt_game_id
+        WHERE m.ingested_at IS NULL AND m.IngestTime IS NOT NULL
+        """).fetchall()
+    conn.executemany("UPDATE merged_data SET ingested_at = ? WHERE rowid = ?",
+                     [(_ingested_at(ingest_time, game_date, now), rowid) for rowid, ingest_time, game_date in rows])
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_merged_data_ingested_at ON merged_data (ingested_at)")
+
+# Each entry upgrades the database by one version; PRAGMA user_version records
+# how many have been applied. Only ever append to this list.
+MIGRATIONS = [
+    _migrate_v1,
+    _migrate_v2,
+    _migrate_v3,
+    _migrate_v4,
+    _migrate_v5,
+    _migrate_v6,
+    _migrate_v7,
+    _migrate_v8,
+    _migrate_v9,
+    _migrate_v10,
+    _migrate_v11,
+    _migrate_v12,
+    _migrate_v13,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def migrate(conn):
+    """applies any pending migrations to an open connection, returns the resulting version"""
+    # BEGIN IMMEDIATE takes the write lock up front so the web process and the
+    # ingest job can't both apply the same migration
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target in range(version + 1, SCHEMA_VERSION + 1):
+            MIGRATIONS[target - 1](conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+            logger.info(f"MIGRATED data-log schema to version {target}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        logger.exception("Schema migration failed")
+        raise
+    return max(version, SCHEMA_VERSION)
+
+def ensure_schema(db_path=None):
+    """creates or upgrades the tables in db_path, DB_PATH by default"""
+    conn = sqlite3.connect(db_path or DB_PATH)
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
+
+def get_data_version(conn):
+    """returns the ingest counter, cached dashboard results are keyed by it"""
+    row = conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()
+    return row[0] if row else 0
+
+def bump_data_version(db_path=None):
+    """marks the data as changed so cached dashboard results get recomputed"""
+    with sqlite3.connect(db_path or DB_PATH) as conn:
+        conn.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+    conn.close()
+
+# The lookups run on every scrape or dashboard refresh. Each one has to be
+# answered from an index, check_query_plans fails on any full table scan.
+HOT_QUERIES = {
+    'bovada_by_game_id': ("SELECT * FROM bovada_data WHERE game_id = ?", ('',)),
+    'matchup_by_game_id': ("SELECT * FROM matchup_data WHERE game_id = ?", ('',)),
+    'expert_by_game_id': ("SELECT * FROM expert_data WHERE game_id = ?", ('',)),
+    'merged_by_game_id': ("SELECT * FROM merged_data WHERE game_id = ?", ('',)),
+    'merged_latest_ingest': ("""
+        SELECT * FROM merged_data
+        WHERE ingested_at = (SELECT MAX(ingested_at) FROM merged_data)
+        """, ()),
+    'bovada_latest_hashes': ("""
+        SELECT game_id, row_hash FROM bovada_data
+        WHERE rowid IN (SELECT MAX(rowid) FROM bovada_data
+                        WHERE game_id IN (SELECT value FROM json_each(?))
+                        GROUP BY game_id)
+        """, ('[]',)),
+    'news_relevant_by_title': ("SELECT relevant FROM espn_news WHERE title = ?", ('',)),
+    'news_known_titles': ("SELECT title FROM espn_news WHERE title IN (SELECT value FROM json_each(?))", ('[]',)),
+    'http_validators_by_url': ("SELECT etag, last_modified FROM http_validators WHERE url = ?", ('',)),
+    'bovada_by_date': ("SELECT * FROM bovada_data WHERE date BETWEEN ? AND ?", ('', '')),
+    'expert_by_datetime': ("SELECT * FROM expert_data WHERE datetime BETWEEN ? AND ?", ('', '')),
+    'news_by_date': ("SELECT * FROM espn_news WHERE date BETWEEN ? AND ?", ('', '')),
+    'picks_by_date': ("SELECT * FROM picks WHERE date BETWEEN ? AND ?", ('', '')),
+    'games_by_id': ("SELECT game_key FROM games WHERE game_id IN (SELECT value FROM json_each(?))", ('[]',)),
+    'odds_latest': ("""
+        SELECT o.game_key, o.home_odds, o.away_odds, o.bets FROM odds_history o
+        WHERE o.game_key IN (SELECT value FROM json_each(?))
+          AND o.ts = (SELECT MAX(ts) FROM odds_history WHERE game_key = o.game_key)
+        """, ('[]',)),
+    'odds_by_week': ("""
+        SELECT g.game_id, o.ts, o.home_odds, o.away_odds, o.bets
+        FROM games g JOIN odds_history o ON o.game_key = g.game_key
+        WHERE g.season = ? AND g.week = ?
+        """, (0, 0)),
+    'llm_cache_by_key': ("SELECT response FROM llm_cache WHERE key = ?", ('',)),
+    'team_scores_by_date': ("""
+        SELECT s.team, SUM(s.rating) FROM espn_news n
+        JOIN article_team_scores s ON s.title = n.title
+        WHERE n.date BETWEEN ? AND ?
+        GROUP BY s.team
+        """, ('', '')),
+}
+
+_FULL_SCAN = re.compile(r'^SCAN (TABLE )?(?!CONSTANT ROW|SUBQUERY)\w+')
+
+def explain(conn, sql, params=()):
+    """returns the EXPLAIN QUERY PLAN detail lines for sql"""
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+def check_query_plans(conn, queries=HOT_QUERIES):
+    """returns {query name: [plan lines]} for every query that scans a whole table"""
+    failures = {}
+    for name, (sql, params) in queries.items():
+        # scanning a table-valued function like json_each only walks the parameter
+        scans = [detail for detail in explain(conn, sql, params)
+                 if _FULL_SCAN.match(detail) and 'VIRTUAL TABLE' not in detail]
+        if scans:
+            failures[name] = scans
+    return failures
+
+if __name__ == '__main__':
+    # python -m utils.schema [db_path]: migrate, then fail if a hot query scans
+    path = sys.argv[1] if len(sys.argv) > 1 else DB_PATH
+    print(f"{path} at schema version {ensure_schema(path)}")
+    with sqlite3.connect(path) as conn:
+        failures = check_query_plans(conn)
+    for name, scans in failures.items():
+        print(f"FULL SCAN in {name}: {'; '.join(scans)}")
+    sys.exit(1 if failures else 0)
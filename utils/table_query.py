@@ -0,0 +1,57 @@
+"""
+Turns a DataTable's custom filter_query and sort_by into SQL.
+
+Column names are only ever taken from the table's own column list, and
+values are always bound as parameters.
+"""
+import re
+
+# "{Team} contains Bills", "{AI Rating} >= 2", "{Week} eq 7" ...
+_FILTER_PART = re.compile(r'^\{(?P<column>[^}]+)\}\s+(?P<operator>\S+)\s+(?P<value>.+)$')
+
+_COMPARISONS = {
+    '=': '=', 'eq': '=', 's=': '=', 'i=': '=', 'ieq': '=', 'seq': '=',
+    '!=': '!=', 'ne': '!=', 's!=': '!=', 'i!=': '!=', 'ine': '!=', 'sne': '!=',
+    '<': '<', 'lt': '<', 's<': '<', 'i<': '<', 'ilt': '<', 'slt': '<',
+    '<=': '<=', 'le': '<=', 's<=': '<=', 'i<=': '<=', 'ile': '<=', 'sle': '<=',
+    '>': '>', 'gt': '>', 's>': '>', 'i>': '>', 'igt': '>', 'sgt': '>',
+    '>=': '>=', 'ge': '>=', 's>=': '>=', 'i>=': '>=', 'ige': '>=', 'sge': '>=',
+}
+_LIKE = {
+    'contains': '%{}%', 'icontains': '%{}%', 'scontains': '%{}%',
+    'datestartswith': '{}%',
+}
+
+def quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+def _value(text):
+    text = text.strip()
+    if len(text) > 1 and text[0] == text[-1] and text[0] in '"\'`':
+        return text[1:-1].replace('\\' + text[0], text[0])
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+def where_clause(filter_query, columns):
+    """(WHERE clause, params) for the parts of filter_query on known columns"""
+    conditions, params = [], []
+    for part in (filter_query or '').split(' && '):
+        match = _FILTER_PART.match(part.strip())
+        if match is None or match['column'] not in columns:
+            continue
+        operator, value = match['operator'], _value(match['value'])
+        if operator in _COMPARISONS:
+            conditions.append(f"{quote(match['column'])} {_COMPARISONS[operator]} ?")
+            params.append(value)
+        elif operator in _LIKE:
+            conditions.append(f"{quote(match['column'])} LIKE ?")
+            params.append(_LIKE[operator].format(value if isinstance(value, str) else f"{value:g}"))
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+def order_clause(sort_by, columns):
+    """ORDER BY for the sort_by entries on known columns, empty when there are none"""
+    terms = [f"{quote(sort['column_id'])} {'DESC' if sort.get('direction') == 'desc' else 'ASC'}"
+             for sort in (sort_by or []) if sort.get('column_id') in columns]
+    return " ORDER BY " + ", ".join(terms) if terms else ""
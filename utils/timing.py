@@ -0,0 +1,28 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# seconds spent per pipeline stage since the last reset(), e.g. 'bovada.parse'
+_lock = threading.Lock()
+totals = defaultdict(float)
+
+@contextmanager
+def timed(stage):
+    """adds the wall clock time of the with block to totals[stage]"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        with _lock:
+            totals[stage] += elapsed
+
+def reset():
+    with _lock:
+        totals.clear()
+
+def report():
+    """returns the stage timings as a log friendly string"""
+    with _lock:
+        return ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in sorted(totals.items()))
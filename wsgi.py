@@ -0,0 +1,8 @@
+"""
+WSGI entry point for serving the dashboard in production.
+
+gunicorn -c gunicorn.conf.py wsgi:server
+"""
+from app import app
+
+server = app.server